@@ -0,0 +1,75 @@
+# core/actions.py
+# Restrictions shared by the moderation modules (antiflood, warn): parsing durations
+# like '10m' and applying ban / kick / mute and their timed variants.
+#
+# Timed modes pass until_date to Telegram, which lifts the ban or mute by itself,
+# back to the chat's default permissions; nothing here needs to be undone later.
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from telegram import ChatPermissions
+
+from core.deletion import delete_messages
+
+MODES = ("ban", "kick", "tban", "mute", "tmute")
+
+
+# helper: parse durations like '30s', '5m', '2h', '3d' or plain seconds
+def parse_duration(text: str) -> Optional[int]:
+    if not text:
+        return None
+    txt = text.strip().lower()
+    if txt in ("off", "no", "none"):
+        return None
+    try:
+        unit = txt[-1]
+        num = int(txt[:-1])
+        if unit == "s":
+            return num
+        if unit == "m":
+            return num * 60
+        if unit == "h":
+            return num * 3600
+        if unit == "d":
+            return num * 86400
+    except Exception:
+        # try plain integer seconds
+        try:
+            return int(txt)
+        except Exception:
+            return None
+    return None
+
+
+async def apply_action(bot, chat_id: int, user_id: int, mode: str, duration_seconds: Optional[int],
+                       msg_ids: Optional[List[int]] = None) -> Optional[Exception]:
+    """Delete msg_ids (if any) and restrict the user. Returns the error, or None on success."""
+    if msg_ids:
+        try:
+            await delete_messages(bot, chat_id, msg_ids)
+        except Exception:
+            pass
+
+    until_date = None
+    if duration_seconds:
+        until_date = datetime.utcnow() + timedelta(seconds=duration_seconds)
+
+    try:
+        if mode == "ban":
+            await bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
+        elif mode == "kick":
+            await bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
+            await asyncio.sleep(1)
+            await bot.unban_chat_member(chat_id=chat_id, user_id=user_id)
+        elif mode == "tban":
+            await bot.ban_chat_member(chat_id=chat_id, user_id=user_id, until_date=until_date)
+        elif mode == "tmute":
+            perms = ChatPermissions(can_send_messages=False)
+            await bot.restrict_chat_member(chat_id=chat_id, user_id=user_id, permissions=perms, until_date=until_date)
+        else:  # "mute" and anything unknown
+            perms = ChatPermissions(can_send_messages=False)
+            await bot.restrict_chat_member(chat_id=chat_id, user_id=user_id, permissions=perms)
+    except Exception as e:
+        return e
+    return None
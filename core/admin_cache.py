@@ -0,0 +1,115 @@
+# core/admin_cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core import config
+
+ADMIN_STATUSES = ("administrator", "creator")
+
+
+class AdminCache:
+    """
+    Per-chat admin roster with a TTL.
+    One get_chat_administrators call serves every admin check in a chat until the
+    roster expires or is invalidated (promote/demote, ChatMemberUpdated).
+    """
+
+    def __init__(self, ttl: int = 300, max_chats: int = 10000):
+        self.ttl = ttl
+        self.max_chats = max_chats
+        # chat_id -> (expires_at, {user_id: ChatMember})
+        self._rosters: "OrderedDict[int, Tuple[float, Dict[int, Any]]]" = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+        # bumped by invalidate() while a fetch is in flight: that fetch may have read the
+        # roster before the change, so it must not be cached. Only kept for chats fetching.
+        self._generation: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_admins(self, bot, chat_id: int) -> Dict[int, Any]:
+        entry = self._rosters.get(chat_id)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            self._rosters.move_to_end(chat_id)
+            return entry[1]
+
+        # coalesce concurrent misses for the same chat into one API call
+        fut = self._inflight.get(chat_id)
+        if fut is None:
+            self.misses += 1
+            fut = asyncio.ensure_future(self._fetch(bot, chat_id))
+            self._inflight[chat_id] = fut
+            fut.add_done_callback(lambda done: self._fetched(chat_id, done))
+        else:
+            self.hits += 1
+        return await asyncio.shield(fut)
+
+    async def _fetch(self, bot, chat_id: int) -> Dict[int, Any]:
+        generation = self._generation.get(chat_id, 0)
+        admins = await bot.get_chat_administrators(chat_id)
+        roster = {admin.user.id: admin for admin in admins}
+        if self._generation.get(chat_id, 0) != generation:
+            return roster  # invalidated meanwhile: good enough for who asked before, not cached
+        self._rosters[chat_id] = (time.monotonic() + self.ttl, roster)
+        self._rosters.move_to_end(chat_id)
+        while len(self._rosters) > self.max_chats:
+            self._rosters.popitem(last=False)
+        return roster
+
+    def _fetched(self, chat_id: int, fut: asyncio.Future):
+        if self._inflight.get(chat_id) is fut:
+            del self._inflight[chat_id]
+        if chat_id not in self._inflight:
+            self._generation.pop(chat_id, None)
+
+    async def get_member(self, bot, chat_id: int, user_id: int):
+        """Admin ChatMember for user_id, or None if the user is not an admin."""
+        roster = await self.get_admins(bot, chat_id)
+        return roster.get(user_id)
+
+    async def is_admin(self, bot, chat_id: int, user_id: int, require: Optional[str] = None) -> bool:
+        member = await self.get_member(bot, chat_id, user_id)
+        if member is None or member.status not in ADMIN_STATUSES:
+            return False
+        if member.status == "creator" or not require:
+            return True
+        return getattr(member, require, False) is True
+
+    def invalidate(self, chat_id: int):
+        if self._rosters.pop(chat_id, None) is not None:
+            self.invalidations += 1
+        if self._inflight.pop(chat_id, None) is not None:
+            # the next check fetches again instead of joining the outdated fetch
+            self._generation[chat_id] = self._generation.get(chat_id, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "chats": len(self._rosters),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+admin_cache = AdminCache(ttl=config.ADMIN_CACHE_TTL)
+
+
+async def is_admin(bot, chat_id: int, user_id: int, require: Optional[str] = None) -> bool:
+    return await admin_cache.is_admin(bot, chat_id, user_id, require=require)
+
+
+def invalidate(chat_id: int):
+    admin_cache.invalidate(chat_id)
+
+
+def on_member_updated(chat_member_updated) -> bool:
+    """Drop the cached roster if a ChatMemberUpdated touches admin status. Returns True if dropped."""
+    old = chat_member_updated.old_chat_member
+    new = chat_member_updated.new_chat_member
+    if old.status in ADMIN_STATUSES or new.status in ADMIN_STATUSES:
+        admin_cache.invalidate(chat_member_updated.chat.id)
+        return True
+    return False
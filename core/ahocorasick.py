@@ -0,0 +1,119 @@
+# core/ahocorasick.py
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+
+class TriggerMatcher:
+    """
+    Aho-Corasick automaton over a set of trigger strings.
+
+    Triggers keep the order they were added in; first_match() scans the text once
+    and returns the earliest-added trigger that occurs anywhere in it, i.e. the same
+    answer as looping over the triggers in order with `trigger in text`.
+
+    add()/remove() only touch the trie; failure links are rebuilt lazily on the
+    next match after a change.
+    """
+
+    def __init__(self, triggers: Iterable[str] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._term: List[Optional[str]] = [None]  # trigger ending exactly at node
+        self._link: List[int] = [0]  # nearest proper suffix node that ends a trigger
+        self._priority: Dict[str, int] = {}
+        self._next_priority = 0
+        self._best_priority = 0
+        self._dead = 0  # trie nodes left behind by remove()
+        self._dirty = False
+        for trigger in triggers:
+            self.add(trigger)
+
+    def __len__(self) -> int:
+        return len(self._priority)
+
+    def __contains__(self, trigger: str) -> bool:
+        return trigger in self._priority
+
+    def add(self, trigger: str, priority: Optional[int] = None):
+        """priority: explicit rank (lower wins) instead of "after everything added so far"."""
+        if not trigger or trigger in self._priority:
+            return
+        if priority is None:
+            priority = self._next_priority
+        self._priority[trigger] = priority
+        self._next_priority = max(self._next_priority, priority + 1)
+        node = 0
+        for ch in trigger:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._term.append(None)
+                self._link.append(0)
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._term[node] = trigger
+        self._dirty = True
+
+    def remove(self, trigger: str):
+        if self._priority.pop(trigger, None) is None:
+            return
+        node = 0
+        for ch in trigger:
+            node = self._goto[node][ch]
+        self._term[node] = None
+        self._dead += len(trigger)
+        self._dirty = True
+
+    def clear(self):
+        self.__init__()
+
+    def _build(self):
+        # compact the trie once removals have left it mostly dead
+        if self._dead > len(self._goto) // 2:
+            priorities = self._priority
+            self.__init__()
+            for trigger, priority in sorted(priorities.items(), key=lambda item: item[1]):
+                self.add(trigger, priority)
+        fail, link, term, goto = self._fail, self._link, self._term, self._goto
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            link[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[child] = f
+                link[child] = f if term[f] is not None else link[f]
+                queue.append(child)
+        self._best_priority = min(self._priority.values(), default=0)
+        self._dirty = False
+
+    def first_match(self, text: str) -> Optional[str]:
+        if not self._priority:
+            return None
+        if self._dirty:
+            self._build()
+        goto, fail, term, link, priority = self._goto, self._fail, self._term, self._link, self._priority
+        best_trigger = None
+        best = self._next_priority
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            out = node if term[node] is not None else link[node]
+            while out:
+                p = priority[term[out]]
+                if p < best:
+                    best, best_trigger = p, term[out]
+                    if p == self._best_priority:
+                        return best_trigger
+                out = link[out]
+        return best_trigger
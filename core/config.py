@@ -0,0 +1,83 @@
+# core/config.py
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+
+# Optional: global owner (always allowed everywhere)
+OWNER_ID = int(os.getenv("OWNER_ID", "123456789"))  # replace with your Telegram ID if you want
+
+# seconds an admin roster fetched from Telegram stays valid
+ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", "300"))
+
+# ---------- modules ----------
+# comma-separated module names; MODULES replaces the manifest in core/loader.py,
+# DISABLED_MODULES drops entries from it (e.g. DISABLED_MODULES=captcha,raid)
+MODULES = [m.strip() for m in os.getenv("MODULES", "").split(",") if m.strip()]
+DISABLED_MODULES = {m.strip() for m in os.getenv("DISABLED_MODULES", "").split(",") if m.strip()}
+
+# ---------- storage ----------
+DATA_DIR = os.getenv("DATA_DIR", "data")
+# seconds to coalesce changes before a store is written to disk
+STORAGE_FLUSH_DELAY = float(os.getenv("STORAGE_FLUSH_DELAY", "2"))
+# "json" (one file per store) or "sqlite" (row per chat, see core/sqlite_store.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(DATA_DIR, "bot.db"))
+# how many chats' values the sqlite backend keeps cached per store
+SQLITE_CACHE_CHATS = int(os.getenv("SQLITE_CACHE_CHATS", "5000"))
+# parsed per-chat settings objects kept per module (core/settings.py)
+SETTINGS_CACHE_CHATS = int(os.getenv("SETTINGS_CACHE_CHATS", "20000"))
+
+# ---------- antiflood runtime state ----------
+FLOOD_CHAT_IDLE_TTL = int(os.getenv("FLOOD_CHAT_IDLE_TTL", "3600"))  # drop chats silent this long
+FLOOD_USER_IDLE_TTL = int(os.getenv("FLOOD_USER_IDLE_TTL", "300"))  # drop per-user timestamps (min)
+FLOOD_MAX_CHATS = int(os.getenv("FLOOD_MAX_CHATS", "10000"))  # LRU cap on tracked chats
+FLOOD_SWEEP_INTERVAL = int(os.getenv("FLOOD_SWEEP_INTERVAL", "60"))
+
+# ---------- duplicate content (see core/dupes.py) ----------
+DUPE_MAX_ENTRIES = int(os.getenv("DUPE_MAX_ENTRIES", "50000"))  # fingerprints kept, per chat window and global
+DUPE_MIN_LENGTH = int(os.getenv("DUPE_MIN_LENGTH", "20"))  # shorter texts without a link never count
+# same content from this many users across all /setdupe chats within the window; 0 disables
+DUPE_GLOBAL_USERS = int(os.getenv("DUPE_GLOBAL_USERS", "5"))
+DUPE_GLOBAL_WINDOW = int(os.getenv("DUPE_GLOBAL_WINDOW", "600"))
+
+# ---------- global bans ----------
+GBAN_ENFORCE_PER_SEC = float(os.getenv("GBAN_ENFORCE_PER_SEC", "2"))  # bans/s pushing new entries to known chats
+
+# ---------- moderation log (see core/events.py, modules/extra.py) ----------
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "15"))  # seconds between digests, at most one per channel
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "300"))  # events waiting per channel; the oldest are dropped
+
+# ---------- outbound rate limits (Telegram: ~30 msg/s overall, 20 msg/min per group) ----------
+RATE_GLOBAL_PER_SEC = float(os.getenv("RATE_GLOBAL_PER_SEC", "30"))
+RATE_GROUP_PER_MIN = float(os.getenv("RATE_GROUP_PER_MIN", "20"))
+RATE_PRIVATE_PER_SEC = float(os.getenv("RATE_PRIVATE_PER_SEC", "1"))
+RATE_MAX_RETRIES = int(os.getenv("RATE_MAX_RETRIES", "3"))
+
+# ---------- update delivery ----------
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()  # "polling" or "webhook"
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL Telegram posts to, e.g. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None  # checked against X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+# handlers running at once across chats (updates of one chat always run in order); 1 = sequential
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+# worker processes, chats split by chat id (see core/sharding.py); 1 = everything in this process
+SHARDS = int(os.getenv("SHARDS", "1"))
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "-1"))  # set by the front for its worker processes
+
+# ---------- metrics ----------
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))  # GET /metrics; 0 disables the endpoint
+
+# ---------- captcha ----------
+CAPTCHA_WAIT = int(os.getenv("CAPTCHA_WAIT", "60"))  # seconds to solve captcha
+CAPTCHA_MAX_PENDING = int(os.getenv("CAPTCHA_MAX_PENDING", "20000"))  # open challenges kept in memory
+
+# ---------- filters ----------
+REGEX_WORKERS = int(os.getenv("REGEX_WORKERS", "2"))  # processes running user regexes (core/patterns.py)
+FILTER_CACHE_CHATS = int(os.getenv("FILTER_CACHE_CHATS", "5000"))  # compiled per-chat matchers kept
@@ -0,0 +1,91 @@
+# core/deletion.py
+# Bulk message deletion for /clean and antiflood's clear option.
+#
+# Uses the Bot API deleteMessages call (up to 100 ids per request) when the bot
+# library has it, and falls back to single deleteMessage calls with bounded
+# concurrency. RetryAfter is honoured in both paths.
+import asyncio
+from datetime import timedelta
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Sequence
+
+from telegram.error import BadRequest, RetryAfter
+
+BATCH_SIZE = 100  # deleteMessages limit
+CONCURRENCY = 8  # parallel single deletes in the fallback path
+MAX_RETRIES = 3
+
+Progress = Callable[[int, int], Awaitable[None]]  # (done, total)
+
+
+class DeleteResult(NamedTuple):
+    deleted: int  # confirmed, one deleteMessage call each
+    requested: int  # sent with deleteMessages, which doesn't say which ids still existed
+
+    @property
+    def confirmed(self) -> bool:
+        return not self.requested
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    delay = error.retry_after
+    if isinstance(delay, timedelta):
+        delay = delay.total_seconds()
+    return float(delay) + 0.5
+
+
+async def _delete_one(bot, chat_id: int, message_id: int, sem: asyncio.Semaphore) -> bool:
+    async with sem:
+        for _ in range(MAX_RETRIES):
+            try:
+                await bot.delete_message(chat_id=chat_id, message_id=message_id)
+                return True
+            except RetryAfter as e:
+                await asyncio.sleep(_retry_seconds(e))
+            except Exception:
+                return False  # already gone, too old, no rights...
+    return False
+
+
+async def _delete_singles(bot, chat_id: int, ids: Sequence[int]) -> int:
+    sem = asyncio.Semaphore(CONCURRENCY)
+    results = await asyncio.gather(*(_delete_one(bot, chat_id, mid, sem) for mid in ids))
+    return sum(results)
+
+
+async def _delete_batch(bot, chat_id: int, ids: List[int]) -> DeleteResult:
+    for _ in range(MAX_RETRIES):
+        try:
+            await bot.delete_messages(chat_id=chat_id, message_ids=ids)
+            return DeleteResult(0, len(ids))  # Telegram silently skips ids that no longer exist
+        except RetryAfter as e:
+            await asyncio.sleep(_retry_seconds(e))
+        except BadRequest:
+            break  # e.g. no deletable message in the chunk: find out one by one
+    return DeleteResult(await _delete_singles(bot, chat_id, ids), 0)
+
+
+async def delete_messages(bot, chat_id: int, message_ids: Sequence[int],
+                          progress: Optional[Progress] = None) -> DeleteResult:
+    """
+    Delete message_ids in chat_id. Returns how many were confirmed deleted and how
+    many were only requested (batched chunks: Telegram does not report skips).
+    progress(done, total) is awaited after every chunk.
+    """
+    ids = list(dict.fromkeys(message_ids))
+    total = len(ids)
+    batched = hasattr(bot, "delete_messages")
+    deleted = requested = 0
+    for start in range(0, total, BATCH_SIZE):
+        chunk = ids[start:start + BATCH_SIZE]
+        if batched:
+            result = await _delete_batch(bot, chat_id, chunk)
+            deleted += result.deleted
+            requested += result.requested
+        else:
+            deleted += await _delete_singles(bot, chat_id, chunk)
+        if progress is not None:
+            try:
+                await progress(min(start + BATCH_SIZE, total), total)
+            except Exception:
+                pass
+    return DeleteResult(deleted, requested)
@@ -0,0 +1,57 @@
+# core/events.py
+# In-process moderation event bus.
+#
+# Modules publish what they did (antiflood actions, warns, bans, filter changes,
+# promotions...) and subscribers react, e.g. the log channel dispatcher in
+# modules/extra.py. publish() only calls the subscribers, which must not block or do
+# I/O: they queue the event and deal with it later. Nothing subscribed = almost free.
+import time
+from typing import Callable, List, Optional, Union
+
+from telegram import User
+
+from core.metrics import counter
+
+Person = Union[User, int, None]  # a User when the handler has one, else just the id
+
+
+class Event:
+    __slots__ = ("kind", "chat_id", "chat_title", "target", "actor", "detail", "at")
+
+    def __init__(self, kind: str, chat_id: int, chat_title: Optional[str], target: Person, actor: Person,
+                 detail: str):
+        self.kind = kind
+        self.chat_id = chat_id
+        self.chat_title = chat_title
+        self.target = target  # who the action was about
+        self.actor = actor  # who did it; None = the bot on its own
+        self.detail = detail
+        self.at = time.time()
+
+
+Subscriber = Callable[[Event], None]
+
+_subscribers: List[Subscriber] = []
+events_published = counter("bot_events_total", "Moderation events published.", ("kind",))
+
+
+def subscribe(func: Subscriber) -> Subscriber:
+    """Decorator: call func(event) for every published event."""
+    _subscribers.append(func)
+    return func
+
+
+def publish(kind: str, chat, target: Person = None, actor: Person = None, detail: str = ""):
+    """chat: a telegram Chat or a chat id."""
+    events_published.inc(kind)
+    if not _subscribers:
+        return
+    if isinstance(chat, int):
+        event = Event(kind, chat, None, target, actor, detail)
+    else:
+        event = Event(kind, chat.id, chat.title, target, actor, detail)
+    for func in _subscribers:
+        try:
+            func(event)
+        except Exception as e:
+            print(f"⚠️ Event subscriber {func.__qualname__} failed: {e}")
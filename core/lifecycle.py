@@ -0,0 +1,57 @@
+# core/lifecycle.py
+# Startup/shutdown hooks for shared services, run from the Application's post_init/post_shutdown.
+import asyncio
+from typing import Awaitable, Callable, List
+
+Hook = Callable[..., Awaitable[None]]
+
+_startup: List[Hook] = []
+_shutdown: List[Hook] = []
+_periodic: List[asyncio.Task] = []
+
+
+def on_startup(func: Hook) -> Hook:
+    _startup.append(func)
+    return func
+
+
+def on_shutdown(func: Hook) -> Hook:
+    _shutdown.append(func)
+    return func
+
+
+def every(seconds: float):
+    """Decorator: run `await func(app)` every `seconds` while the bot is up."""
+    def decorator(func: Hook) -> Hook:
+        async def runner(app):
+            while True:
+                await asyncio.sleep(seconds)
+                try:
+                    await func(app)
+                except Exception as e:
+                    print(f"⚠️ Periodic task {func.__qualname__} failed: {e}")
+
+        async def start(app):
+            # plain asyncio task: app.create_task() tasks are awaited by app.stop()
+            _periodic.append(asyncio.create_task(runner(app)))
+
+        on_startup(start)
+        return func
+    return decorator
+
+
+async def run_startup(app):
+    for func in _startup:
+        await func(app)
+
+
+async def run_shutdown(app):
+    for task in _periodic:
+        task.cancel()
+    _periodic.clear()
+    # reverse order: services started last are stopped first
+    for func in reversed(_shutdown):
+        try:
+            await func(app)
+        except Exception as e:
+            print(f"⚠️ Shutdown hook {func.__qualname__} failed: {e}")
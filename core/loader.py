@@ -0,0 +1,102 @@
+# core/loader.py
+# Module manifest and startup timing, used by main.load_modules.
+#
+# Only modules listed in MANIFEST are loaded (a new file in modules/ has to be added
+# here), in this order. MODULES / DISABLED_MODULES in .env narrow the list down.
+# Each module's import and setup() are timed; the stores it opens read their data on
+# first access, so their load time shows up in report() once something used them.
+# Handlers registered by setup() are wrapped with core.metrics.instrument().
+import importlib
+import inspect
+import time
+from typing import Dict, List
+
+from core import config, metrics
+from core.storage import BaseStore, open_stores
+
+MANIFEST = (
+    "start",
+    "help",
+    "alive",
+    "admin",
+    "antiflood",
+    "filters",
+    "warn",
+    "clean",
+    "extra",
+    "gban",
+    "raid",
+    "greetings",
+    "captcha",
+)
+
+
+class ModuleTiming:
+    __slots__ = ("name", "import_seconds", "setup_seconds", "stores")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.import_seconds = 0.0
+        self.setup_seconds = 0.0
+        self.stores: List[BaseStore] = []
+
+    @property
+    def load_seconds(self) -> float:
+        return sum(store.load_seconds for store in self.stores)
+
+
+timings: Dict[str, ModuleTiming] = {}
+
+
+def enabled_modules() -> List[str]:
+    names = config.MODULES or MANIFEST
+    return [name for name in names if name not in config.DISABLED_MODULES]
+
+
+def load_module(name: str, app, *setup_args) -> bool:
+    """Import modules.<name> and run its setup(app[, *setup_args]). False if it doesn't exist."""
+    timing = ModuleTiming(name)
+    known = {id(store) for store in open_stores()}
+    started = time.perf_counter()
+    try:
+        module = importlib.import_module(f"modules.{name}")
+    except ModuleNotFoundError as e:
+        if e.name != f"modules.{name}":
+            raise  # the module exists but one of its imports is missing
+        print(f"⚠️ Module {name!r} not found, skipping")
+        return False
+    timing.import_seconds = time.perf_counter() - started
+    timing.stores = [store for store in open_stores() if id(store) not in known]
+
+    setup = getattr(module, "setup", None)
+    if setup is not None:
+        before = {id(h) for group in app.handlers.values() for h in group}
+        started = time.perf_counter()
+        # pass extra arguments (main's protect_admins) to modules that take them; most only take app
+        if len(inspect.signature(setup).parameters) > 1:
+            setup(app, *setup_args)
+        else:
+            setup(app)
+        timing.setup_seconds = time.perf_counter() - started
+        for group in app.handlers.values():
+            for handler in group:
+                if id(handler) not in before:
+                    metrics.instrument(handler, name)
+    timings[name] = timing
+    return True
+
+
+def report() -> str:
+    """Per-module import / data load / handler registration times, in milliseconds."""
+    lines = [f"{'module':<12} {'import':>8} {'data':>8} {'setup':>8}"]
+    total_import = total_load = total_setup = 0.0
+    for timing in timings.values():
+        load = timing.load_seconds
+        loaded = f"{load * 1000:8.1f}" if load else f"{'lazy' if timing.stores else '-':>8}"
+        lines.append(f"{timing.name:<12} {timing.import_seconds * 1000:8.1f} {loaded} "
+                     f"{timing.setup_seconds * 1000:8.1f}")
+        total_import += timing.import_seconds
+        total_load += load
+        total_setup += timing.setup_seconds
+    lines.append(f"{'total':<12} {total_import * 1000:8.1f} {total_load * 1000:8.1f} {total_setup * 1000:8.1f}")
+    return "\n".join(lines)
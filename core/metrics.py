@@ -0,0 +1,209 @@
+# core/metrics.py
+# In-process counters and histograms, served in the Prometheus text format.
+#
+#   curl http://127.0.0.1:9100/metrics      (METRICS_LISTEN / METRICS_PORT in .env, 0 = off)
+#
+# core/loader.py wraps every handler a module registers in setup() with
+# handler_seconds / handler_errors_total; the rate limiter counts Bot API calls by
+# method and outcome; modules count their own events (antiflood triggers, filter hits).
+# Labels must stay low-cardinality: never a chat or user id.
+import asyncio
+import bisect
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from telegram.ext import ApplicationHandlerStop, CommandHandler
+
+from core import config
+from core.lifecycle import on_shutdown, on_startup
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = buckets
+        self._series: Dict[LabelValues, List[float]] = {}  # per-bucket counts, then +Inf count, then sum
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1  # index len(buckets) = +Inf only
+        series[-1] += value
+
+    def totals(self) -> Dict[LabelValues, Tuple[int, float]]:
+        """(count, sum) per label set."""
+        return {labels: (int(sum(series[:-1])), series[-1]) for labels, series in self._series.items()}
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%g"' % bound
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative:g}"
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative:g}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]:g}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative:g}"
+
+
+_metrics: List = []
+_gauges: List[Tuple[str, str, Callable[[], Dict[str, float]]]] = []
+
+
+def counter(name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+    metric = Counter(name, help_text, labels)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, help_text, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def gauges(prefix: str, help_text: str, collect: Callable[[], Dict[str, float]]):
+    """Expose collect()'s dict (e.g. an existing stats() method) as gauges prefix_<key>, read at scrape time."""
+    _gauges.append((prefix, help_text, collect))
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for prefix, help_text, collect in _gauges:
+        try:
+            values = collect()
+        except Exception:
+            continue
+        for key, value in values.items():
+            name = f"{prefix}_{key}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {float(value):g}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- shared metrics ----------
+handler_seconds = histogram("bot_handler_seconds", "Handler run time.", ("module", "handler"))
+handler_errors = counter("bot_handler_errors_total", "Handlers that raised.", ("module", "handler"))
+api_calls = counter("bot_api_calls_total", "Outbound Bot API calls.", ("method", "outcome"))
+
+
+def handler_label(handler) -> str:
+    """/command for command handlers, else the callback's name."""
+    if isinstance(handler, CommandHandler) and handler.commands:
+        return "/" + sorted(handler.commands)[0]
+    return getattr(handler.callback, "__name__", type(handler).__name__)
+
+
+def instrument(handler, module: str):
+    """Time handler.callback and count its errors, labeled by module and handler."""
+    callback = handler.callback
+    label = handler_label(handler)
+
+    async def timed(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise  # control flow, not a failure
+        except Exception:
+            handler_errors.inc(module, label)
+            raise
+        finally:
+            handler_seconds.observe(time.perf_counter() - started, module, label)
+
+    timed.__name__ = getattr(callback, "__name__", "handler")
+    timed.__wrapped__ = callback
+    handler.callback = timed
+
+
+# ---------- HTTP endpoint ----------
+_server: Optional[asyncio.AbstractServer] = None
+
+
+async def _serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass  # headers are not needed
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        writer.close()
+
+
+@on_startup
+async def _start_server(app):
+    global _server
+    if not config.METRICS_PORT:
+        return
+    try:
+        _server = await asyncio.start_server(_serve, config.METRICS_LISTEN, config.METRICS_PORT)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started: {e}")
+    else:
+        print(f"📈 Metrics on http://{config.METRICS_LISTEN}:{config.METRICS_PORT}/metrics")
+
+
+@on_shutdown
+async def _stop_server(app):
+    global _server
+    if _server is not None:
+        _server.close()
+        await _server.wait_closed()
+        _server = None
@@ -0,0 +1,45 @@
+# core/migrate.py
+# One-shot migration of data/*.json into the SQLite store.
+#
+#   python -m core.migrate [--db data/bot.db] [--data-dir data]
+#
+# Then set STORAGE_BACKEND=sqlite in .env. The JSON files are left untouched.
+import argparse
+import glob
+import os
+
+from core import config
+from core.storage import _read_json
+
+# stores that hold a dict per chat and get one row per item
+NESTED_STORES = {"filters", "warnings"}
+
+
+def migrate(data_dir: str, db_path: str) -> dict:
+    config.SQLITE_PATH = db_path
+    from core.sqlite_store import SqliteStore
+
+    counts = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        data = _read_json(path)
+        store = SqliteStore(name, nested=name in NESTED_STORES, max_cached=len(data) + 1)
+        for key, value in data.items():
+            store.set(key, value)
+        store.flush()
+        counts[name] = len(data)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy data/*.json into the SQLite store.")
+    parser.add_argument("--data-dir", default=config.DATA_DIR)
+    parser.add_argument("--db", default=config.SQLITE_PATH)
+    args = parser.parse_args()
+    for name, count in migrate(args.data_dir, args.db).items():
+        print(f"✅ {name}: {count} chats")
+    print(f"Done. Set STORAGE_BACKEND=sqlite to use {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+# core/patterns.py
+# Per-chat filter matching: plain substrings, whole words and regexes.
+#
+# Plain triggers go through the Aho-Corasick TriggerMatcher. Word triggers, and
+# separately regex triggers, are compiled into one alternation each, so a message that
+# matches none of them costs a single regex search. Only on a hit are the earlier
+# filters checked one by one, to keep "first filter (in the order they were added) wins".
+#
+# Word triggers are escaped literals and can't backtrack: they match in-process.
+# User regexes are checked before they are accepted (length, nested quantifiers,
+# alternation inside repeats, backreferences, named groups), and since Python's re
+# can't be interrupted they run in a RegexPool of worker processes: a worker that
+# takes longer than MATCH_TIMEOUT on a message is killed and replaced, and only the
+# first MAX_SCAN_LENGTH characters of a message are searched. A chat's updates run
+# one at a time, so a slow regex holds up one worker, not the other chats.
+import asyncio
+import functools
+import itertools
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from core.ahocorasick import TriggerMatcher
+
+PLAIN = "plain"
+WORD = "word"
+REGEX = "regex"
+
+MAX_PATTERN_LENGTH = 200
+MAX_SCAN_LENGTH = 1000  # characters of a message the regex filters look at
+MATCH_TIMEOUT = 0.25  # seconds per message before the regex worker is killed
+WORKER_PATTERN_SETS = 256  # chats' regexes a worker keeps compiled
+MAX_OVERRUNS = 3  # timeouts before a chat's regex filters are suspended
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+_POSSESSIVE = getattr(sre_parse, "POSSESSIVE_REPEAT", None)  # a*+ and (?>...), 3.11+
+_ATOMIC = getattr(sre_parse, "ATOMIC_GROUP", None)
+_FORBIDDEN = {sre_parse.GROUPREF: "backreferences", sre_parse.GROUPREF_EXISTS: "conditional groups"}
+
+
+def _has_repeat(parsed) -> bool:
+    for op, av in parsed:
+        if op in _REPEATS and av[1] > 1:
+            return True
+        for sub in _subpatterns(op, av):
+            if _has_repeat(sub):
+                return True
+    return False
+
+
+def _subpatterns(op, av):
+    if op in _REPEATS or op is _POSSESSIVE:
+        yield av[2]
+    elif op is sre_parse.SUBPATTERN:
+        yield av[-1]
+    elif op is sre_parse.BRANCH:
+        yield from av[1]
+    elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        yield av[1]
+    elif op is _ATOMIC:
+        yield av
+
+
+def _has_branch(parsed) -> bool:
+    for op, av in parsed:
+        if op is sre_parse.BRANCH:
+            return True
+        for sub in _subpatterns(op, av):
+            if _has_branch(sub):
+                return True
+    return False
+
+
+def _check_tree(parsed):
+    for op, av in parsed:
+        if op in _FORBIDDEN:
+            raise ValueError(f"{_FORBIDDEN[op]} are not allowed")
+        if op in _REPEATS and av[1] > 1:
+            if _has_repeat(av[2]):
+                raise ValueError("nested quantifiers like (a+)+ can take forever to match")
+            # (a|aa)* backtracks through every split; single characters ([ab]*, (a|b)*) are fine
+            if _has_branch(av[2]):
+                raise ValueError("alternatives inside a repeated group like (a|aa)* can take forever to match")
+        for sub in _subpatterns(op, av):
+            _check_tree(sub)
+
+
+def check_regex(pattern: str) -> re.Pattern:
+    """Compile a user-supplied filter regex, or raise ValueError saying why it's refused."""
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise ValueError(f"pattern is longer than {MAX_PATTERN_LENGTH} characters")
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        raise ValueError(f"invalid regex: {e}") from None
+    if parsed.state.flags & ~re.UNICODE:
+        # they would apply to every filter of the chat once combined; (?s:...) style is fine
+        raise ValueError("global flags like (?i) are not allowed, matching is case-insensitive already")
+    if parsed.state.groupdict:
+        # all filters of a chat share one pattern, where the names would collide
+        raise ValueError("named groups are not allowed, use (...) or (?:...)")
+    _check_tree(parsed)
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def word_regex(word: str) -> str:
+    # \b misbehaves around non-word characters ("c++"), so check the neighbours instead
+    return rf"(?<!\w){re.escape(word)}(?!\w)"
+
+
+# ---------- matching ----------
+@functools.lru_cache(maxsize=1024)
+def _compile(source: str) -> re.Pattern:
+    return re.compile(source, re.IGNORECASE)
+
+
+def scan(combined: Optional[str], singles: Tuple[str, ...], text: str) -> int:
+    """
+    Index of the first of `singles` that matches text, or -1. `combined` is all of
+    them as one alternation of groups f0, f1... (None: search them one by one).
+    """
+    if combined is None:
+        for i, source in enumerate(singles):
+            if _compile(source).search(text):
+                return i
+        return -1
+    m = _compile(combined).search(text)
+    if m is None:
+        return -1
+    found = int(m.lastgroup[1:])
+    # the combined search found *a* match; earlier filters may match later in the text
+    for i in range(min(found, len(singles))):
+        if _compile(singles[i]).search(text):
+            return i
+    return found if found < len(singles) else -1
+
+
+_tokens = itertools.count(1)
+
+
+class _Alternation:
+    """Word or regex triggers of one chat, by rank, as scan() arguments."""
+    __slots__ = ("token", "sources", "keys", "combined")
+
+    def __init__(self, entries: List[Tuple[int, str, str]]):
+        entries.sort()
+        self.token = str(next(_tokens))  # names this exact set in the workers
+        self.sources = tuple(source for _, _, source in entries)
+        self.keys = [(rank, key) for rank, key, _ in entries]
+        self.combined = None
+        if entries:
+            combined = "|".join(f"(?P<f{i}>{source})" for i, source in enumerate(self.sources))
+            try:
+                _compile(combined)
+                self.combined = combined
+            except re.error:
+                pass  # e.g. named groups stored before they were refused: search one by one
+
+    def first_rank(self) -> Optional[int]:
+        return self.keys[0][0] if self.keys else None
+
+
+# ---------- regex workers ----------
+def _serve():
+    """
+    Worker main loop, one JSON request per stdin line: [token, text] or, the first time
+    a set is used (the worker answers "?" to an unknown token), [token, text, combined,
+    singles]. The answer is scan()'s index.
+    """
+    sets: "OrderedDict[str, Tuple[Optional[str], Tuple[str, ...]]]" = OrderedDict()
+    sys.stdout.write("ready\n")
+    sys.stdout.flush()
+    for line in sys.stdin:
+        try:
+            request = json.loads(line)
+            token, text = request[0], request[1]
+            if len(request) > 2:
+                sets[token] = (request[2], tuple(request[3]))
+                while len(sets) > WORKER_PATTERN_SETS:
+                    sets.popitem(last=False)
+            patterns = sets.get(token)
+            if patterns is None:
+                answer = "?"
+            else:
+                sets.move_to_end(token)
+                answer = str(scan(patterns[0], patterns[1], text))
+        except Exception:
+            answer = "-1"
+        sys.stdout.write(answer + "\n")
+        sys.stdout.flush()
+
+
+class RegexWorker:
+    """One `python -m core.patterns` process."""
+
+    def __init__(self):
+        self._process: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "core.patterns", cwd=root,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+        await self._process.stdout.readline()  # "ready": startup isn't counted in the timeout
+
+    async def _ask(self, request: list, timeout: float) -> str:
+        self._process.stdin.write((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+        try:
+            await self._process.stdin.drain()
+            line = await asyncio.wait_for(self._process.stdout.readline(), timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            raise TimeoutError from None
+        if not line:
+            raise TimeoutError  # died
+        return line.decode().strip()
+
+    async def search(self, alternation: _Alternation, text: str, timeout: float) -> int:
+        """scan() in the worker; raises TimeoutError past the timeout (the worker is then unusable)."""
+        if self._process is None or self._process.returncode is not None:
+            await self.start()
+        answer = await self._ask([alternation.token, text], timeout)
+        if answer == "?":
+            answer = await self._ask([alternation.token, text, alternation.combined, alternation.sources], timeout)
+        return int(answer)
+
+    async def stop(self):
+        process, self._process = self._process, None
+        if process is not None:
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+
+
+class RegexPool:
+    """`size` workers; each search takes an idle one, a worker that timed out is replaced."""
+
+    def __init__(self, size: int = 2):
+        self.size = max(1, size)
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[RegexWorker] = []
+        self._restarts: set = set()
+
+    async def search(self, alternation: _Alternation, text: str, timeout: float = None) -> int:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._workers = [RegexWorker() for _ in range(self.size)]
+            for worker in self._workers:
+                self._idle.put_nowait(worker)
+        idle = self._idle
+        worker = await idle.get()
+        try:
+            return await worker.search(alternation, text, timeout or MATCH_TIMEOUT)
+        except BaseException:
+            # killed and restarted in the background, back in the pool once it's up
+            task = asyncio.ensure_future(self._replace(worker, idle))
+            self._restarts.add(task)
+            task.add_done_callback(self._restarts.discard)
+            worker = None
+            raise
+        finally:
+            if worker is not None:
+                idle.put_nowait(worker)
+
+    async def _replace(self, worker: RegexWorker, idle: asyncio.Queue):
+        await worker.stop()
+        try:
+            await worker.start()
+        except Exception as e:
+            print(f"⚠️ Could not restart a regex worker: {e}")
+        idle.put_nowait(worker)
+
+    async def stop(self):
+        await asyncio.gather(*self._restarts, return_exceptions=True)  # a cancelled spawn would leak
+        for worker in self._workers:
+            await worker.stop()
+        self._idle = None
+        self._workers = []
+
+
+class FilterMatcher:
+    """
+    All filters of one chat. Triggers are (key, kind) in the order they were added;
+    `await first_match(text)` returns the key of the earliest one that matches.
+    Regex triggers are searched in `pool`.
+    """
+
+    def __init__(self, triggers: List[Tuple[str, str]] = (), pool: Optional[RegexPool] = None):
+        self.pool = pool
+        self._plain = TriggerMatcher()
+        self._rank: Dict[str, int] = {}
+        self._kind: Dict[str, str] = {}
+        self._next_rank = 0
+        self._words = _Alternation([])
+        self._regexes = _Alternation([])
+        self._dirty = False
+        self.overruns = 0
+        for key, kind in triggers:
+            self.add(key, kind)
+
+    @property
+    def suspended(self) -> bool:
+        """Regex filters stopped after repeatedly running into the timeout."""
+        return self.overruns >= MAX_OVERRUNS
+
+    def add(self, key: str, kind: str = PLAIN):
+        """Add a trigger, or change an existing one's kind (it keeps its place in the order)."""
+        old = self._kind.get(key)
+        if old == kind:
+            return
+        if old is None:
+            self._rank[key] = self._next_rank
+            self._next_rank += 1
+        elif old == PLAIN:
+            self._plain.remove(key)
+        if kind != PLAIN or old is not None:
+            self._dirty = True
+        self._kind[key] = kind
+        if kind == PLAIN:
+            self._plain.add(key, self._rank[key])
+
+    def remove(self, key: str):
+        kind = self._kind.pop(key, None)
+        if kind is None:
+            return
+        del self._rank[key]
+        if kind == PLAIN:
+            self._plain.remove(key)
+        else:
+            self._dirty = True
+
+    def _build(self):
+        words, regexes = [], []
+        for key, kind in self._kind.items():
+            if kind == PLAIN:
+                continue
+            source = word_regex(key) if kind == WORD else key
+            try:
+                _compile(source)
+            except re.error:
+                continue  # stored before validation existed; never matches
+            (words if kind == WORD else regexes).append((self._rank[key], key, source))
+        self._words = _Alternation(words)
+        self._regexes = _Alternation(regexes)
+        self.overruns = 0
+        self._dirty = False
+
+    async def first_match(self, text: str) -> Optional[str]:
+        best_key = self._plain.first_match(text.lower())
+        best = self._rank[best_key] if best_key is not None else self._next_rank
+
+        if self._dirty:
+            self._build()
+        words = self._words
+        if words.keys and words.first_rank() < best:
+            index = scan(words.combined, words.sources, text)
+            if index >= 0 and words.keys[index][0] < best:
+                best, best_key = words.keys[index]
+        regexes = self._regexes
+        if not regexes.keys or regexes.first_rank() > best or self.suspended or self.pool is None:
+            return best_key
+        try:
+            index = await self.pool.search(regexes, text[:MAX_SCAN_LENGTH])
+        except TimeoutError:
+            self.overruns += 1
+            return best_key
+        if index >= 0 and regexes.keys[index][0] < best:
+            best_key = regexes.keys[index][1]
+        return best_key
+
+
+if __name__ == "__main__":
+    _serve()
@@ -0,0 +1,146 @@
+# core/profiling.py
+# On-demand cProfile sessions of the update pipeline (owner's /profile command).
+#
+# Handlers, the rate limiter and storage all run on the event loop thread, so one
+# cProfile.Profile enabled there sees the whole hot path. A session stops after a
+# number of seconds or updates, writes a report to DATA_DIR and hands back a summary.
+# The per-handler breakdown comes from core.metrics' handler histogram over the window.
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core import config, metrics
+
+MAX_SECONDS = 300
+MAX_UPDATES = 100000
+TOP_FUNCTIONS = 40  # in the report file
+SUMMARY_FUNCTIONS = 8  # in the chat summary
+
+Done = Callable[[str], Awaitable[None]]
+
+
+class Session:
+    def __init__(self, seconds: Optional[float], updates: Optional[int], done: Done):
+        self.seconds = seconds
+        self.updates = updates
+        self.done = done
+        self.seen = 0
+        self.started = time.perf_counter()
+        self.profile = cProfile.Profile()
+        self.handlers_before = metrics.handler_seconds.totals()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+_session: Optional[Session] = None
+
+
+def active() -> bool:
+    return _session is not None
+
+
+def start(done: Done, seconds: Optional[float] = None, updates: Optional[int] = None):
+    """Profile until `seconds` passed or `updates` updates arrived; done(summary) is awaited after."""
+    global _session
+    if _session is not None:
+        raise RuntimeError("a profiling session is already running")
+    session = Session(seconds, updates, done)
+    loop = asyncio.get_running_loop()
+    # a time limit always applies, so an update-count session on a quiet bot still ends
+    session.timer = loop.call_later(min(seconds or MAX_SECONDS, MAX_SECONDS), _finish_soon, loop)
+    _session = session
+    session.profile.enable()
+
+
+def on_update():
+    """Count an update for update-limited sessions (called first thing per update)."""
+    session = _session
+    if session is None or not session.updates:
+        return
+    session.seen += 1
+    if session.seen == session.updates:
+        # let this update's handlers run inside the window too
+        loop = asyncio.get_running_loop()
+        loop.call_soon(_finish_soon, loop)
+
+
+def _finish_soon(loop: asyncio.AbstractEventLoop):
+    global _session
+    session = _session
+    if session is None:
+        return
+    _session = None
+    session.profile.disable()
+    if session.timer is not None:
+        session.timer.cancel()
+    loop.create_task(_report(session))
+
+
+def _handler_breakdown(session: Session) -> List[Tuple[str, int, float]]:
+    rows = []
+    for labels, (count, total) in metrics.handler_seconds.totals().items():
+        before_count, before_total = session.handlers_before.get(labels, (0, 0.0))
+        if count > before_count:
+            rows.append((f"{labels[0]}:{labels[1]}", count - before_count, total - before_total))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows
+
+
+def _write_report(session: Session, elapsed: float, handlers: List[Tuple[str, int, float]]) -> Tuple[str, List[str]]:
+    os.makedirs(config.DATA_DIR, exist_ok=True)
+    base = os.path.join(config.DATA_DIR, time.strftime("profile-%Y%m%d-%H%M%S"))
+    session.profile.dump_stats(base + ".prof")  # for snakeviz / pstats
+
+    out = io.StringIO()
+    stats = pstats.Stats(session.profile, stream=out)
+    out.write(f"Profile: {elapsed:.1f}s, {session.seen} updates counted\n\nPer handler (calls, total s, mean ms):\n")
+    for name, calls, total in handlers:
+        out.write(f"  {name:<40} {calls:>8} {total:>10.4f} {total / calls * 1000:>10.3f}\n")
+    out.write("\n")
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+
+    top = []
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)  # (cc, nc, tt, ct, callers)
+    for (filename, lineno, func), (_, calls, _, cumulative, _) in entries:
+        if filename == "~" or "asyncio" in filename or filename.endswith(("cProfile.py", "metrics.py")):
+            continue  # builtins, the loop and the metrics wrappers top the list without saying anything
+        top.append(f"{cumulative:.3f}s {os.path.basename(filename)}:{lineno} {func} ({calls})")
+        if len(top) >= SUMMARY_FUNCTIONS:
+            break
+    return base + ".txt", top
+
+
+async def _report(session: Session):
+    elapsed = time.perf_counter() - session.started
+    handlers = _handler_breakdown(session)
+    loop = asyncio.get_running_loop()
+    try:
+        path, top = await loop.run_in_executor(None, _write_report, session, elapsed, handlers)
+    except Exception as e:
+        await session.done(f"⚠️ Profiling finished but the report could not be written: {e}")
+        return
+    lines = [f"⏱ Profiled {elapsed:.1f}s, {session.seen} updates. Report: {path}", "", "Top by cumulative time:"]
+    lines += top or ["(nothing ran)"]
+    lines += ["", "Per handler (calls / total / mean):"]
+    lines += [f"{name}: {calls} / {total * 1000:.1f}ms / {total / calls * 1000:.2f}ms"
+              for name, calls, total in handlers[:10]] or ["(no handler ran)"]
+    await session.done("\n".join(lines))
+
+
+def parse_limit(arg: str) -> Dict[str, float]:
+    """'30s' / '30' -> seconds, '500u' -> updates. Raises ValueError."""
+    arg = arg.strip().lower()
+    if arg.endswith("u"):
+        value = int(arg[:-1])
+        if not 0 < value <= MAX_UPDATES:
+            raise ValueError(f"updates must be 1..{MAX_UPDATES}")
+        return {"updates": value}
+    value = float(arg[:-1] if arg.endswith("s") else arg)
+    if not 0 < value <= MAX_SECONDS:
+        raise ValueError(f"seconds must be up to {MAX_SECONDS}")
+    return {"seconds": value}
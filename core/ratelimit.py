@@ -0,0 +1,208 @@
+# core/ratelimit.py
+# Outbound Bot API scheduler, plugged into ApplicationBuilder().rate_limiter().
+#
+# Every API call (except getUpdates, which PTB never routes here) takes a token from
+# a global bucket (RATE_GLOBAL_PER_SEC). Message-sending calls additionally take one
+# from their chat's bucket (RATE_GROUP_PER_MIN for groups, RATE_PRIVATE_PER_SEC for
+# private chats). When a bucket is empty, callers queue by priority, so bans, mutes
+# and deletions go out ahead of greetings and filter replies. RetryAfter pauses the
+# affected bucket and the call is retried.
+import asyncio
+import contextlib
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from core import config
+from core.metrics import api_calls
+
+# priorities: lower goes first
+HIGH = 0  # moderation actions
+NORMAL = 1  # command replies, everything else
+LOW = 2  # greetings, filter replies
+
+MODERATION_ENDPOINTS = {
+    "banChatMember", "unbanChatMember", "restrictChatMember", "promoteChatMember",
+    "deleteMessage", "deleteMessages", "banChatSenderChat", "declineChatJoinRequest",
+}
+UNLIMITED_ENDPOINTS = {"getMe", "setWebhook", "deleteWebhook", "getWebhookInfo", "logOut", "close"}
+
+_priority: ContextVar[Optional[int]] = ContextVar("rate_priority", default=None)
+
+
+@contextlib.contextmanager
+def priority(level: int):
+    """Send the API calls made inside the block at `level` (e.g. LOW for greetings)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _is_message_endpoint(endpoint: str) -> bool:
+    return endpoint.startswith(("send", "copyMessage", "forwardMessage"))
+
+
+class PriorityGate:
+    """Token bucket whose waiters are served lowest priority value first, FIFO within a level."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "_heap", "_seq", "_task")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._heap: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float):
+        """Telegram told us to back off: no tokens for `seconds`."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def idle(self) -> bool:
+        self._refill()
+        return not self._heap and self.tokens >= self.burst
+
+    async def acquire(self, level: int):
+        self._refill()
+        if not self._heap and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (level, next(self._seq), fut))
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+        await fut
+
+    async def _drain(self):
+        try:
+            while self._heap:
+                self._refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    continue
+                _, _, fut = heapq.heappop(self._heap)
+                if fut.done():
+                    continue  # caller gave up (cancelled)
+                self.tokens -= 1
+                fut.set_result(None)
+        finally:
+            self._task = None
+
+
+class PriorityRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """
+    rate_limit_args (optional, per call): {"priority": HIGH/NORMAL/LOW}.
+    Without it the priority comes from priority() blocks, then from the endpoint.
+    """
+
+    def __init__(self, global_per_sec: float = None, group_per_min: float = None,
+                 private_per_sec: float = None, max_retries: int = None):
+        self.global_per_sec = global_per_sec or config.RATE_GLOBAL_PER_SEC
+        self.group_per_min = group_per_min or config.RATE_GROUP_PER_MIN
+        self.private_per_sec = private_per_sec or config.RATE_PRIVATE_PER_SEC
+        self.max_retries = config.RATE_MAX_RETRIES if max_retries is None else max_retries
+        self._global = PriorityGate(self.global_per_sec, self.global_per_sec)
+        self._chats: Dict[Any, PriorityGate] = {}
+        self.requests = 0
+        self.retry_afters = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _chat_gate(self, chat_id) -> PriorityGate:
+        gate = self._chats.get(chat_id)
+        if gate is None:
+            if len(self._chats) >= 10000:
+                # forget chats whose bucket is full again
+                for key in [k for k, g in self._chats.items() if g.idle()]:
+                    del self._chats[key]
+            if str(chat_id).startswith("-"):
+                gate = PriorityGate(self.group_per_min / 60, self.group_per_min)
+            else:
+                gate = PriorityGate(self.private_per_sec, self.private_per_sec)
+            self._chats[chat_id] = gate
+        return gate
+
+    def _priority_for(self, endpoint: str, rate_limit_args) -> int:
+        if isinstance(rate_limit_args, dict) and "priority" in rate_limit_args:
+            return rate_limit_args["priority"]
+        level = _priority.get()
+        if level is not None:
+            return level
+        return HIGH if endpoint in MODERATION_ENDPOINTS else NORMAL
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        self.requests += 1
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await self._call(endpoint, callback, args, kwargs)
+
+        level = self._priority_for(endpoint, rate_limit_args)
+        chat_id = data.get("chat_id")
+        chat_gate = self._chat_gate(chat_id) if chat_id is not None and _is_message_endpoint(endpoint) else None
+
+        for attempt in range(self.max_retries + 1):
+            if chat_gate is not None:
+                await chat_gate.acquire(level)
+            await self._global.acquire(level)
+            try:
+                return await self._call(endpoint, callback, args, kwargs)
+            except RetryAfter as e:
+                self.retry_afters += 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                if chat_gate is not None:
+                    chat_gate.pause(float(delay))  # later messages to this chat wait too
+                else:
+                    await asyncio.sleep(float(delay))
+
+    @staticmethod
+    async def _call(endpoint: str, callback, args, kwargs):
+        try:
+            result = await callback(*args, **kwargs)
+        except RetryAfter:
+            api_calls.inc(endpoint, "retry_after")
+            raise
+        except Exception:
+            api_calls.inc(endpoint, "error")
+            raise
+        api_calls.inc(endpoint, "ok")
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        depths = [gate.depth() for gate in self._chats.values()]
+        return {
+            "requests": self.requests,
+            "retry_after": self.retry_afters,
+            "global_queue": self._global.depth(),
+            "chat_queue": sum(depths),
+            "max_chat_queue": max(depths, default=0),
+            "tracked_chats": len(self._chats),
+        }
+
+
+rate_limiter = PriorityRateLimiter()
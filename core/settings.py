@@ -0,0 +1,97 @@
+# core/settings.py
+# Per-chat settings as typed objects, parsed once per change instead of per message.
+#
+# A module describes its settings with a ChatSettings subclass: DEFAULTS is the stored
+# dict format (unchanged, so existing data keeps working), __slots__ lists those keys
+# plus any derived fields, which parse() fills in. A SettingsRegistry sits in front of
+# the module's store:
+#
+#   flood_settings = SettingsRegistry(open_store("antiflood"), FloodSettings)
+#   s = flood_settings.get(chat_id)     # cached object, attribute access only
+#   flood_settings.replace(chat_id, d)  # persist + new object with a new version
+#
+# Objects are never changed in place. Code that keeps one around (per-chat runtime
+# state) compares s.version with registry.version(chat_id) to know it is stale, or
+# just calls registry.refresh(chat_id, s).
+import copy
+import itertools
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Optional, Type, TypeVar
+
+from core import config
+from core.storage import BaseStore
+
+# shared by all registries: an object parsed again (after eviction) never gets an old number
+_versions = itertools.count(1)
+
+
+class ChatSettings:
+    __slots__ = ("version",)
+    DEFAULTS: Dict[str, Any] = {}
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any], version: int = 0):
+        obj = cls.__new__(cls)
+        for name, default in cls.DEFAULTS.items():
+            setattr(obj, name, raw.get(name, default) if raw else default)
+        obj.version = version
+        obj.parse()
+        return obj
+
+    def parse(self):
+        """Fill derived slots from the stored ones (runs once per change)."""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A copy in the stored format, safe to edit and hand back to replace()."""
+        return {name: copy.deepcopy(getattr(self, name)) for name in self.DEFAULTS}
+
+
+S = TypeVar("S", bound=ChatSettings)
+
+
+class SettingsRegistry(Generic[S]):
+    """Parsed settings of the most recently used chats, in front of one store."""
+
+    def __init__(self, store: BaseStore, cls: Type[S], max_cached: int = None):
+        self.store = store
+        self.cls = cls
+        self.max_cached = max_cached or config.SETTINGS_CACHE_CHATS
+        self._cache: "OrderedDict[str, S]" = OrderedDict()
+
+    def get(self, chat_id) -> S:
+        key = str(chat_id)
+        settings = self._cache.get(key)
+        if settings is None:
+            settings = self._cache[key] = self.cls.from_dict(self.store.get(key), next(_versions))
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return settings
+
+    def version(self, chat_id) -> int:
+        """Version of the chat's current object; 0 if none is cached (anything held is stale)."""
+        settings = self._cache.get(str(chat_id))
+        return settings.version if settings is not None else 0
+
+    def refresh(self, chat_id, held: Optional[S]) -> S:
+        """`held` if it is still the chat's current object, else the current one."""
+        if held is not None and held.version == self.version(chat_id):
+            return held
+        return self.get(chat_id)
+
+    def replace(self, chat_id, raw: Dict[str, Any]) -> S:
+        """Store new settings for a chat (written behind) and return the new object."""
+        settings = self.cls.from_dict(raw, next(_versions))
+        self.store.set(chat_id, settings.to_dict())
+        self._cache[str(chat_id)] = settings
+        self._cache.move_to_end(str(chat_id))
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return settings
+
+    def update(self, chat_id, **changes) -> S:
+        return self.replace(chat_id, {**self.get(chat_id).to_dict(), **changes})
+
+    def __len__(self) -> int:
+        return len(self._cache)
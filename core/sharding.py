@@ -0,0 +1,266 @@
+# core/sharding.py
+# Sharded mode (SHARDS > 1 in .env): spread chats over several worker processes.
+#
+# The front process only receives updates (polling or webhook, as configured) and
+# hands each one to worker chat_key(update) % SHARDS over a multiprocessing queue.
+# Every worker is a complete bot (all modules, main.build_application) with its own
+# DATA_DIR/shard-<n> data directory, so antiflood state, filters, warnings,
+# settings... of a chat live in exactly one process, and a chat's updates stay in order.
+# Workers share Telegram's global send limit: each gets RATE_GLOBAL_PER_SEC / SHARDS.
+# A worker that dies is restarted the next time an update is routed to it (at most
+# once per RESTART_BACKOFF if it keeps dying); updates it had already taken are lost.
+#
+# Bot-wide data (the global ban list) is the exception. The owner's commands that
+# change it (BROADCAST_COMMANDS) go to every worker: the chat's own shard handles them
+# as usual, the others get a copy and apply it without replying (is_replica()).
+# split_data copies such stores (GLOBAL_STORES) to every shard instead of splitting them.
+#
+# Changing SHARDS moves chats between shards. Re-split the data first, from the
+# single-process layout (data/*.json):
+#
+#   python -m core.sharding split --shards 4 [--data-dir data]
+#
+# This module must not import core.config (or anything importing it) at the top:
+# workers get their environment before the config is read.
+import argparse
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, TypeHandler
+
+from core.updates import chat_key
+
+RequestFactory = Callable[[], Any]  # top-level callable returning a BaseRequest (picklable)
+ExitHook = Callable[[int, Any], Any]  # async hook(index, app) run in a worker before it shuts down
+
+BROADCAST_COMMANDS = {"gban", "ungban", "gbanimport"}
+GLOBAL_STORES = {"gbans.json"}
+
+MAX_REPLICAS = 1000
+RESTART_BACKOFF = 5.0  # seconds between restarts of a worker that keeps dying
+_replicas: Dict[int, None] = {}  # worker side: update ids received as a copy, oldest first
+
+
+def shard_of(key: Optional[int], shards: int) -> int:
+    """Shard owning chat (or user) `key`; updates without one go to shard 0."""
+    return 0 if key is None else key % shards
+
+
+def is_replica(update: Update) -> bool:
+    """True in a worker that got this update only to apply it (another shard replies)."""
+    return bool(_replicas) and update.update_id in _replicas
+
+
+def is_broadcast(update: Update, owner_id: Optional[int]) -> bool:
+    message = update.message
+    if owner_id is None or message is None or not message.text or not message.text.startswith("/"):
+        return False
+    if message.from_user is None or message.from_user.id != owner_id:
+        return False
+    command = message.text.split(None, 1)[0][1:].split("@", 1)[0].lower()
+    return command in BROADCAST_COMMANDS
+
+
+def _worker_env(index: int, shards: int, base: Dict[str, str]) -> Dict[str, str]:
+    data_dir = os.path.join(base.get("DATA_DIR", "data"), f"shard-{index}")
+    env = {
+        "DATA_DIR": data_dir,
+        "SQLITE_PATH": os.path.join(data_dir, "bot.db"),
+        "SHARDS": "1",  # a worker is a plain single-process bot
+        "SHARD_INDEX": str(index),
+        "RATE_GLOBAL_PER_SEC": str(float(base.get("RATE_GLOBAL_PER_SEC", "30")) / shards),
+    }
+    metrics_port = int(base.get("METRICS_PORT", "9100"))
+    env["METRICS_PORT"] = str(metrics_port + 1 + index if metrics_port else 0)
+    return env
+
+
+def worker_main(index: int, inbox, request_factory: Optional[RequestFactory] = None,
+                on_exit: Optional[ExitHook] = None):
+    """Entry point of a worker process."""
+    try:
+        asyncio.run(_worker(index, inbox, request_factory, on_exit))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C reaches the whole process group; the front sends the stop signal
+
+
+async def _worker(index: int, inbox, request_factory, on_exit):
+    import main  # reads core.config, which sees this worker's environment
+    from core import lifecycle
+
+    app = main.build_application(request=request_factory() if request_factory else None)
+    await app.initialize()
+    await lifecycle.run_startup(app)
+    await app.start()
+    print(f"✅ Shard {index} running (pid {os.getpid()}, data in {os.environ['DATA_DIR']})")
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, inbox.get)
+            if item is None:
+                break
+            raw, replica = item
+            update = Update.de_json(json.loads(raw), app.bot)
+            if replica:
+                _replicas[update.update_id] = None
+                if len(_replicas) > MAX_REPLICAS:
+                    del _replicas[next(iter(_replicas))]
+            await app.update_queue.put(update)
+    finally:
+        await app.stop()  # handles what's already queued first
+        if on_exit is not None:
+            await on_exit(index, app)
+        await lifecycle.run_shutdown(app)
+        await app.shutdown()
+
+
+class ShardRouter:
+    """Starts the workers and routes updates to them."""
+
+    def __init__(self, shards: int, request_factory: Optional[RequestFactory] = None,
+                 on_exit: Optional[ExitHook] = None, owner_id: Optional[int] = None):
+        self.shards = shards
+        self.request_factory = request_factory
+        self.on_exit = on_exit
+        self.owner_id = owner_id  # whose BROADCAST_COMMANDS go to every shard
+        # spawn: workers import everything fresh instead of inheriting the front's loop
+        self._ctx = multiprocessing.get_context("spawn")
+        self.inboxes = [self._ctx.Queue() for _ in range(shards)]
+        self.workers: List[multiprocessing.Process] = []
+        self.routed = [0] * shards
+        self.restarts = [0] * shards
+        self._restarted_at = [float("-inf")] * shards
+        self._down = set()  # dead workers waiting out RESTART_BACKOFF
+        self._stopping = False
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        saved = dict(os.environ)
+        try:
+            # the child copies os.environ when it starts
+            os.environ.update(_worker_env(index, self.shards, saved))
+            worker = self._ctx.Process(target=worker_main, name=f"shard-{index}",
+                                       args=(index, self.inboxes[index], self.request_factory, self.on_exit))
+            worker.start()
+        finally:
+            os.environ.clear()
+            os.environ.update(saved)
+        return worker
+
+    def start(self):
+        self.workers = [self._spawn(index) for index in range(self.shards)]
+
+    def _supervise(self, index: int):
+        """Restart worker `index` if it died."""
+        worker = self.workers[index]
+        if self._stopping or worker.is_alive():
+            return
+        if index not in self._down:
+            print(f"⚠️ {worker.name} (pid {worker.pid}) died with exit code {worker.exitcode}; "
+                  f"updates it had taken are lost")
+            # it may have died holding the queue's read lock: the replacement gets a new one
+            self.inboxes[index] = self._ctx.Queue()
+            self._down.add(index)
+        now = time.monotonic()
+        if now - self._restarted_at[index] < RESTART_BACKOFF:
+            return  # keeps dying: updates wait in the new inbox
+        self._down.discard(index)
+        self._restarted_at[index] = now
+        self.restarts[index] += 1
+        self.workers[index] = self._spawn(index)
+        print(f"⚠️ Restarted {worker.name} (restart #{self.restarts[index]}, pid {self.workers[index].pid})")
+
+    def dispatch(self, update: Update):
+        index = shard_of(chat_key(update), self.shards)
+        self.routed[index] += 1
+        raw = update.to_json()
+        broadcast = is_broadcast(update, self.owner_id)
+        for other in (range(self.shards) if broadcast else (index,)):
+            self._supervise(other)
+            self.inboxes[other].put((raw, other != index))
+
+    def stop(self, timeout: float = 30.0):
+        self._stopping = True
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                print(f"⚠️ {worker.name} did not stop in {timeout:.0f}s, terminating")
+                worker.terminate()
+                worker.join()
+
+
+def build_front(token: str, router: ShardRouter, request=None):
+    """Application that loads no modules and forwards every update to its shard."""
+
+    async def route(update: Update, context):
+        router.dispatch(update)
+
+    async def start_workers(app):
+        router.start()
+
+    async def stop_workers(app):
+        # blocking join: nothing else runs in the front anyway
+        await asyncio.get_running_loop().run_in_executor(None, router.stop)
+
+    builder = ApplicationBuilder().token(token).post_init(start_workers).post_shutdown(stop_workers)
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    app = builder.build()
+    app.add_handler(TypeHandler(Update, route))
+    return app
+
+
+# ---------- data split ----------
+def _chat_of(key: str) -> Optional[int]:
+    try:
+        return int(key)
+    except ValueError:
+        return None
+
+
+def split_data(data_dir: str, shards: int) -> Dict[str, List[int]]:
+    """
+    Copy data_dir/*.json into data_dir/shard-<n>/, each chat to its shard, and
+    GLOBAL_STORES whole to every shard. Returns counts.
+    """
+    counts = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        name = os.path.basename(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if name in GLOBAL_STORES:
+            parts: List[Dict[str, Any]] = [data] * shards
+        else:
+            parts = [{} for _ in range(shards)]
+            for key, value in data.items():
+                parts[shard_of(_chat_of(key), shards)][key] = value
+        for index, part in enumerate(parts):
+            shard_dir = os.path.join(data_dir, f"shard-{index}")
+            os.makedirs(shard_dir, exist_ok=True)
+            with open(os.path.join(shard_dir, name), "w", encoding="utf-8") as f:
+                json.dump(part, f, ensure_ascii=False, separators=(",", ":"))
+        counts[name] = [len(part) for part in parts]
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded mode tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    split = sub.add_parser("split", help="split data/*.json into per-shard data directories")
+    split.add_argument("--shards", type=int, required=True)
+    split.add_argument("--data-dir", default=os.getenv("DATA_DIR", "data"))
+    args = parser.parse_args()
+    for name, counts in split_data(args.data_dir, args.shards).items():
+        print(f"✅ {name}: " + " | ".join(f"shard {i}: {n}" for i, n in enumerate(counts)))
+    print("Done. For STORAGE_BACKEND=sqlite run core.migrate per shard directory.")
+
+
+if __name__ == "__main__":
+    main()
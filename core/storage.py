@@ -0,0 +1,265 @@
+# core/storage.py
+# Write-behind persistence shared by the modules.
+#
+# Each module opens a store with open_store(name) and reads/writes per-chat values
+# through it. Handlers mutate values in memory and call touch(); changes are written
+# once per STORAGE_FLUSH_DELAY no matter how many happened in between.
+#
+# Backends (STORAGE_BACKEND in .env):
+#  - json   : one file per store in DATA_DIR, rewritten atomically (temp file + rename)
+#  - sqlite : one row per chat (or per chat item for nested stores), see core/sqlite_store.py
+import abc
+import asyncio
+import atexit
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterator, List, Optional
+
+from core import config
+from core.lifecycle import on_shutdown
+
+_stores: List["BaseStore"] = []
+_flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+def _read_json(path: str) -> Dict[str, Any]:
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read {path}: {e}")
+        return {}
+
+
+def _atomic_write(path: str, payload: str):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class BaseStore(abc.ABC):
+    """
+    Per-chat values keyed by str(chat_id).
+
+    Nested stores hold a dict per chat (e.g. user_id -> warning record); passing the
+    inner key to touch() lets row-based backends write just that item.
+    """
+
+    executor: Optional[Executor] = None  # where blocking writes run (None = default pool)
+
+    def __init__(self, name: str, nested: bool = False):
+        self.name = name
+        self.nested = nested
+        self.load_seconds = 0.0  # time spent reading from disk so far (startup report)
+        self._write_lock: Optional[asyncio.Lock] = None
+        _stores.append(self)
+
+    # ----- access (implemented by backends) -----
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        ...
+
+    @abc.abstractmethod
+    def set(self, key, value):
+        ...
+
+    @abc.abstractmethod
+    def pop(self, key, default=None):
+        ...
+
+    @abc.abstractmethod
+    def keys(self) -> Iterator[str]:
+        ...
+
+    @abc.abstractmethod
+    def touch(self, key=None, item=None):
+        """Mark a chat's value (or one item of it) as changed."""
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def setdefault(self, key, default):
+        value = self.get(key)
+        if value is None:
+            value = default
+            self.set(key, value)
+        return value
+
+    def items(self):
+        for key in list(self.keys()):
+            value = self.get(key)
+            if value is not None:
+                yield key, value
+
+    # ----- persistence (implemented by backends) -----
+    @abc.abstractmethod
+    def _collect(self):
+        """Take the pending changes as a payload for _write(), or None if clean."""
+
+    @abc.abstractmethod
+    def _write(self, payload):
+        """Blocking write; runs on self.executor, or inline from flush()."""
+
+    @abc.abstractmethod
+    def _restore(self, payload):
+        """Put a failed payload's changes back so the next flush retries them."""
+
+    def _finished(self, payload):
+        """Called once a payload's write is over, whether it succeeded or was restored."""
+
+    def flush(self):
+        """Write synchronously (shutdown / no event loop). On failure the changes stay pending."""
+        payload = self._collect()
+        if payload is not None:
+            try:
+                self._write(payload)
+            except BaseException:
+                self._restore(payload)
+                raise
+            finally:
+                self._finished(payload)
+
+    async def flush_async(self):
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:  # keep writes of one store in order
+            payload = self._collect()  # taken on the loop so handlers can't mutate mid-dump
+            if payload is None:
+                return
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self.executor, self._write, payload)
+            except Exception as e:
+                self._restore(payload)
+                _schedule_flush()  # retry after STORAGE_FLUSH_DELAY even if nothing else changes
+                print(f"⚠️ Failed to write store {self.name}: {e}")
+            finally:
+                self._finished(payload)
+
+
+class JsonStore(BaseStore):
+    """
+    A JSON object keyed by str(chat_id), kept in memory and written behind.
+    The file is read on first access, not when the module opening the store is imported.
+    """
+
+    def __init__(self, name: str, nested: bool = False, path: Optional[str] = None):
+        super().__init__(name, nested)
+        self.path = path or os.path.join(config.DATA_DIR, f"{name}.json")
+        self._data: Optional[Dict[str, Any]] = None
+        self._dirty = False
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        if self._data is None:
+            started = time.perf_counter()
+            self._data = _read_json(self.path)
+            self.load_seconds += time.perf_counter() - started
+        return self._data
+
+    def get(self, key, default=None):
+        return self.data.get(str(key), default)
+
+    def set(self, key, value):
+        self.data[str(key)] = value
+        self.touch()
+
+    def pop(self, key, default=None):
+        value = self.data.pop(str(key), default)
+        self.touch()
+        return value
+
+    def keys(self):
+        return iter(list(self.data))
+
+    def touch(self, key=None, item=None):
+        self._dirty = True
+        _schedule_flush()
+
+    def _collect(self):
+        if not self._dirty or self._data is None:
+            return None
+        self._dirty = False
+        return json.dumps(self._data, ensure_ascii=False, separators=(",", ":"))
+
+    def _write(self, payload: str):
+        _atomic_write(self.path, payload)
+
+    def _restore(self, payload):
+        self._dirty = True
+
+
+def open_stores() -> List[BaseStore]:
+    """Every store opened so far, in opening order."""
+    return list(_stores)
+
+
+def open_store(name: str, nested: bool = False) -> BaseStore:
+    """Open the named store on the configured backend."""
+    if config.STORAGE_BACKEND == "sqlite":
+        from core.sqlite_store import SqliteStore
+        return SqliteStore(name, nested=nested)
+    return JsonStore(name, nested=nested)
+
+
+def _schedule_flush():
+    global _flush_handle
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush_all()  # no loop (scripts, tests): write through
+        return
+    if _flush_handle is None:
+        _flush_handle = loop.call_later(config.STORAGE_FLUSH_DELAY, _start_flush, loop)
+
+
+def _start_flush(loop: asyncio.AbstractEventLoop):
+    global _flush_handle
+    _flush_handle = None
+    loop.create_task(flush_all_async())
+
+
+async def flush_all_async():
+    for store in list(_stores):
+        await store.flush_async()
+
+
+def flush_all():
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    for store in list(_stores):
+        try:
+            store.flush()
+        except Exception as e:
+            print(f"⚠️ Failed to write store {store.name}: {e}")
+
+
+@on_shutdown
+async def _flush_on_shutdown(app):
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    await flush_all_async()  # waits for in-flight writes, keeps file order
+
+
+atexit.register(flush_all)
@@ -0,0 +1,79 @@
+# core/updates.py
+# Concurrent update processing that keeps each chat's updates in order.
+#
+# Plugged into ApplicationBuilder().concurrent_updates(). Updates of different chats
+# run in parallel (at most UPDATE_CONCURRENCY handlers at once); updates of the same
+# chat run one after another in arrival order, so per-chat state such as antiflood's
+# consecutive counter sees messages exactly as it did with sequential processing.
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# updates allowed to wait inside the processor per running slot, before PTB queues them
+BACKLOG_FACTOR = 64
+
+
+def chat_key(update: object) -> Optional[int]:
+    """What to serialize on: the chat, else the user (inline queries...), else nothing."""
+    if isinstance(update, Update):
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, concurrency: int):
+        super().__init__(max(1, concurrency) * BACKLOG_FACTOR)
+        self.concurrency = max(1, concurrency)
+        self._running = asyncio.BoundedSemaphore(self.concurrency)
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        self._pending: Dict[Any, int] = {}  # chat -> updates waiting or running
+        self.processed = 0
+        self.max_chat_depth = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        key = chat_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            self.processed += 1
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()  # FIFO: arrival order within the chat
+        depth = self._pending[key] = self._pending.get(key, 0) + 1
+        if depth > self.max_chat_depth:
+            self.max_chat_depth = depth
+        try:
+            async with lock:
+                async with self._running:
+                    await coroutine
+        finally:
+            self.processed += 1
+            depth = self._pending[key] - 1
+            if depth:
+                self._pending[key] = depth
+            else:
+                del self._pending[key]
+                del self._locks[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "active_chats": len(self._pending),
+            "queued": sum(self._pending.values()),
+            "max_chat_queue": max(self._pending.values(), default=0),
+            "max_chat_queue_seen": self.max_chat_depth,
+        }
@@ -1,14 +1,15 @@
-import importlib
-import os
 from telegram.ext import ApplicationBuilder, ContextTypes
 from telegram import Update
-from dotenv import load_dotenv
 
-load_dotenv()
-BOT_TOKEN = os.getenv("BOT_TOKEN")
+from core import config, lifecycle, loader, metrics
+from core.admin_cache import admin_cache
+from core.ratelimit import rate_limiter
+from core.updates import ChatOrderedUpdateProcessor
+
+BOT_TOKEN = config.BOT_TOKEN
 
 # Optional: global owner (always allowed everywhere)
-OWNER_ID = 123456789  # replace with your Telegram ID if you want
+OWNER_ID = config.OWNER_ID
 
 async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE, require: str = None) -> bool:
     """
@@ -23,15 +24,8 @@ async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE, require:
 
     if update.effective_chat.type in ["group", "supergroup"]:
         try:
-            chat_admins = await context.bot.get_chat_administrators(update.effective_chat.id)
-            for admin in chat_admins:
-                if admin.user.id == user_id:
-                    if admin.status == "creator":
-                        return True  # group creator always allowed
-                    if require:
-                        rights = getattr(admin, require, False)
-                        return rights is True
-                    return True  # if no specific right required, any admin is fine
+            # cached roster; creator always allowed, any admin is fine if no right required
+            return await admin_cache.is_admin(context.bot, update.effective_chat.id, user_id, require=require)
         except Exception:
             return False
 
@@ -52,19 +46,63 @@ def protect_admins(require: str = None):
     return decorator
 
 def load_modules(app):
-    modules_folder = "modules"
-    for filename in os.listdir(modules_folder):
-        if filename.endswith(".py") and filename != "__init__.py":
-            module_name = filename[:-3]
-            module = importlib.import_module(f"{modules_folder}.{module_name}")
-            if hasattr(module, "setup"):
-                module.setup(app, protect_admins)  # pass decorator to modules
+    # modules come from the manifest in core/loader.py (MODULES / DISABLED_MODULES in .env)
+    for name in loader.enabled_modules():
+        loader.load_module(name, app, protect_admins)
+    print("⏱ Startup (ms):\n" + loader.report())
 
-def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+def build_application(token: str = None, request=None, limiter=None):
+    """Application with all modules loaded. `request` swaps the HTTP layer (tools/fake_api.py)."""
+    limiter = limiter or rate_limiter
+    builder = (
+        ApplicationBuilder()
+        .token(token or BOT_TOKEN)
+        .rate_limiter(limiter)  # token buckets per chat + global, moderation first
+        .post_init(lifecycle.run_startup)
+        .post_shutdown(lifecycle.run_shutdown)
+    )
+    if config.UPDATE_CONCURRENCY > 1:
+        # different chats in parallel, each chat's updates in order
+        builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(config.UPDATE_CONCURRENCY))
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    app = builder.build()
     load_modules(app)
-    print("✅ Bot is running...")
-    app.run_polling()
+    metrics.gauges("bot_ratelimit", "Outbound rate limiter state.", limiter.stats)
+    metrics.gauges("bot_admin_cache", "Admin roster cache state.", admin_cache.stats)
+    if hasattr(app.update_processor, "stats"):
+        metrics.gauges("bot_updates", "Update processor state.", app.update_processor.stats)
+    return app
+
+def webhook_options() -> dict:
+    """Keyword arguments for Application.run_webhook / Updater.start_webhook from .env."""
+    path = config.WEBHOOK_PATH.strip("/")
+    return {
+        "listen": config.WEBHOOK_LISTEN,
+        "port": config.WEBHOOK_PORT,
+        "url_path": path,
+        "webhook_url": f"{config.WEBHOOK_URL.rstrip('/')}/{path}" if config.WEBHOOK_URL else None,
+        "secret_token": config.WEBHOOK_SECRET,
+        "max_connections": config.WEBHOOK_MAX_CONNECTIONS,
+        # chat_member updates are needed to invalidate the admin cache
+        "allowed_updates": Update.ALL_TYPES,
+    }
+
+def main():
+    if config.SHARDS > 1:
+        from core.sharding import ShardRouter, build_front
+        # this process only receives updates; each chat is handled by one worker process
+        app = build_front(BOT_TOKEN, ShardRouter(config.SHARDS, owner_id=config.OWNER_ID))
+        print(f"✅ Front for {config.SHARDS} shards starting...")
+    else:
+        app = build_application()
+    if config.BOT_MODE == "webhook":
+        print(f"✅ Bot is running (webhook on {config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT})...")
+        app.run_webhook(**webhook_options())
+    else:
+        print("✅ Bot is running...")
+        # chat_member updates are needed to invalidate the admin cache
+        app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
     main()
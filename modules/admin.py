@@ -1,7 +1,11 @@
 from telegram import Update, ChatMember, ChatMemberUpdated
-from telegram.ext import CommandHandler, ContextTypes
+from telegram.ext import CommandHandler, ChatMemberHandler, ContextTypes, TypeHandler
 from telegram.helpers import mention_html
 
+from core import admin_cache as admin_roster, events, loader, profiling
+from core.config import OWNER_ID
+from core.ratelimit import rate_limiter
+
 
 # /promote command
 async def promote(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -31,6 +35,8 @@ async def promote(update: Update, context: ContextTypes.DEFAULT_TYPE):
             can_pin_messages=bot_member.can_pin_messages,
             can_promote_members=bot_member.can_promote_members,
         )
+        admin_roster.invalidate(chat.id)
+        events.publish("promote", chat, target=message.reply_to_message.from_user, actor=update.effective_user)
         await message.reply_text(f"✅ Promoted {user_name} to admin!")
     except Exception as e:
         await message.reply_text(f"❌ Failed to promote: {e}")
@@ -59,6 +65,8 @@ async def demote(update: Update, context: ContextTypes.DEFAULT_TYPE):
             can_pin_messages=False,
             can_promote_members=False,
         )
+        admin_roster.invalidate(chat.id)
+        events.publish("demote", chat, target=message.reply_to_message.from_user, actor=update.effective_user)
         await message.reply_text(f"✅ Demoted {user_name} from admin.")
     except Exception as e:
         await message.reply_text(f"❌ Failed to demote: {e}")
@@ -113,6 +121,89 @@ async def invitelink(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Failed to get invite link: {e}")
 
 
+# ChatMemberUpdated: keep the admin roster cache fresh
+async def track_admin_changes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    member_update = update.chat_member or update.my_chat_member
+    if member_update:
+        admin_roster.on_member_updated(member_update)
+
+
+# /admincache command (owner only)
+async def admincache_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return
+    stats = admin_roster.admin_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    ratio = (stats["hits"] / lookups * 100) if lookups else 0.0
+    await update.message.reply_text(
+        f"🗂 Admin cache: {stats['chats']} chats\n"
+        f"Hits: {stats['hits']} | Misses: {stats['misses']} ({ratio:.1f}% hit rate)\n"
+        f"Invalidations: {stats['invalidations']}"
+    )
+
+
+# /ratelimit command (owner only): outbound queue depths
+async def ratelimit_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return
+    stats = rate_limiter.stats()
+    await update.message.reply_text(
+        f"🚦 Outbound API: {stats['requests']} requests, {stats['retry_after']} RetryAfter\n"
+        f"Queued: {stats['global_queue']} global | {stats['chat_queue']} per-chat "
+        f"(max {stats['max_chat_queue']} in one chat, {stats['tracked_chats']} chats tracked)"
+    )
+
+
+# /updatestats command (owner only): per-chat update queues
+async def update_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return
+    processor = context.application.update_processor
+    if not hasattr(processor, "stats"):
+        await update.message.reply_text("Updates are processed sequentially.")
+        return
+    stats = processor.stats()
+    await update.message.reply_text(
+        f"📥 Updates: {stats['processed']} processed, concurrency {stats['concurrency']}\n"
+        f"Now: {stats['queued']} queued across {stats['active_chats']} chats "
+        f"(max {stats['max_chat_queue']} in one chat, peak {stats['max_chat_queue_seen']})"
+    )
+
+
+# /startupstats command (owner only): module load times, data loads included once they happened
+async def startup_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return
+    await update.message.reply_text(f"<pre>⏱ Startup (ms)\n{loader.report()}</pre>", parse_mode="HTML")
+
+
+# /profile <seconds|Nu> command (owner only): cProfile the update pipeline, report to data/
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return
+    if profiling.active():
+        await update.message.reply_text("A profiling session is already running.")
+        return
+    try:
+        limit = profiling.parse_limit(context.args[0] if context.args else "30")
+    except ValueError as e:
+        await update.message.reply_text(f"Usage: /profile <seconds> or /profile <N>u (e.g. /profile 500u)\n{e}")
+        return
+    chat_id = update.effective_chat.id
+    bot = context.bot
+
+    async def done(summary: str):
+        await bot.send_message(chat_id, summary[:4000])
+
+    profiling.start(done, **limit)
+    what = f"{limit['seconds']:g}s" if "seconds" in limit else f"{limit['updates']} updates"
+    await update.message.reply_text(f"⏱ Profiling for {what}...")
+
+
+async def count_update(update: object, context: ContextTypes.DEFAULT_TYPE):
+    profiling.on_update()
+
+
 # Register handlers
 def setup(app):
     app.add_handler(CommandHandler("promote", promote))
@@ -121,3 +212,11 @@ def setup(app):
     app.add_handler(CommandHandler("unpin", unpin))
     app.add_handler(CommandHandler("adminlist", adminlist))
     app.add_handler(CommandHandler("invitelink", invitelink))
+    app.add_handler(CommandHandler("admincache", admincache_stats))
+    app.add_handler(CommandHandler("ratelimit", ratelimit_stats))
+    app.add_handler(CommandHandler("updatestats", update_stats))
+    app.add_handler(CommandHandler("startupstats", startup_stats))
+    app.add_handler(CommandHandler("profile", profile))
+    # sees every update before any other handler, for /profile <N>u
+    app.add_handler(TypeHandler(Update, count_update), -100)
+    app.add_handler(ChatMemberHandler(track_admin_changes, ChatMemberHandler.ANY_CHAT_MEMBER))
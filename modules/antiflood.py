@@ -1,12 +1,11 @@
 # modules/antiflood.py
-import os
-import json
-import asyncio
-from collections import defaultdict, deque
-from datetime import datetime, timedelta
-from typing import Deque, Dict, Any, Optional, List
-
-from telegram import Update, ChatPermissions
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+from telegram import Update
 from telegram.ext import (
     CommandHandler,
     MessageHandler,
@@ -15,133 +14,204 @@ from telegram.ext import (
     filters,
 )
 
-# ---------- storage ----------
-DATA_DIR = "data"
-DATA_FILE = os.path.join(DATA_DIR, "antiflood.json")
-
-DEFAULT_CFG = {"limit": 0, "timer": None, "mode": "mute", "clear": False, "temp_default": None}
-# timer stored as {"count": int, "duration": seconds}
-
-def ensure_data_dir():
-    os.makedirs(DATA_DIR, exist_ok=True)
-
-def load_settings() -> Dict[str, Any]:
-    ensure_data_dir()
-    if not os.path.isfile(DATA_FILE):
-        return {}
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
-
-def save_settings(data: Dict[str, Any]):
-    ensure_data_dir()
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+from core import config, dupes, events
+from core.actions import MODES, apply_action, parse_duration
+from core.admin_cache import admin_cache
+from core.deletion import delete_messages
+from core.lifecycle import every
+from core.metrics import counter
+from core.settings import ChatSettings, SettingsRegistry
+from core.storage import open_store
 
-_settings = load_settings()  # keyed by str(chat_id)
+# ---------- storage ----------
+DEFAULT_CFG = {"limit": 0, "timer": None, "mode": "mute", "clear": False, "temp_default": None, "dupe": None}
+# timer stored as {"count": int, "duration": seconds}, dupe as {"users": int, "window": seconds}
+MIN_TIMER_COUNT, MAX_TIMER_COUNT = 2, 100  # a timer count is the size of every user's UserRing
+
+class FloodSettings(ChatSettings):
+    """One chat's antiflood config, with the lookups check_flood needs done up front."""
+    __slots__ = tuple(DEFAULT_CFG) + ("timer_count", "timer_duration", "dupe_users", "dupe_window",
+                                      "action_duration", "enabled")
+    DEFAULTS = DEFAULT_CFG
+
+    def parse(self):
+        timer = self.timer or {}
+        count = timer.get("count") or 0
+        # 0/negative = off; anything else is kept within what /setfloodtimer accepts
+        self.timer_count = min(max(count, MIN_TIMER_COUNT), MAX_TIMER_COUNT) if count > 0 else 0
+        self.timer_duration = timer.get("duration") or 0
+        dupe = self.dupe or {}
+        self.dupe_users = dupe.get("users") or 0
+        self.dupe_window = dupe.get("window") or 0
+        self.limit = self.limit or 0
+        self.mode = self.mode or "mute"
+        # tban/tmute use the default duration, if one was given; everything else is permanent
+        self.action_duration = self.temp_default if self.mode in ("tban", "tmute") else None
+        self.enabled = self.limit > 0 or bool(self.timer_count) or bool(self.dupe_users)
+
+
+# one config per chat, written behind; parsed once per change
+flood_settings = SettingsRegistry(open_store("antiflood"), FloodSettings)
 
 def get_cfg(chat_id: int) -> Dict[str, Any]:
-    return _settings.get(str(chat_id), DEFAULT_CFG.copy())
+    """Editable copy of the chat's config (commands); handlers use flood_settings.get()."""
+    return flood_settings.get(chat_id).to_dict()
 
 def set_cfg(chat_id: int, cfg: Dict[str, Any]):
-    _settings[str(chat_id)] = cfg
-    save_settings(_settings)
+    flood_settings.replace(chat_id, cfg)
 
 # ---------- runtime state ----------
-# per chat runtime counters
-# consecutive: last_user, count, msg_ids
-# timed: user_id -> deque[timestamps]
-runtime_state: Dict[int, Dict[str, Any]] = defaultdict(lambda: {
-    "last_user": None,
-    "count": 0,
-    "msg_ids": [],
-    "timestamps": defaultdict(lambda: deque()),  # user_id -> deque[timestamps]
-})
-
-# helper: parse durations like '30s', '5m', '2h', '3d' or plain seconds
-def parse_duration(text: str) -> Optional[int]:
-    if not text:
-        return None
-    txt = text.strip().lower()
-    if txt in ("off", "no", "none"):
-        return None
+class UserRing:
+    """
+    Last `capacity` message timestamps of one user (time.monotonic), in a fixed array.
+    With capacity == timer count, the user flooded iff the ring is full and its oldest
+    entry is within the timer duration, so the timed check is O(1) and push() allocates
+    nothing. Measured footprint per tracked user (CPython 3.11, 64-bit): 56 bytes for
+    the object + ~100 + 8 * capacity for the array, i.e. 240 bytes at capacity 10
+    (a deque of 10 floats was ~1000), plus its slot in ChatFloodState.rings.
+    """
+    __slots__ = ("stamps", "pos", "filled")
+
+    def __init__(self, capacity: int):
+        self.stamps = array("d", bytes(8 * capacity))
+        self.pos = 0
+        self.filled = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.stamps)
+
+    def push(self, ts: float):
+        self.stamps[self.pos] = ts
+        self.pos += 1
+        if self.pos == len(self.stamps):
+            self.pos = 0
+        if self.filled < len(self.stamps):
+            self.filled += 1
+
+    def full(self) -> bool:
+        return self.filled == len(self.stamps)
+
+    def oldest(self) -> float:
+        return self.stamps[self.pos] if self.full() else self.stamps[0]
+
+    def newest(self) -> float:
+        return self.stamps[self.pos - 1]
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.stamps)
+
+
+class ChatFloodState:
+    """Per chat runtime counters: consecutive streak (last_user/count/msg_ids) and per-user rings."""
+    __slots__ = ("last_user", "count", "msg_ids", "rings", "last_seen")
+
+    def __init__(self):
+        self.last_user: Optional[int] = None
+        self.count = 0
+        self.msg_ids = array("q")  # only filled while /clearflood is on
+        self.rings: Dict[int, UserRing] = {}
+        self.last_seen = 0.0
+
+    def reset_streak(self):
+        self.last_user = None
+        self.count = 0
+        del self.msg_ids[:]
+
+    def nbytes(self) -> int:
+        size = sys.getsizeof(self) + sys.getsizeof(self.msg_ids) + sys.getsizeof(self.rings)
+        return size + sum(ring.nbytes() for ring in self.rings.values())
+
+
+# LRU ordered and reaped by sweep_runtime_state()
+runtime_state: "OrderedDict[int, ChatFloodState]" = OrderedDict()
+
+def get_state(chat_id: int) -> ChatFloodState:
+    state = runtime_state.get(chat_id)
+    if state is None:
+        state = runtime_state[chat_id] = ChatFloodState()
+        while len(runtime_state) > config.FLOOD_MAX_CHATS:
+            runtime_state.popitem(last=False)  # least recently active chat
+    else:
+        runtime_state.move_to_end(chat_id)
+    state.last_seen = time.monotonic()
+    return state
+
+def sweep_runtime_state(now: Optional[float] = None) -> int:
+    """Drop idle chats and stale per-user rings. Returns number of entries removed."""
+    now = time.monotonic() if now is None else now
+    removed = 0
+    for chat_id in list(runtime_state):
+        state = runtime_state[chat_id]
+        if now - state.last_seen > config.FLOOD_CHAT_IDLE_TTL:
+            del runtime_state[chat_id]
+            removed += 1
+            continue
+        # keep rings at least as long as the chat's flood window
+        user_ttl = max(config.FLOOD_USER_IDLE_TTL, flood_settings.get(chat_id).timer_duration)
+        rings = state.rings
+        for user_id in list(rings):
+            ring = rings[user_id]
+            if not ring.filled or now - ring.newest() > user_ttl:
+                del rings[user_id]
+                removed += 1
+    return removed
+
+def runtime_stats() -> Dict[str, int]:
+    """Tracked chats/users and the size of runtime_state in bytes."""
+    users = sum(len(state.rings) for state in runtime_state.values())
+    size = sys.getsizeof(runtime_state) + sum(state.nbytes() for state in runtime_state.values())
+    return {"chats": len(runtime_state), "users": users, "bytes": size,
+            "fingerprints": len(dupes.chat_window) + len(dupes.global_window),
+            "fingerprint_bytes": dupes.chat_window.nbytes_estimate() + dupes.global_window.nbytes_estimate()}
+
+@every(config.FLOOD_SWEEP_INTERVAL)
+async def _sweeper(app):
+    sweep_runtime_state()
+
+flood_triggers = counter("bot_antiflood_triggers_total", "Antiflood actions taken.", ("kind", "mode", "outcome"))
+
+# ---------- duplicate content ----------
+async def _check_duplicates(update: Update, context: ContextTypes.DEFAULT_TYPE, settings: FloodSettings) -> bool:
+    """Act on every copy of content posted by too many users (see core/dupes.py). True if it did."""
+    chat = update.effective_chat
+    message = update.effective_message
+    kind, hits = dupes.check(chat.id, update.effective_user.id, message, settings.dupe_users, settings.dupe_window)
+    if not hits:
+        return False
+
+    mode = settings.mode
+    duration = settings.action_duration
+    failed = None
+    state = runtime_state.get(chat.id)
     try:
-        unit = txt[-1]
-        num = int(txt[:-1])
-        if unit == "s":
-            return num
-        if unit == "m":
-            return num * 60
-        if unit == "h":
-            return num * 3600
-        if unit == "d":
-            return num * 86400
+        await delete_messages(context.bot, chat.id, [msg_id for _, msg_id in hits])  # the copies always go
     except Exception:
-        # try plain integer seconds
-        try:
-            return int(txt)
-        except Exception:
-            return None
-    return None
-
-# ---------- punishment helpers ----------
-async def _apply_action(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int,
-                        mode: str, duration_seconds: Optional[int], msg_ids: Optional[List[int]]):
-    bot = context.bot
-
-    # delete messages if provided
-    if msg_ids:
-        for mid in msg_ids:
-            try:
-                await bot.delete_message(chat_id=chat_id, message_id=mid)
-            except Exception:
-                pass
-
-    until_date = None
-    if duration_seconds:
-        until_date = datetime.utcnow() + timedelta(seconds=duration_seconds)
-
+        pass
+    for user_id, _ in hits:
+        err = await apply_action(context.bot, chat.id, user_id, mode, duration, None)
+        flood_triggers.inc("duplicate" if kind == "chat" else "duplicate_global", mode, "error" if err else "ok")
+        if not err:
+            events.publish("duplicate", chat, target=update.effective_user if user_id == update.effective_user.id
+                           else user_id, detail=f"{mode}, {'seen in several chats' if kind == 'global' else 'same message'}")
+        failed = failed or err
+        if state is not None:
+            state.rings.pop(user_id, None)
+    if state is not None and state.last_user in {user_id for user_id, _ in hits}:
+        state.reset_streak()
+
+    # the triggering message is gone, so no reply_text
+    if failed:
+        text = f"❌ Antiflood action failed: {failed}"
+    elif kind == "global":
+        text = f"⚠️ Removed a message from {update.effective_user.mention_html()} seen across several chats. Action: {mode}"
+    else:
+        text = f"⚠️ Removed the same message from {len(hits)} user(s) (duplicate spam). Action: {mode}"
     try:
-        if mode == "ban":
-            await bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
-        elif mode == "kick":
-            await bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
-            await asyncio.sleep(1)
-            await bot.unban_chat_member(chat_id=chat_id, user_id=user_id)
-        elif mode == "tban":
-            await bot.ban_chat_member(chat_id=chat_id, user_id=user_id, until_date=until_date)
-        elif mode == "mute":
-            perms = ChatPermissions(can_send_messages=False)
-            await bot.restrict_chat_member(chat_id=chat_id, user_id=user_id, permissions=perms)
-        elif mode == "tmute":
-            perms = ChatPermissions(can_send_messages=False)
-            await bot.restrict_chat_member(chat_id=chat_id, user_id=user_id, permissions=perms, until_date=until_date)
-        else:
-            perms = ChatPermissions(can_send_messages=False)
-            await bot.restrict_chat_member(chat_id=chat_id, user_id=user_id, permissions=perms)
-    except Exception as e:
-        return e
-
-    # schedule undo for temporary actions (won't survive reboot)
-    if mode in ("tban", "tmute") and duration_seconds:
-        async def _undo():
-            await asyncio.sleep(duration_seconds + 2)
-            try:
-                if mode == "tban":
-                    await bot.unban_chat_member(chat_id=chat_id, user_id=user_id)
-                elif mode == "tmute":
-                    perms = ChatPermissions(can_send_messages=True, can_send_media_messages=True,
-                                            can_send_polls=True, can_send_other_messages=True,
-                                            can_add_web_page_previews=True, can_change_info=False,
-                                            can_invite_users=True, can_pin_messages=False)
-                    await bot.restrict_chat_member(chat_id=chat_id, user_id=user_id, permissions=perms)
-            except Exception:
-                pass
-        asyncio.create_task(_undo())
-
-    return None
+        await context.bot.send_message(chat.id, text, parse_mode="HTML")
+    except Exception:
+        pass
+    return True
 
 # ---------- core message handler ----------
 async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -156,53 +226,53 @@ async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if user is None:
         return
 
+    settings = flood_settings.get(chat.id)
+    if not settings.enabled:
+        return
     bot = context.bot
 
-    # skip admins
+    # skip admins (cached roster, no API call per message)
     try:
-        member = await bot.get_chat_member(chat.id, user.id)
-        if member.status in ("administrator", "creator"):
+        if await admin_cache.is_admin(bot, chat.id, user.id):
             # reset counters for this user
-            state = runtime_state[chat.id]
-            if user.id in state["timestamps"]:
-                state["timestamps"][user.id].clear()
-            if state["last_user"] == user.id:
-                state["last_user"] = None
-                state["count"] = 0
-                state["msg_ids"] = []
+            state = runtime_state.get(chat.id)
+            if state is None:
+                return
+            state.rings.pop(user.id, None)
+            if state.last_user == user.id:
+                state.reset_streak()
             return
     except Exception:
         pass
 
-    cfg = get_cfg(chat.id)
-    limit = cfg.get("limit", 0)
-    timer_cfg = cfg.get("timer")  # dict or None
-    mode = cfg.get("mode", "mute")
-    clear = cfg.get("clear", False)
+    limit = settings.limit
+    mode = settings.mode
+    clear = settings.clear
+
+    if settings.dupe_users and await _check_duplicates(update, context, settings):
+        return
 
-    # nothing enabled
-    if (not limit or limit <= 0) and (not timer_cfg):
+    # only duplicate detection enabled
+    if not limit and not settings.timer_count:
         return
 
-    state = runtime_state[chat.id]
+    state = get_state(chat.id)
 
     # consecutive check
-    if state["last_user"] == user.id:
-        state["count"] += 1
-        state["msg_ids"].append(message.message_id)
-    else:
-        state["last_user"] = user.id
-        state["count"] = 1
-        state["msg_ids"] = [message.message_id]
+    if state.last_user != user.id:
+        state.reset_streak()
+        state.last_user = user.id
+    state.count += 1
+    if clear:
+        state.msg_ids.append(message.message_id)
 
     # trigger consecutive
-    if limit and limit > 0 and state["count"] >= limit:
-        msg_ids = state["msg_ids"][:] if clear else None
-        # if mode is temporary and default temp duration provided, use it; else None for permanent
-        duration = None
-        if mode in ("tban", "tmute"):
-            duration = cfg.get("temp_default")
-        err = await _apply_action(context, chat.id, user.id, mode, duration, msg_ids)
+    if limit > 0 and state.count >= limit:
+        msg_ids = list(state.msg_ids) if clear else None
+        err = await apply_action(context.bot, chat.id, user.id, mode, settings.action_duration, msg_ids)
+        flood_triggers.inc("consecutive", mode, "error" if err else "ok")
+        if not err:
+            events.publish("flood", chat, target=user, detail=f"{mode}, {limit} messages in a row")
         if err:
             try:
                 await message.reply_text(f"❌ Antiflood action failed: {err}")
@@ -214,29 +284,26 @@ async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except Exception:
                 pass
         # reset counters
-        state["last_user"] = None
-        state["count"] = 0
-        state["msg_ids"] = []
-        if user.id in state["timestamps"]:
-            state["timestamps"][user.id].clear()
+        state.reset_streak()
+        state.rings.pop(user.id, None)
         return
 
     # timed flood logic
-    if timer_cfg:
-        count_needed = timer_cfg.get("count")
-        dur = timer_cfg.get("duration")
-        dq: Deque = state["timestamps"][user.id]
-        now_ts = datetime.utcnow().timestamp()
-        dq.append(now_ts)
-        # pop older than dur
-        while dq and (now_ts - dq[0]) > dur:
-            dq.popleft()
-        if len(dq) >= count_needed:
-            msg_ids = state["msg_ids"][:] if clear else None
-            duration = None
-            if mode in ("tban", "tmute"):
-                duration = cfg.get("temp_default")
-            err = await _apply_action(context, chat.id, user.id, mode, duration, msg_ids)
+    if settings.timer_count:
+        count_needed = settings.timer_count
+        dur = settings.timer_duration
+        ring = state.rings.get(user.id)
+        if ring is None or ring.capacity != count_needed:
+            ring = state.rings[user.id] = UserRing(count_needed)
+        now_ts = time.monotonic()
+        ring.push(now_ts)
+        # count_needed messages within dur <=> the count_needed-th most recent one is within dur
+        if ring.full() and (now_ts - ring.oldest()) <= dur:
+            msg_ids = list(state.msg_ids) if clear else None
+            err = await apply_action(context.bot, chat.id, user.id, mode, settings.action_duration, msg_ids)
+            flood_triggers.inc("timed", mode, "error" if err else "ok")
+            if not err:
+                events.publish("flood", chat, target=user, detail=f"{mode}, {count_needed} messages in {dur}s")
             if err:
                 try:
                     await message.reply_text(f"❌ Antiflood action failed: {err}")
@@ -247,10 +314,8 @@ async def check_flood(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     await message.reply_text(f"⚠️ {user.mention_html()} triggered timed antiflood ({count_needed} in {dur}s). Action: {mode}", parse_mode="HTML")
                 except Exception:
                     pass
-            dq.clear()
-            state["last_user"] = None
-            state["count"] = 0
-            state["msg_ids"] = []
+            state.rings.pop(user.id, None)
+            state.reset_streak()
             return
 
 # ---------- admin checks (decorator-like) ----------
@@ -263,8 +328,7 @@ def admin_only(func):
             await update.effective_message.reply_text("This command works only in groups.")
             return
         try:
-            mem = await bot.get_chat_member(chat.id, user.id)
-            if mem.status not in ("administrator", "creator"):
+            if not await admin_cache.is_admin(bot, chat.id, user.id):
                 await update.effective_message.reply_text("You must be an admin to use this command.")
                 return
         except Exception:
@@ -285,6 +349,11 @@ async def cmd_flood(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text += f"• Timed: <b>{timer.get('count')}</b> msgs in <b>{timer.get('duration')}s</b>\n"
     else:
         text += "• Timed: <b>disabled</b>\n"
+    dupe = cfg.get("dupe")
+    if dupe:
+        text += f"• Duplicates: same message from <b>{dupe['users']}</b> users in <b>{dupe['window']}s</b>\n"
+    else:
+        text += "• Duplicates: <b>disabled</b>\n"
     text += f"• Action: <b>{cfg.get('mode')}</b>\n"
     text += f"• Clear triggering messages: <b>{'yes' if cfg.get('clear') else 'no'}</b>\n"
     td = cfg.get("temp_default")
@@ -340,6 +409,9 @@ async def cmd_setfloodtimer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception:
         await msg.reply_text("First argument must be a number.")
         return
+    if not MIN_TIMER_COUNT <= count_needed <= MAX_TIMER_COUNT:
+        await msg.reply_text(f"Count must be between {MIN_TIMER_COUNT} and {MAX_TIMER_COUNT} messages.")
+        return
     dur = parse_duration(args[1])
     if dur is None:
         await msg.reply_text("Couldn't parse duration. Use examples: 30s, 5m, 1h, 2d")
@@ -349,6 +421,39 @@ async def cmd_setfloodtimer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     set_cfg(chat.id, cfg)
     await msg.reply_text(f"✅ Timed antiflood set: {count_needed} messages in {dur}s.")
 
+@admin_only
+async def cmd_setdupe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = context.args or []
+    msg = update.effective_message
+    chat = update.effective_chat
+    if not args:
+        await msg.reply_text("Usage: /setdupe <users> <window/off>\nExample: /setdupe 3 10m")
+        return
+    cfg = get_cfg(chat.id)
+    if args[0].lower() in ("off", "no"):
+        cfg["dupe"] = None
+        set_cfg(chat.id, cfg)
+        await msg.reply_text("✅ Duplicate message detection disabled.")
+        return
+    if len(args) < 2:
+        await msg.reply_text("Please provide both users and window (e.g. 3 10m).")
+        return
+    try:
+        users = int(args[0])
+    except Exception:
+        await msg.reply_text("First argument must be a number.")
+        return
+    if not 2 <= users <= dupes.MAX_SIGHTINGS:
+        await msg.reply_text(f"Users must be between 2 and {dupes.MAX_SIGHTINGS}.")
+        return
+    window = parse_duration(args[1])
+    if window is None:
+        await msg.reply_text("Couldn't parse window. Use examples: 30s, 5m, 1h")
+        return
+    cfg["dupe"] = {"users": users, "window": window}
+    set_cfg(chat.id, cfg)
+    await msg.reply_text(f"✅ Acting when {users} different users send the same message within {window}s.")
+
 @admin_only
 async def cmd_floodmode(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args or []
@@ -358,7 +463,7 @@ async def cmd_floodmode(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await msg.reply_text("Usage: /floodmode <ban/mute/kick/tban/tmute> [default-duration]")
         return
     mode = args[0].lower()
-    if mode not in ("ban", "mute", "kick", "tban", "tmute"):
+    if mode not in MODES:
         await msg.reply_text("Invalid mode. Choose: ban / mute / kick / tban / tmute")
         return
     cfg = get_cfg(chat.id)
@@ -393,6 +498,20 @@ async def cmd_clearflood(update: Update, context: ContextTypes.DEFAULT_TYPE):
         set_cfg(chat.id, cfg)
         await msg.reply_text("✅ I will NOT delete triggering messages.")
 
+async def cmd_floodstats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # owner only: memory held by the runtime counters
+    if update.effective_user.id != config.OWNER_ID:
+        return
+    stats = runtime_stats()
+    await update.effective_message.reply_text(
+        f"📊 Antiflood runtime state\n"
+        f"• Tracked chats: {stats['chats']} (max {config.FLOOD_MAX_CHATS})\n"
+        f"• Tracked users: {stats['users']}\n"
+        f"• Approx. memory: {stats['bytes'] / 1024:.1f} KiB\n"
+        f"• Message fingerprints: {stats['fingerprints']} (max {config.DUPE_MAX_ENTRIES} per window), "
+        f"~{stats['fingerprint_bytes'] / 1024:.1f} KiB"
+    )
+
 # ---------- help text integration ----------
 __help__ = """
 Antiflood — auto-action on users who spam.
@@ -401,6 +520,7 @@ Commands:
  - /flood : Show antiflood settings.
  - /setflood <n/off> : Trigger after n consecutive messages.
  - /setfloodtimer <count> <duration/off> : Timed antiflood (example: /setfloodtimer 10 30s).
+ - /setdupe <users> <window/off> : Act when that many users send the same text, link or media within the window (example: /setdupe 3 10m). The copies are deleted.
  - /floodmode <ban/mute/kick/tban/tmute> : Set action to take.
  - /clearflood <on/off> : Whether to delete the messages that triggered the flood.
 """
@@ -413,5 +533,7 @@ def setup(app):
     app.add_handler(CommandHandler("flood", cmd_flood))
     app.add_handler(CommandHandler("setflood", cmd_setflood))
     app.add_handler(CommandHandler("setfloodtimer", cmd_setfloodtimer))
+    app.add_handler(CommandHandler("setdupe", cmd_setdupe))
     app.add_handler(CommandHandler("floodmode", cmd_floodmode))
     app.add_handler(CommandHandler("clearflood", cmd_clearflood))
+    app.add_handler(CommandHandler("floodstats", cmd_floodstats))
@@ -1,15 +1,199 @@
 import asyncio
+import functools
 import random
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes, filters
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
-# --- CONFIG ---
-CAPTCHA_WAIT = 60  # seconds to solve captcha
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ChatPermissions
+from telegram.ext import CommandHandler, CallbackQueryHandler, MessageHandler, ContextTypes, filters
+
+from core import config, events
+from core.admin_cache import admin_cache
+from core.deletion import delete_messages
+from core.lifecycle import every
+from core.settings import ChatSettings, SettingsRegistry
+from core.storage import open_store
+from modules import gban, raid
 
-# Track users who need verification
-pending_captcha = {}
+# --- CONFIG ---
+CAPTCHA_WAIT = config.CAPTCHA_WAIT  # seconds to solve captcha
+KICK_CONCURRENCY = 10  # parallel kicks when a batch of challenges expires
 
 WELCOME_TEXT = "👋 Hello {name}!\nPlease solve this captcha to continue in the group."
+BATCH_TEXT = "👋 Hello {names}!\nPlease solve this captcha to continue in the group."
+BATCH_MENTIONS = 30
+UNMUTED = ChatPermissions(
+    can_send_messages=True, can_send_audios=True, can_send_documents=True, can_send_photos=True,
+    can_send_videos=True, can_send_video_notes=True, can_send_voice_notes=True, can_send_polls=True,
+    can_send_other_messages=True, can_add_web_page_previews=True, can_change_info=False,
+    can_invite_users=True, can_pin_messages=False,
+)
+
+
+class CaptchaSettings(ChatSettings):
+    __slots__ = ("enabled",)
+    DEFAULTS = {"enabled": False}
+
+
+captcha_settings = SettingsRegistry(open_store("captcha"), CaptchaSettings)  # {chat_id: {"enabled": bool}}
+
+
+class Challenge:
+    __slots__ = ("answer", "expires", "message_id", "restricted")
+
+    def __init__(self, answer: int, expires: float, restricted: bool):
+        self.answer = answer
+        self.expires = expires
+        self.message_id: Optional[int] = None
+        self.restricted = restricted
+
+
+# Track users who need verification, keyed by (chat_id, user_id).
+# Every challenge gets the same CAPTCHA_WAIT, so insertion order is expiry order.
+# At CAPTCHA_MAX_PENDING new members are let in unchallenged rather than cutting
+# anyone's time short.
+pending_captcha: "OrderedDict[Tuple[int, int], Challenge]" = OrderedDict()
+# raid-mode challenges share one message: (chat_id, message_id) -> users still to solve it
+_batch_left: Dict[Tuple[int, int], int] = {}
+
+
+def captcha_enabled(chat_id: int) -> bool:
+    return captcha_settings.get(chat_id).enabled
+
+
+def _keyboard(user_id: int, a: int, b: int, answer: int) -> InlineKeyboardMarkup:
+    options = {answer}
+    while len(options) < 3:
+        options.add(random.randint(2, 18))
+    buttons = [InlineKeyboardButton(str(o), callback_data=f"captcha:{user_id}:{o}")
+               for o in random.sample(sorted(options), 3)]
+    return InlineKeyboardMarkup([[InlineKeyboardButton(f"{a} + {b} = ?", callback_data="captcha:noop")], buttons])
+
+
+def _has_room(chat_id: int, user_id: int) -> bool:
+    return (chat_id, user_id) in pending_captcha or len(pending_captcha) < config.CAPTCHA_MAX_PENDING
+
+
+def _add_challenge(chat_id: int, user_id: int, answer: int, restricted: bool) -> Optional[Challenge]:
+    """None when CAPTCHA_MAX_PENDING challenges are already open."""
+    key = (chat_id, user_id)
+    if not _has_room(chat_id, user_id):
+        return None
+    pending_captcha.pop(key, None)  # re-challenge moves the user to the back
+    challenge = pending_captcha[key] = Challenge(answer, time.monotonic() + CAPTCHA_WAIT, restricted)
+    return challenge
+
+
+async def _release(bot, chat_id: int, user_id: int):
+    """Give a restricted member the chat's default permissions back."""
+    try:
+        permissions = (await bot.get_chat(chat_id)).permissions or UNMUTED
+    except Exception:
+        permissions = UNMUTED
+    try:
+        await bot.restrict_chat_member(chat_id, user_id, permissions)
+    except Exception:
+        pass
+
+
+async def send_challenge(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user, restricted: bool,
+                         reply_to: Optional[int] = None) -> bool:
+    """False if the challenge was refused because too many are open."""
+    # Generate simple math captcha
+    a = random.randint(1, 9)
+    b = random.randint(1, 9)
+    challenge = _add_challenge(chat_id, user.id, a + b, restricted)
+    if challenge is None:
+        return False
+    msg = await context.bot.send_message(
+        chat_id,
+        WELCOME_TEXT.format(name=user.first_name),
+        reply_markup=_keyboard(user.id, a, b, a + b),
+        reply_to_message_id=reply_to,
+    )
+    challenge.message_id = msg.message_id
+    return True
+
+
+async def send_batch_challenge(bot, chat_id: int, joined: List[Tuple[object, bool]]):
+    """One challenge message for everyone who joined during a raid window; any of them may answer."""
+    joined = [(user, restricted) for user, restricted in joined if (chat_id, user.id) not in pending_captcha]
+    if not joined:
+        return
+    a = random.randint(1, 9)
+    b = random.randint(1, 9)
+    challenges, admitted = [], []
+    for user, restricted in joined:
+        challenge = _add_challenge(chat_id, user.id, a + b, restricted)
+        if challenge is not None:
+            challenges.append(challenge)
+            admitted.append((user, restricted))
+        elif restricted:
+            await _release(bot, chat_id, user.id)  # no room: let them in unchallenged
+    joined = admitted
+    if not joined:
+        return
+    names = ", ".join(user.first_name for user, _ in joined[:BATCH_MENTIONS])
+    if len(joined) > BATCH_MENTIONS:
+        names += f" and {len(joined) - BATCH_MENTIONS} more"
+    try:
+        msg = await bot.send_message(chat_id, BATCH_TEXT.format(names=names), reply_markup=_keyboard(0, a, b, a + b))
+    except Exception:
+        for user, _ in joined:
+            pending_captcha.pop((chat_id, user.id), None)
+        raise
+    for challenge in challenges:
+        challenge.message_id = msg.message_id
+    _batch_left[(chat_id, msg.message_id)] = len(challenges)
+
+
+# --- EXPIRY ---
+def _pop_expired(now: float) -> List[Tuple[Tuple[int, int], Challenge]]:
+    expired = []
+    while pending_captcha:
+        key, challenge = next(iter(pending_captcha.items()))
+        if challenge.expires > now:
+            break
+        pending_captcha.popitem(last=False)
+        expired.append((key, challenge))
+    return expired
+
+
+async def _kick(bot, chat_id: int, user_id: int, sem: asyncio.Semaphore):
+    async with sem:
+        try:
+            await bot.ban_chat_member(chat_id, user_id)
+            await bot.unban_chat_member(chat_id, user_id)  # just kick
+            events.publish("captcha_kick", chat_id, target=user_id, detail="captcha not solved in time")
+        except Exception:
+            pass
+
+
+async def expire_challenges(bot, now: Optional[float] = None) -> int:
+    """Kick everyone whose challenge ran out, in one batch. Returns how many."""
+    expired = _pop_expired(time.monotonic() if now is None else now)
+    if not expired:
+        return 0
+    sem = asyncio.Semaphore(KICK_CONCURRENCY)
+    await asyncio.gather(*(_kick(bot, chat_id, user_id, sem) for (chat_id, user_id), _ in expired))
+    # clean up the challenge messages, batched per chat
+    by_chat: Dict[int, List[int]] = {}
+    for (chat_id, _), challenge in expired:
+        if challenge.message_id:
+            by_chat.setdefault(chat_id, []).append(challenge.message_id)
+            _batch_left.pop((chat_id, challenge.message_id), None)
+    for chat_id, msg_ids in by_chat.items():
+        try:
+            await delete_messages(bot, chat_id, msg_ids)
+        except Exception:
+            pass
+    return len(expired)
+
+
+@every(1)
+async def _expiry_dispatcher(app):
+    await expire_challenges(app.bot)
 
 
 # --- COMMANDS ---
@@ -17,31 +201,53 @@ async def captcha_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Manual /captcha command for testing"""
     user = update.effective_user
     chat = update.effective_chat
+    # the expiry dispatcher kicks the user if not verified within CAPTCHA_WAIT
+    if not await send_challenge(context, chat.id, user, restricted=False, reply_to=update.message.message_id):
+        await update.message.reply_text("⚠️ Too many captchas are open right now, try again later.")
 
-    # Generate simple math captcha
-    a = random.randint(1, 9)
-    b = random.randint(1, 9)
-    answer = a + b
-    pending_captcha[user.id] = {"chat_id": chat.id, "answer": answer}
 
-    keyboard = InlineKeyboardMarkup(
-        [[InlineKeyboardButton(f"{a} + {b} = ?", callback_data=f"captcha:{answer}")]]
-    )
+async def captcha_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/captchamode <on/off>: challenge new members automatically"""
+    chat = update.effective_chat
+    if not await admin_cache.is_admin(context.bot, chat.id, update.effective_user.id):
+        await update.message.reply_text("❌ Only admins can change captcha mode.")
+        return
+    if not context.args:
+        state = "on" if captcha_enabled(chat.id) else "off"
+        await update.message.reply_text(f"Captcha for new members is {state}. Usage: /captchamode <on/off>")
+        return
+    enabled = context.args[0].lower() in ("on", "yes")
+    captcha_settings.replace(chat.id, {"enabled": enabled})
+    await update.message.reply_text("✅ New members must solve a captcha." if enabled
+                                    else "✅ Captcha for new members disabled.")
 
-    await update.message.reply_text(
-        WELCOME_TEXT.format(name=user.first_name),
-        reply_markup=keyboard
-    )
 
-    # Wait for CAPTCHA_WAIT seconds, then kick if not verified
-    await asyncio.sleep(CAPTCHA_WAIT)
-    if user.id in pending_captcha:
+async def captcha_new_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Restrict and challenge every new member while captcha mode is on"""
+    chat = update.effective_chat
+    if not captcha_enabled(chat.id):
+        return
+    batched = raid.in_raid(chat.id)
+    for member in update.message.new_chat_members:
+        if member.is_bot or gban.is_gbanned(member.id):
+            continue
+        if not _has_room(chat.id, member.id):
+            continue  # CAPTCHA_MAX_PENDING reached: don't restrict someone we can't challenge
         try:
-            await context.bot.ban_chat_member(chat.id, user.id)
-            await context.bot.unban_chat_member(chat.id, user.id)  # just kick
-            del pending_captcha[user.id]
-        except:
-            pass
+            await context.bot.restrict_chat_member(chat.id, member.id, ChatPermissions(can_send_messages=False))
+            restricted = True
+        except Exception:
+            restricted = False
+        if batched:
+            # raid: one shared challenge per window instead of one message per member
+            raid.batch_join("captcha", chat.id, (member, restricted),
+                            functools.partial(send_batch_challenge, context.bot))
+            continue
+        try:
+            if not await send_challenge(context, chat.id, member, restricted) and restricted:
+                await _release(context.bot, chat.id, member.id)
+        except Exception:
+            pending_captcha.pop((chat.id, member.id), None)
 
 
 async def captcha_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -51,15 +257,39 @@ async def captcha_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if not query.data.startswith("captcha:"):
         return
+    parts = query.data.split(":")
+    if len(parts) != 3:
+        await query.answer()
+        return
 
-    expected = int(query.data.split(":")[1])
-    if user.id not in pending_captcha:
+    target, choice = int(parts[1]), int(parts[2])
+    chat_id = query.message.chat.id
+    challenge = pending_captcha.get((chat_id, user.id))
+    if target not in (0, user.id) or challenge is None:
         await query.answer("You are not pending verification or already verified!", show_alert=True)
         return
+    if choice != challenge.answer:
+        await query.answer("❌ Wrong answer, try again.", show_alert=True)
+        return
 
     # Correct answer
-    del pending_captcha[user.id]
+    del pending_captcha[(chat_id, user.id)]
+    if challenge.restricted:
+        await _release(context.bot, chat_id, user.id)
     await query.answer("✅ Captcha solved!")
+    if target == 0:
+        # shared raid challenge: keep it up for the others, remove it after the last one
+        key = (chat_id, query.message.message_id)
+        left = _batch_left.get(key, 1) - 1
+        if left > 0:
+            _batch_left[key] = left
+        else:
+            _batch_left.pop(key, None)
+            try:
+                await query.message.delete()
+            except Exception:
+                pass
+        return
     await query.edit_message_text(f"✅ {user.first_name} verified and allowed in the group!")
 
 
@@ -67,4 +297,7 @@ async def captcha_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 def setup(app):
     # Only allow /captcha in groups
     app.add_handler(CommandHandler("captcha", captcha_command, filters=filters.ChatType.GROUPS))
+    app.add_handler(CommandHandler("captchamode", captcha_mode, filters=filters.ChatType.GROUPS))
     app.add_handler(CallbackQueryHandler(captcha_callback, pattern=r"^captcha:"))
+    # own group: greetings handles NEW_CHAT_MEMBERS in the default group
+    app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, captcha_new_members), 1)
@@ -1,7 +1,13 @@
 # modules/clean.py
+import time
+
 from telegram import Update, Chat
 from telegram.ext import CommandHandler, ContextTypes, filters
-from telegram.error import BadRequest
+
+from core.admin_cache import admin_cache
+from core.deletion import delete_messages
+
+PROGRESS_EVERY = 2.0  # seconds between progress edits
 
 async def clean(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Delete last N messages in a group."""
@@ -10,8 +16,7 @@ async def clean(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message = update.effective_message
 
     # Only admins
-    member = await chat.get_member(user.id)
-    if member.status not in ("administrator", "creator"):
+    if not await admin_cache.is_admin(context.bot, chat.id, user.id):
         await message.reply_text("❌ You need to be an admin to use this command.")
         return
 
@@ -28,23 +33,30 @@ async def clean(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await message.reply_text("❌ Invalid number.")
         return
 
-    deleted = 0
-    # Fetch recent messages using get_chat_history
+    # Bots can't read chat history, so we delete ids from the command message backward
+    current_msg_id = message.message_id
+    msg_ids = range(current_msg_id, max(current_msg_id - limit - 1, 0), -1)
+    # status goes in a new message: the command itself is deleted with the rest
+    status = await chat.send_message(f"🧹 Deleting {len(msg_ids)} messages...")
+    last_edit = time.monotonic()
+
+    async def progress(done: int, total: int):
+        nonlocal last_edit
+        if done < total and time.monotonic() - last_edit >= PROGRESS_EVERY:
+            last_edit = time.monotonic()
+            await status.edit_text(f"🧹 Deleting... {done}/{total}")
+
     try:
-        # Fetch messages via bot.get_chat in v20+ doesn't support history,
-        # so we must delete messages from the update.message.message_id backward
-        current_msg_id = message.message_id
-        for msg_id in range(current_msg_id, current_msg_id - limit - 1, -1):
-            try:
-                await context.bot.delete_message(chat.id, msg_id)
-                deleted += 1
-            except BadRequest:
-                continue
+        result = await delete_messages(context.bot, chat.id, msg_ids, progress=progress)
     except Exception as e:
-        await message.reply_text(f"❌ Error deleting messages: {e}")
+        await status.edit_text(f"❌ Error deleting messages: {e}")
         return
 
-    await message.reply_text(f"✅ Deleted {deleted} messages.")
+    if result.confirmed:
+        await status.edit_text(f"✅ Deleted {result.deleted} messages.")
+    else:
+        # deleteMessages doesn't say which of the ids still existed
+        await status.edit_text(f"✅ Requested deletion of the last {result.deleted + result.requested} messages.")
 
 
 def setup(app):
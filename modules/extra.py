@@ -1,21 +1,131 @@
-import json
-import os
+import html
+import time
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
 from telegram import Update
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
 from telegram.ext import CommandHandler, ContextTypes
 
-LOG_FILE = "data/log_channels.json"
+from core import config
+from core.admin_cache import admin_cache
+from core.events import Event, subscribe
+from core.lifecycle import every
+from core.metrics import counter
+from core.ratelimit import LOW, priority
+from core.storage import open_store
+
+# Log channel per chat, persisted through core.storage
+LOG_CHANNELS = open_store("log_channels")
+
+def get_log_channel(chat_id):
+    return LOG_CHANNELS.get(chat_id)
+
+# ---------- log dispatcher ----------
+# Moderation events (core/events.py) of chats with a log channel are queued per
+# channel and sent as one digest message per channel every LOG_FLUSH_INTERVAL, at
+# LOW priority, so a moderation action never waits on its log line. A full queue
+# drops its oldest events. Events still queued when the bot stops are lost.
+DIGEST_LIMIT = 3900  # characters per digest (Telegram allows 4096)
+MAX_DETAIL = 300  # characters of an event's detail, before escaping: one event always fits a digest
+
+LABELS = {
+    "flood": "🌊 Antiflood",
+    "duplicate": "📑 Duplicate spam",
+    "warn": "⚠️ Warned",
+    "warn_limit": "🚨 Warn limit",
+    "unwarn": "♻️ Warnings reset",
+    "gban": "🌐 Global ban",
+    "captcha_kick": "🧩 Captcha kick",
+    "filter_added": "➕ Filter added",
+    "filter_removed": "➖ Filter removed",
+    "promote": "⬆️ Promoted",
+    "demote": "⬇️ Demoted",
+}
+
+_queues: Dict[str, Deque[Event]] = {}  # log channel -> events waiting for the next digest
+log_dropped = counter("bot_log_events_dropped_total", "Moderation events dropped from full log channel queues.")
+log_digests = counter("bot_log_digests_total", "Digest messages sent to log channels.", ("outcome",))
+
+@subscribe
+def _queue_event(event: Event):
+    channel = LOG_CHANNELS.get(event.chat_id)
+    if not channel:
+        return
+    queue = _queues.get(channel)
+    if queue is None:
+        queue = _queues[channel] = deque(maxlen=config.LOG_QUEUE_SIZE)
+    if len(queue) == queue.maxlen:
+        log_dropped.inc()  # deque drops the oldest one
+    queue.append(event)
+
+def _who(person) -> str:
+    if isinstance(person, int):
+        return f"<code>{person}</code>"
+    return person.mention_html()
+
+def render_event(event: Event) -> str:
+    line = f"{time.strftime('%H:%M:%S', time.gmtime(event.at))} {LABELS.get(event.kind, event.kind)}"
+    if event.target is not None:
+        line += f" {_who(event.target)}"
+    if event.actor is not None:
+        line += f" by {_who(event.actor)}"
+    if event.detail:
+        detail = event.detail if len(event.detail) <= MAX_DETAIL else event.detail[:MAX_DETAIL - 1] + "…"
+        line += f": {html.escape(detail)}"
+    return line
+
+def take_digest(queue: Deque[Event]) -> Tuple[str, List[Event]]:
+    """Pop as many events as fit in one message and render them, grouped by chat."""
+    taken = []
+    lines = ["📋 <b>Moderation log</b> (UTC)"]
+    size = len(lines[0])
+    last_chat = None
+    while queue:
+        event = queue[0]
+        new = [render_event(event)]
+        if event.chat_id != last_chat:
+            new.insert(0, f"\n<b>{html.escape(event.chat_title or str(event.chat_id))}</b>")
+        added = sum(len(line) + 1 for line in new)
+        if size + added > DIGEST_LIMIT and len(lines) > 1:
+            break
+        taken.append(queue.popleft())
+        lines += new
+        size += added
+        last_chat = event.chat_id
+    return "\n".join(lines), taken
+
+def _put_back(queue: Deque[Event], taken: List[Event]):
+    """Return an unsent digest's events to the front, as far as the queue has room."""
+    room = queue.maxlen - len(queue)
+    if room < len(taken):
+        log_dropped.inc(amount=len(taken) - room)  # the oldest go, as in _queue_event
+        taken = taken[len(taken) - room:]
+    queue.extendleft(reversed(taken))
 
-# Load existing log channels
-if os.path.exists(LOG_FILE):
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        LOG_CHANNELS = json.load(f)
-else:
-    LOG_CHANNELS = {}
+async def flush_logs(bot):
+    """Send at most one digest per channel (the rest waits for the next round)."""
+    for channel in list(_queues):
+        queue = _queues[channel]
+        if not queue:
+            del _queues[channel]
+            continue
+        text, taken = take_digest(queue)
+        try:
+            with priority(LOW):
+                await bot.send_message(channel, text, parse_mode="HTML", disable_web_page_preview=True)
+            log_digests.inc("ok")
+        except Exception as e:
+            log_digests.inc("error")
+            print(f"⚠️ Could not send to log channel {channel}: {e}")
+            if isinstance(e, Forbidden) or (isinstance(e, BadRequest) and "chat not found" in str(e).lower()):
+                queue.clear()  # wrong id or bot not allowed there: don't pile up for it
+            elif isinstance(e, (NetworkError, RetryAfter)) and not isinstance(e, BadRequest):
+                _put_back(queue, taken)  # transient: the same digest goes out next round
 
-def save_log_channels():
-    os.makedirs("data", exist_ok=True)
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(LOG_CHANNELS, f, indent=2)
+@every(config.LOG_FLUSH_INTERVAL)
+async def _send_digests(app):
+    await flush_logs(app.bot)
 
 # ---------- commands ----------
 
@@ -25,8 +135,7 @@ async def set_log(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Admin check
     try:
-        member = await chat.get_member(user.id)
-        if member.status not in ["administrator", "creator"]:
+        if not await admin_cache.is_admin(context.bot, chat.id, user.id):
             await update.message.reply_text("❌ Only admins can set a log channel!")
             return
     except:
@@ -38,8 +147,7 @@ async def set_log(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     log_channel = context.args[0]
-    LOG_CHANNELS[str(chat.id)] = log_channel
-    save_log_channels()
+    LOG_CHANNELS.set(chat.id, log_channel)
     await update.message.reply_text(f"✅ Log channel set to {log_channel}.")
 
 async def remove_log(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -48,17 +156,15 @@ async def remove_log(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Admin check
     try:
-        member = await chat.get_member(user.id)
-        if member.status not in ["administrator", "creator"]:
+        if not await admin_cache.is_admin(context.bot, chat.id, user.id):
             await update.message.reply_text("❌ Only admins can remove the log channel!")
             return
     except:
         await update.message.reply_text("❌ Failed to verify admin status.")
         return
 
-    if str(chat.id) in LOG_CHANNELS:
-        del LOG_CHANNELS[str(chat.id)]
-        save_log_channels()
+    if chat.id in LOG_CHANNELS:
+        LOG_CHANNELS.pop(chat.id)
         await update.message.reply_text("✅ Log channel removed.")
     else:
         await update.message.reply_text("ℹ️ No log channel was set for this chat.")
@@ -74,6 +180,7 @@ __help__ = """
 **Extra Connections / Log Channels**
 - /setlog <channel_id/@username> — Set a log channel for this group
 - /removelog — Remove the log channel
+Moderation actions (antiflood, warns, bans, filter changes, promotions) are posted there as a digest every few seconds.
 """
 
 __mod_name__ = "Connections"
@@ -1,65 +1,117 @@
 # modules/filters_module.py
-import os
-import json
+import html
+from collections import OrderedDict
+
 from telegram import Update
 from telegram.ext import CommandHandler, MessageHandler, ContextTypes, filters
 
-# File to store filters
-DATA_DIR = "data"
-FILTER_FILE = os.path.join(DATA_DIR, "filters.json")
-
-# Ensure data directory exists
-os.makedirs(DATA_DIR, exist_ok=True)
-
-# Load filters from file
-if os.path.exists(FILTER_FILE):
-    with open(FILTER_FILE, "r", encoding="utf-8") as f:
-        FILTERS = json.load(f)
-else:
-    FILTERS = {}  # {chat_id: {trigger: reply}}
+from core import config, events
+from core.admin_cache import admin_cache
+from core.lifecycle import on_shutdown
+from core.metrics import counter
+from core.patterns import PLAIN, REGEX, WORD, FilterMatcher, RegexPool, check_regex
+from core.ratelimit import LOW, priority
+from core.storage import open_store
+
+# Filters are persisted per chat (one row per trigger on sqlite), written behind.
+# A value is the reply text (plain substring filter) or {"reply": str, "type": "word"/"regex"}.
+_store = open_store("filters", nested=True)  # {chat_id: {trigger: reply or {...}}}
+filter_hits = counter("bot_filter_hits_total", "Messages answered by a filter.")
+
+def filter_type(value) -> str:
+    return value.get("type", PLAIN) if isinstance(value, dict) else PLAIN
+
+def filter_reply(value) -> str:
+    return value["reply"] if isinstance(value, dict) else value
+
+def get_chat_filters(chat_id) -> dict:
+    return _store.get(chat_id, {})
+
+def save_filter(chat_id, trigger: str):
+    _store.touch(chat_id, trigger)
+
+# Compiled matcher per chat (Aho-Corasick + combined word/regex alternations), built on
+# first message and kept in sync by the commands; the least recently used are dropped
+_matchers: "OrderedDict[str, FilterMatcher]" = OrderedDict()
+_regex_pool = RegexPool(config.REGEX_WORKERS)  # user regexes run here, never in the bot process
+
+def get_matcher(chat_id: str) -> FilterMatcher:
+    matcher = _matchers.get(chat_id)
+    if matcher is None:
+        chat_filters = get_chat_filters(chat_id)
+        matcher = _matchers[chat_id] = FilterMatcher([(t, filter_type(v)) for t, v in chat_filters.items()],
+                                                     pool=_regex_pool)
+        while len(_matchers) > config.FILTER_CACHE_CHATS:
+            _matchers.popitem(last=False)
+    else:
+        _matchers.move_to_end(chat_id)
+    return matcher
 
-def save_filters():
-    with open(FILTER_FILE, "w", encoding="utf-8") as f:
-        json.dump(FILTERS, f, indent=2)
+@on_shutdown
+async def _stop_regex_pool(app):
+    await _regex_pool.stop()
 
 # ---------- Admin commands ----------
-async def add_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def _add_filter(update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str, usage: str):
     chat = update.effective_chat
     user = update.effective_user
     msg = update.effective_message
 
-    member = await chat.get_member(user.id)
-    if member.status not in ("administrator", "creator"):
+    if not await admin_cache.is_admin(context.bot, chat.id, user.id):
         await msg.reply_text("❌ You need to be an admin to add filters.")
         return
 
     if len(context.args) < 2:
-        await msg.reply_text('Usage: /filter <trigger> <reply>. For multi-word triggers, quote them.')
+        await msg.reply_text(usage)
         return
 
-    trigger = context.args[0].lower()
+    # regexes keep their case: lowercasing would turn \W into \w
+    trigger = context.args[0] if kind == REGEX else context.args[0].lower()
     reply = " ".join(context.args[1:])
-    FILTERS.setdefault(str(chat.id), {})[trigger] = reply
-    save_filters()
-    await msg.reply_text(f"✅ Filter added: '{trigger}' → '{reply}'")
+    if kind == REGEX:
+        try:
+            check_regex(trigger)
+        except ValueError as e:
+            await msg.reply_text(f"❌ Regex refused: {e}")
+            return
+    _store.setdefault(chat.id, {})[trigger] = reply if kind == PLAIN else {"reply": reply, "type": kind}
+    save_filter(chat.id, trigger)
+    if str(chat.id) in _matchers:
+        _matchers[str(chat.id)].add(trigger, kind)
+    label = {PLAIN: "Filter", WORD: "Word filter", REGEX: "Regex filter"}[kind]
+    events.publish("filter_added", chat, actor=user, detail=trigger if kind == PLAIN else f"{trigger} ({kind})")
+    await msg.reply_text(f"✅ {label} added: '{trigger}' → '{reply}'")
+
+async def add_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _add_filter(update, context, PLAIN,
+                      'Usage: /filter <trigger> <reply>. For multi-word triggers, quote them.')
+
+async def add_word_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _add_filter(update, context, WORD,
+                      "Usage: /filterword <word> <reply>. Matches the whole word only (cat, not category).")
+
+async def add_regex_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _add_filter(update, context, REGEX,
+                      "Usage: /filterregex <pattern> <reply>. Example: /filterregex ^buy\\s+now Not here!")
 
 async def list_filters(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
-    filters_list = FILTERS.get(chat_id, {})
+    filters_list = get_chat_filters(chat_id)
     if not filters_list:
         await update.effective_message.reply_text("No filters set for this chat.")
         return
 
     text = "📜 <b>Chat Filters:</b>\n\n"
-    for trig, rep in filters_list.items():
-        text += f"• <b>{trig}</b> → {rep}\n"
+    for trig, value in filters_list.items():
+        kind = filter_type(value)
+        tag = "" if kind == PLAIN else f" <i>({kind})</i>"
+        text += f"• <b>{html.escape(trig)}</b>{tag} → {html.escape(filter_reply(value))}\n"
     await update.effective_message.reply_text(text, parse_mode="HTML")
 
 async def stop_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
     user = update.effective_user
-    member = await update.effective_chat.get_member(user.id)
-    if member.status not in ("administrator", "creator"):
+    if not await admin_cache.is_admin(context.bot, update.effective_chat.id, user.id):
         await update.effective_message.reply_text("❌ You need to be an admin to remove filters.")
         return
 
@@ -67,10 +119,16 @@ async def stop_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.effective_message.reply_text("Usage: /stop <trigger>")
         return
 
-    trigger = context.args[0].lower()
-    if chat_id in FILTERS and trigger in FILTERS[chat_id]:
-        FILTERS[chat_id].pop(trigger)
-        save_filters()
+    trigger = context.args[0]
+    chat_filters = get_chat_filters(chat_id)
+    if trigger not in chat_filters:
+        trigger = trigger.lower()  # plain and word triggers are stored lowercased, regexes as typed
+    if trigger in chat_filters:
+        chat_filters.pop(trigger)
+        save_filter(chat_id, trigger)
+        if chat_id in _matchers:
+            _matchers[chat_id].remove(trigger)
+        events.publish("filter_removed", update.effective_chat, actor=user, detail=trigger)
         await update.effective_message.reply_text(f"✅ Filter '{trigger}' removed.")
     else:
         await update.effective_message.reply_text("❌ This filter does not exist.")
@@ -78,13 +136,13 @@ async def stop_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def stop_all_filters(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
     user = update.effective_user
-    member = await update.effective_chat.get_member(user.id)
-    if member.status not in ("administrator", "creator"):
+    if not await admin_cache.is_admin(context.bot, update.effective_chat.id, user.id):
         await update.effective_message.reply_text("❌ You need to be an admin to remove all filters.")
         return
 
-    FILTERS[chat_id] = {}
-    save_filters()
+    _store.pop(chat_id)
+    _matchers.pop(chat_id, None)
+    events.publish("filter_removed", update.effective_chat, actor=user, detail="all filters")
     await update.effective_message.reply_text("✅ All filters removed for this chat.")
 
 
@@ -92,19 +150,25 @@ async def stop_all_filters(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def check_filters(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
     text = update.effective_message.text
-    if not text or chat_id not in FILTERS:
+    if not text:
+        return
+    chat_filters = get_chat_filters(chat_id)
+    if not chat_filters:
         return
 
-    text_lower = text.lower()
-    for trigger, reply in FILTERS[chat_id].items():
-        if trigger in text_lower:
-            await update.effective_message.reply_text(reply)
-            break  # reply only once per message
+    # first trigger (in filter order) wins, reply only once per message
+    trigger = await get_matcher(chat_id).first_match(text)
+    if trigger is not None:
+        filter_hits.inc()
+        with priority(LOW):
+            await update.effective_message.reply_text(filter_reply(chat_filters[trigger]))
 
 
 # ---------- Register handlers ----------
 def setup(app):
     app.add_handler(CommandHandler("filter", add_filter))
+    app.add_handler(CommandHandler("filterword", add_word_filter))
+    app.add_handler(CommandHandler("filterregex", add_regex_filter))
     app.add_handler(CommandHandler("filters", list_filters))
     app.add_handler(CommandHandler("stop", stop_filter))
     app.add_handler(CommandHandler("stopall", stop_all_filters))
@@ -118,6 +182,8 @@ The bot will reply automatically to certain words.
 
 Commands:
 - /filter <trigger> <reply> — Bot replies with <reply> when someone says <trigger>.
+- /filterword <word> <reply> — Like /filter, but only for the whole word.
+- /filterregex <pattern> <reply> — Reply when the message matches a regex (case-insensitive).
 - /filters — List all chat filters.
 - /stop <trigger> — Remove a filter.
 - /stopall — Remove ALL filters for this chat.
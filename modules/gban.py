@@ -0,0 +1,357 @@
+# modules/gban.py
+# Global bans: one owner-managed list of users banned from every chat the bot is in.
+#
+# The list lives in the "gbans" store and in memory as a set, so the check on every
+# group message and join is one set lookup. It runs in group -50, before raid
+# tracking, greetings, captcha, antiflood and filters, and stops the update there.
+# New entries are also pushed out to all known chats (every group the bot has seen a
+# message from) by a background task at GBAN_ENFORCE_PER_SEC, at LOW priority so live
+# moderation isn't queued behind it; unfinished work resumes after a restart.
+#
+# In sharded mode every shard keeps a copy of the list and enforces it in its own
+# chats. The front sends the owner's /gban, /ungban and /gbanimport to all shards
+# (core.sharding.BROADCAST_COMMANDS); a copy is applied by apply_copy() without a reply
+# and without reaching any other handler.
+import asyncio
+import io
+import json
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Set
+
+from telegram import Update
+from telegram.error import BadRequest, Forbidden
+from telegram.ext import ApplicationHandlerStop, CommandHandler, ContextTypes, MessageHandler, TypeHandler, filters
+
+from core import config, events
+from core.deletion import delete_messages
+from core.lifecycle import on_shutdown, on_startup
+from core.ratelimit import LOW, priority
+from core.sharding import is_replica
+from core.storage import open_store
+
+MAX_REASON = 200
+MAX_IMPORT_BYTES = 5 * 1024 * 1024
+RECHECK_AFTER = 60  # seconds before acting again on the same user in the same chat
+
+_bans = open_store("gbans")  # {user_id: {"reason": str, "by": int, "date": int, "pending": True?}}
+_chats = open_store("gban_chats")  # {chat_id: True}, groups to enforce bans in
+
+_banned: Optional[Set[int]] = None  # loaded on first use, like the stores
+_known: Optional[Set[int]] = None
+_recent: "OrderedDict[tuple, float]" = OrderedDict()  # (chat_id, user_id) -> last action
+_queue: Deque[int] = deque()  # users still to be banned in every known chat
+_wakeup = asyncio.Event()
+_enforcer: Optional[asyncio.Task] = None
+
+
+def banned() -> Set[int]:
+    global _banned
+    if _banned is None:
+        _banned = {int(key) for key in _bans.keys()}
+    return _banned
+
+
+def known_chats() -> Set[int]:
+    global _known
+    if _known is None:
+        _known = {int(key) for key in _chats.keys()}
+    return _known
+
+
+def is_gbanned(user_id: int) -> bool:
+    return user_id in banned()
+
+
+def add_ban(user_id: int, reason: str, by: int) -> bool:
+    """Ban user_id everywhere; False if already listed (the reason is updated)."""
+    new = user_id not in banned()
+    _bans.set(user_id, {"reason": reason[:MAX_REASON], "by": by, "date": int(time.time()), "pending": True})
+    banned().add(user_id)
+    _queue.append(user_id)
+    _wakeup.set()
+    return new
+
+
+def remove_ban(user_id: int) -> bool:
+    if user_id not in banned():
+        return False
+    banned().discard(user_id)
+    _bans.pop(user_id)
+    return True
+
+
+def forget_chat(chat_id: int):
+    known_chats().discard(chat_id)
+    _chats.pop(chat_id)
+
+
+# ---------- enforcement ----------
+async def _ban(bot, chat_id: int, user_id: int, user=None):
+    try:
+        await bot.ban_chat_member(chat_id, user_id)
+        events.publish("gban", chat_id, target=user or user_id, detail=(_bans.get(user_id) or {}).get("reason", ""))
+    except Forbidden:
+        forget_chat(chat_id)  # bot was removed from the chat
+    except BadRequest as e:
+        if "chat not found" in str(e).lower():
+            forget_chat(chat_id)
+    except Exception:
+        pass
+
+
+def _acted_recently(chat_id: int, user_id: int) -> bool:
+    key = (chat_id, user_id)
+    now = time.monotonic()
+    last = _recent.get(key)
+    if last is not None and now - last < RECHECK_AFTER:
+        return True
+    _recent[key] = now
+    _recent.move_to_end(key)
+    while len(_recent) > 10000:
+        _recent.popitem(last=False)
+    return False
+
+
+async def _enforce(bot):
+    interval = 1 / config.GBAN_ENFORCE_PER_SEC
+    while True:
+        if not _queue:
+            _wakeup.clear()
+            await _wakeup.wait()
+            continue
+        user_id = _queue.popleft()
+        for chat_id in list(known_chats()):
+            if user_id not in banned():
+                break  # /ungban while we were at it
+            with priority(LOW):
+                await _ban(bot, chat_id, user_id)
+            await asyncio.sleep(interval)
+        record = _bans.get(user_id)
+        if record is not None and record.pop("pending", None):
+            _bans.touch(user_id)
+
+
+@on_startup
+async def _start_enforcer(app):
+    global _enforcer
+    for key, record in _bans.items():
+        if record.get("pending"):
+            _queue.append(int(key))
+    _wakeup.set()
+    # plain asyncio task: app.create_task() tasks are awaited by app.stop()
+    _enforcer = asyncio.create_task(_enforce(app.bot))
+
+
+@on_shutdown
+async def _stop_enforcer(app):
+    if _enforcer is not None:
+        _enforcer.cancel()
+
+
+# ---------- checks (group -50, before every other module) ----------
+async def check_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat = update.effective_chat
+    if chat.id not in known_chats():
+        known_chats().add(chat.id)
+        _chats.set(chat.id, True)
+
+    message = update.effective_message
+    user = update.effective_user
+    if message.new_chat_members:
+        targets = [member.id for member in message.new_chat_members if member.id in banned()]
+        if not targets:
+            return
+        for user_id in targets:
+            if not _acted_recently(chat.id, user_id):
+                await _ban(context.bot, chat.id, user_id)
+        if len(targets) < len(message.new_chat_members):
+            return  # let the other joiners be welcomed
+        raise ApplicationHandlerStop
+
+    if user is None or user.id not in banned():
+        return
+    if not _acted_recently(chat.id, user.id):
+        try:
+            await delete_messages(context.bot, chat.id, [message.message_id])
+        except Exception:
+            pass
+        await _ban(context.bot, chat.id, user.id, user)
+    raise ApplicationHandlerStop
+
+
+# ---------- owner commands ----------
+def _owner(update: Update) -> bool:
+    return update.effective_user is not None and update.effective_user.id == config.OWNER_ID
+
+
+async def _reply(update: Update, text: str):
+    if not is_replica(update):  # the chat's own shard answers
+        await update.effective_message.reply_text(text)
+
+
+def _target(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """(user_id, remaining args) from a reply or a leading numeric id."""
+    message = update.effective_message
+    args = list(context.args or [])
+    if message.reply_to_message and message.reply_to_message.from_user:
+        return message.reply_to_message.from_user.id, args
+    if args and args[0].lstrip("-").isdigit():
+        return int(args[0]), args[1:]
+    return None, args
+
+
+async def cmd_gban(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _owner(update):
+        return
+    user_id, rest = _target(update, context)
+    if user_id is None:
+        await _reply(update, "Usage: /gban <user_id> [reason], or reply to a message.")
+        return
+    if user_id in (config.OWNER_ID, context.bot.id):
+        await _reply(update, "❌ Not banning that one.")
+        return
+    reason = " ".join(rest) or "No reason provided"
+    new = add_ban(user_id, reason, update.effective_user.id)
+    await _reply(
+        update,
+        f"🌐 {'Globally banned' if new else 'Updated global ban of'} {user_id}. "
+        f"Enforcing in {len(known_chats())} chats."
+    )
+
+
+async def cmd_ungban(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _owner(update):
+        return
+    user_id, _ = _target(update, context)
+    if user_id is None:
+        await _reply(update, "Usage: /ungban <user_id>, or reply to a message.")
+        return
+    if remove_ban(user_id):
+        await _reply(
+        update,
+            f"✅ {user_id} removed from the global ban list. Existing bans in chats stay until unbanned there."
+        )
+    else:
+        await _reply(update, f"ℹ️ {user_id} is not globally banned.")
+
+
+async def cmd_gbans(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _owner(update):
+        return
+    await _reply(
+        update,
+        f"🌐 Global bans: {len(banned())} users\n"
+        f"Known chats: {len(known_chats())}\n"
+        f"Waiting to be enforced: {len(_queue)} users"
+    )
+
+
+async def cmd_gbanexport(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _owner(update):
+        return
+    data = {key: {k: v for k, v in record.items() if k != "pending"} for key, record in _bans.items()}
+    payload = json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8")
+    await update.effective_message.reply_document(io.BytesIO(payload), filename="gbans.json",
+                                                  caption=f"🌐 {len(data)} global bans")
+
+
+def parse_import(raw: bytes) -> Dict[int, str]:
+    """{user_id: reason} from an export (JSON object), a JSON list of ids, or 'id [reason]' lines."""
+    text = raw.decode("utf-8-sig", errors="replace")
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    entries: Dict[int, str] = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            reason = value.get("reason", "") if isinstance(value, dict) else str(value or "")
+            if str(key).lstrip("-").isdigit():
+                entries[int(key)] = reason
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, int) or (isinstance(item, str) and item.lstrip("-").isdigit()):
+                entries[int(item)] = ""
+    else:
+        for line in text.splitlines():
+            parts = line.strip().split(None, 1)
+            if parts and parts[0].lstrip("-").isdigit():
+                entries[int(parts[0])] = parts[1] if len(parts) > 1 else ""
+    return entries
+
+
+async def cmd_gbanimport(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _owner(update):
+        return
+    message = update.effective_message
+    reply = message.reply_to_message
+    document = reply.document if reply else None
+    if document is None:
+        await _reply(update, "Reply to a file with /gbanimport: a /gbanexport file, a JSON list of ids "
+                             "or one 'user_id [reason]' per line.")
+        return
+    if document.file_size and document.file_size > MAX_IMPORT_BYTES:
+        await _reply(update, f"❌ File too large (max {MAX_IMPORT_BYTES // 1024 // 1024} MB).")
+        return
+    try:
+        file = await context.bot.get_file(document.file_id)
+        raw = bytes(await file.download_as_bytearray())
+    except Exception as e:
+        await _reply(update, f"❌ Could not download the file: {e}")
+        return
+    entries = parse_import(raw)
+    entries.pop(config.OWNER_ID, None)
+    entries.pop(context.bot.id, None)
+    added = 0
+    for user_id, reason in entries.items():
+        if user_id not in banned():
+            add_ban(user_id, reason or "Imported", update.effective_user.id)
+            added += 1
+    await _reply(
+        update,
+        f"✅ Imported {added} new global bans ({len(entries) - added} already listed). "
+        f"Enforcing in {len(known_chats())} chats at {config.GBAN_ENFORCE_PER_SEC:g} bans/s."
+    )
+
+
+_COMMANDS = {"gban": cmd_gban, "ungban": cmd_ungban, "gbanimport": cmd_gbanimport}
+
+
+async def apply_copy(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Sharded mode: a command another shard answers, sent here only to update this shard's list."""
+    if not is_replica(update):
+        return
+    text = update.effective_message.text or ""
+    command = _COMMANDS.get(text.split(None, 1)[0][1:].split("@", 1)[0].lower() if text else "")
+    if command is not None:
+        context.args = text.split()[1:]
+        await command(update, context)
+    raise ApplicationHandlerStop
+
+
+# ---------- setup ----------
+def setup(app):
+    if config.SHARD_INDEX >= 0:  # only shard workers get copies
+        app.add_handler(TypeHandler(Update, apply_copy), -1000)
+    checked = filters.ChatType.GROUPS & (filters.StatusUpdate.NEW_CHAT_MEMBERS | ~filters.StatusUpdate.ALL)
+    app.add_handler(MessageHandler(checked, check_message), -50)
+    app.add_handler(CommandHandler("gban", cmd_gban))
+    app.add_handler(CommandHandler("ungban", cmd_ungban))
+    app.add_handler(CommandHandler("gbans", cmd_gbans))
+    app.add_handler(CommandHandler("gbanexport", cmd_gbanexport))
+    app.add_handler(CommandHandler("gbanimport", cmd_gbanimport))
+
+
+__help__ = """
+Global bans — one ban list for every chat the bot is in (bot owner only).
+
+Commands:
+ - /gban <user_id> [reason] : Ban a user in all chats (or reply to their message).
+ - /ungban <user_id> : Remove a user from the global ban list.
+ - /gbans : Number of global bans, known chats and pending enforcement.
+ - /gbanexport : Get the list as a JSON file.
+ - /gbanimport : Reply to a file to add its users (export file, JSON list or 'id reason' lines).
+"""
+
+__mod_name__ = "Global bans"
@@ -5,48 +5,117 @@ from telegram.ext import (
     MessageHandler,
     filters,
 )
+import functools
 import html
+import re
+from typing import Callable, Dict, Tuple, Union
 
-# --- In-memory settings ---
-welcome_settings = {}  # {chat_id: {"enabled": True/False, "message": str}}
-goodbye_settings = {}  # {chat_id: {"enabled": True/False, "message": str}}
+from core.ratelimit import LOW, priority
+from core.storage import open_store
+from modules import gban, raid
+
+BATCH_MENTIONS = 30  # members named in a coalesced raid welcome, the rest are counted
+
+DEFAULT_WELCOME = "Hey @{username} welcome in our Gc🎀"
+DEFAULT_GOODBYE = "Achha aadmi thaa"
+
+# --- Persistent settings ---
+welcome_settings = open_store("welcome")  # {chat_id: {"enabled": True/False, "message": str}}
+goodbye_settings = open_store("goodbye")  # {chat_id: {"enabled": True/False, "message": str}}
+
+
+# --- Templates ---
+# Placeholders, rendered for (member, chat, count). Messages are sent as HTML, but only
+# the placeholders produce markup (mentions): the admin's text and names are escaped.
+FIELDS: Dict[str, Callable] = {
+    "id": lambda m, c, n: str(m.id),
+    "first": lambda m, c, n: html.escape(m.first_name),
+    "last": lambda m, c, n: html.escape(m.last_name or ""),
+    "fullname": lambda m, c, n: html.escape(m.full_name),
+    "username": lambda m, c, n: m.mention_html(),
+    "mention": lambda m, c, n: m.mention_html(),
+    "chatname": lambda m, c, n: html.escape(c.title or ""),
+    "count": lambda m, c, n: str(n),
+}
+_FIELD_RE = re.compile(r"\{(" + "|".join(FIELDS) + r")\}")
+
+# compiled template: literal strings and placeholder getters, in order
+Template = Tuple[Union[str, Callable], ...]
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(text: str) -> Template:
+    """Split text once into escaped literals and placeholders; unknown {braces} stay literal."""
+    parts = []
+    for i, piece in enumerate(_FIELD_RE.split(text)):
+        if i % 2:
+            parts.append(FIELDS[piece])
+        elif piece:
+            parts.append(html.escape(piece, quote=False))
+    return tuple(parts)
+
+
+def uses_count(template: Template) -> bool:
+    return FIELDS["count"] in template
+
+
+def render(template: Template, member, chat, count: int = 0) -> str:
+    return "".join(p if isinstance(p, str) else p(member, chat, count) for p in template)
+
+
+def _get(store, chat_id: int, default_message: str) -> Dict:
+    return store.get(chat_id) or {"enabled": True, "message": default_message}
+
+
+async def _member_count(chat) -> int:
+    try:
+        return await chat.get_member_count()
+    except Exception:
+        return 0
 
 
 # --- Admin commands ---
 async def welcome_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     text = context.args[0].lower() if context.args else "on"
-    welcome_settings.setdefault(chat_id, {"enabled": True, "message": "Hey @{username} welcome in our Gc🎀"})
+    cfg = _get(welcome_settings, chat_id, DEFAULT_WELCOME)
 
     if text in ["no", "off"]:
-        welcome_settings[chat_id]["enabled"] = False
+        cfg["enabled"] = False
         await update.message.reply_text("✅ Welcome messages disabled.")
     else:
-        welcome_settings[chat_id]["enabled"] = True
+        cfg["enabled"] = True
         await update.message.reply_text("✅ Welcome messages enabled.")
+    welcome_settings.set(chat_id, cfg)
 
 
 async def goodbye_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     text = context.args[0].lower() if context.args else "on"
-    goodbye_settings.setdefault(chat_id, {"enabled": True, "message": "Achha aadmi thaa"})
+    cfg = _get(goodbye_settings, chat_id, DEFAULT_GOODBYE)
 
     if text in ["no", "off"]:
-        goodbye_settings[chat_id]["enabled"] = False
+        cfg["enabled"] = False
         await update.message.reply_text("✅ Goodbye messages disabled.")
     else:
-        goodbye_settings[chat_id]["enabled"] = True
+        cfg["enabled"] = True
         await update.message.reply_text("✅ Goodbye messages enabled.")
+    goodbye_settings.set(chat_id, cfg)
 
 
 async def set_welcome(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     text = " ".join(context.args)
     if not text:
-        await update.message.reply_text("Please provide a welcome message text.")
+        await update.message.reply_text(
+            "Please provide a welcome message text.\n"
+            "Placeholders: {id} {first} {last} {fullname} {username} {chatname} {count}"
+        )
         return
-    welcome_settings.setdefault(chat_id, {"enabled": True, "message": text})
-    welcome_settings[chat_id]["message"] = text
+    compile_template(text)  # compiled once here, reused for every join
+    cfg = _get(welcome_settings, chat_id, text)
+    cfg["message"] = text
+    welcome_settings.set(chat_id, cfg)
     await update.message.reply_text("✅ Welcome message set!")
 
 
@@ -56,34 +125,59 @@ async def set_goodbye(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not text:
         await update.message.reply_text("Please provide a goodbye message text.")
         return
-    goodbye_settings.setdefault(chat_id, {"enabled": True, "message": text})
-    goodbye_settings[chat_id]["message"] = text
+    compile_template(text)
+    cfg = _get(goodbye_settings, chat_id, text)
+    cfg["message"] = text
+    goodbye_settings.set(chat_id, cfg)
     await update.message.reply_text("✅ Goodbye message set!")
 
 
 # --- Auto greet handlers ---
 async def welcome_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    chat_id = update.effective_chat.id
-    cfg = welcome_settings.get(chat_id, {"enabled": True, "message": "Hey @{username} welcome in our Gc🎀"})
+    chat = update.effective_chat
+    chat_id = chat.id
+    cfg = _get(welcome_settings, chat_id, DEFAULT_WELCOME)
     if not cfg.get("enabled", True):
         return
+    # globally banned joiners were banned in group -50 already
+    members = [m for m in update.message.new_chat_members if not gban.is_gbanned(m.id)]
+
+    if raid.in_raid(chat_id):
+        # one welcome per window instead of one per member
+        flush = functools.partial(_welcome_batch, context.bot)
+        for member in members:
+            raid.batch_join("welcome", chat_id, member, flush)
+        return
+
+    template = compile_template(cfg["message"])
+    # the count already includes everyone in this update: number them in order
+    count = await _member_count(chat) - len(members) if uses_count(template) else 0
+    for member in members:
+        count += 1
+        with priority(LOW):  # greetings wait behind moderation under load
+            await update.message.reply_text(render(template, member, chat, count), parse_mode="HTML")
+
 
-    for member in update.message.new_chat_members:
-        text = cfg["message"]
-        # Replace placeholders
-        text = text.replace("{id}", str(member.id))
-        text = text.replace("{first}", html.escape(member.first_name))
-        text = text.replace("{username}", member.mention_html())
-        await update.message.reply_text(text, parse_mode="HTML")
+async def _welcome_batch(bot, chat_id: int, members):
+    named = ", ".join(m.mention_html() for m in members[:BATCH_MENTIONS])
+    if len(members) > BATCH_MENTIONS:
+        named += f" and {len(members) - BATCH_MENTIONS} more"
+    with priority(LOW):
+        await bot.send_message(chat_id, f"👋 Welcome {named}!", parse_mode="HTML")
 
 
 async def goodbye_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    cfg = goodbye_settings.get(chat_id, {"enabled": True, "message": "Achha aadmi thaa"})
+    cfg = _get(goodbye_settings, chat_id, DEFAULT_GOODBYE)
     if not cfg.get("enabled", True):
         return
-    if update.message.left_chat_member:
-        await update.message.reply_text(cfg["message"])
+    member = update.message.left_chat_member
+    if member:
+        template = compile_template(cfg["message"])
+        count = await _member_count(update.effective_chat) if uses_count(template) else 0
+        with priority(LOW):
+            await update.message.reply_text(render(template, member, update.effective_chat, count),
+                                            parse_mode="HTML")
 
 
 # --- Setup function to add handlers ---
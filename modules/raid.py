@@ -0,0 +1,234 @@
+# modules/raid.py
+# Join-rate detector. Above a chat's threshold the chat enters raid mode:
+# greetings coalesce welcomes, captcha batches challenges and (optionally) new
+# members are restricted for a while. Raid mode ends by itself once joins calm down.
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Set, Tuple
+
+from telegram import Update, ChatPermissions
+from telegram.ext import CommandHandler, MessageHandler, ContextTypes, filters
+
+from core.admin_cache import admin_cache
+from core.lifecycle import every
+from core.settings import ChatSettings, SettingsRegistry
+from core.storage import open_store
+
+DEFAULT_CFG = {"joins": 10, "window": 60, "restrict": False, "restrict_for": 600}
+COOLDOWN = 120  # seconds below the threshold before raid mode turns off
+BATCH_WINDOW = 5  # seconds joins are collected into one welcome / one captcha message
+
+
+class RaidSettings(ChatSettings):
+    __slots__ = tuple(DEFAULT_CFG)
+    DEFAULTS = DEFAULT_CFG
+
+
+raid_settings = SettingsRegistry(open_store("raid"), RaidSettings)  # "joins": 0 disables detection
+
+
+class RaidState:
+    __slots__ = ("joins", "active", "hot_until", "settings")
+
+    def __init__(self, settings: RaidSettings):
+        self.joins: Deque[float] = deque()
+        self.active = False
+        self.hot_until = 0.0  # raid stays on at least until then
+        self.settings = settings  # refreshed when /setraid changes it
+
+
+_state: Dict[int, RaidState] = {}
+_batches: Dict[Tuple[str, int], List[Any]] = {}  # (kind, chat_id) -> items waiting for the window
+_flushing: Set[asyncio.Task] = set()
+
+
+def get_cfg(chat_id: int) -> Dict[str, Any]:
+    """Editable copy of the chat's settings (commands); handlers use raid_settings."""
+    return raid_settings.get(chat_id).to_dict()
+
+
+def _current(chat_id: int, state: RaidState) -> RaidSettings:
+    state.settings = raid_settings.refresh(chat_id, state.settings)
+    return state.settings
+
+
+def in_raid(chat_id: int) -> bool:
+    state = _state.get(chat_id)
+    return state is not None and state.active
+
+
+def record_joins(chat_id: int, count: int, now: float = None) -> bool:
+    """Count `count` joins; returns True if this call switched raid mode on."""
+    state = _state.get(chat_id)
+    cfg = raid_settings.get(chat_id) if state is None else _current(chat_id, state)
+    if not cfg.joins:
+        return False
+    now = time.monotonic() if now is None else now
+    if state is None:
+        state = _state[chat_id] = RaidState(cfg)
+    joins = state.joins
+    for _ in range(count):
+        joins.append(now)
+    while joins and now - joins[0] > cfg.window:
+        joins.popleft()
+    while len(joins) > cfg.joins:
+        joins.popleft()  # only need to know the threshold was reached
+    if len(joins) >= cfg.joins:
+        state.hot_until = now + COOLDOWN
+        if not state.active:
+            state.active = True
+            return True
+    return False
+
+
+def batch_join(kind: str, chat_id: int, item: Any,
+               flush: Callable[[int, List[Any]], Awaitable[None]]):
+    """
+    Collect `item` (a member, or whatever the caller needs) for chat_id; BATCH_WINDOW
+    seconds after the first one, flush(chat_id, items) is run once for all of them.
+    """
+    key = (kind, chat_id)
+    batch = _batches.get(key)
+    if batch is None:
+        batch = _batches[key] = []
+        asyncio.get_running_loop().call_later(BATCH_WINDOW, _flush_batch, key, flush)
+    batch.append(item)
+
+
+def _flush_batch(key: Tuple[str, int], flush):
+    items = _batches.pop(key, None)
+    if items:
+        task = asyncio.get_running_loop().create_task(_run_flush(flush, key, items))
+        _flushing.add(task)
+        task.add_done_callback(_flushing.discard)
+
+
+async def _run_flush(flush, key, items):
+    try:
+        await flush(key[1], items)
+    except Exception as e:
+        print(f"⚠️ Raid {key[0]} batch for chat {key[1]} failed: {e}")
+
+
+@every(10)
+async def _revert_calm_chats(app):
+    now = time.monotonic()
+    for chat_id, state in list(_state.items()):
+        window = _current(chat_id, state).window
+        while state.joins and now - state.joins[0] > window:
+            state.joins.popleft()
+        if state.active and now >= state.hot_until:
+            state.active = False
+            try:
+                await app.bot.send_message(chat_id, "✅ Join rate is back to normal, raid mode off.")
+            except Exception:
+                pass
+        if not state.active and not state.joins:
+            del _state[chat_id]
+
+
+# --- join tracking (runs before greetings and captcha) ---
+async def track_joins(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat = update.effective_chat
+    members = [m for m in update.message.new_chat_members if not m.is_bot]
+    if not members:
+        return
+    if record_joins(chat.id, len(members)):
+        cfg = raid_settings.get(chat.id)
+        try:
+            await chat.send_message(
+                f"🚨 Raid detected ({cfg.joins}+ joins in {cfg.window}s). "
+                "Welcomes and captchas are batched"
+                + (", new members are restricted" if cfg.restrict else "") + "."
+            )
+        except Exception:
+            pass
+    if in_raid(chat.id):
+        cfg = raid_settings.get(chat.id)
+        if cfg.restrict:
+            until = datetime.utcnow() + timedelta(seconds=cfg.restrict_for)
+            for member in members:
+                try:
+                    await context.bot.restrict_chat_member(
+                        chat.id, member.id, ChatPermissions(can_send_messages=False), until_date=until
+                    )
+                except Exception:
+                    pass
+
+
+# --- admin commands ---
+async def _check_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    if not await admin_cache.is_admin(context.bot, update.effective_chat.id, update.effective_user.id):
+        await update.message.reply_text("❌ Only admins can change raid settings.")
+        return False
+    return True
+
+
+async def cmd_raid(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    cfg = get_cfg(chat_id)
+    text = "🚨 <b>Raid protection</b>\n\n"
+    if cfg["joins"]:
+        text += f"• Trigger: <b>{cfg['joins']}</b> joins in <b>{cfg['window']}s</b>\n"
+    else:
+        text += "• Trigger: <b>disabled</b>\n"
+    text += f"• Restrict new members during raid: <b>{'yes' if cfg['restrict'] else 'no'}</b>"
+    if cfg["restrict"]:
+        text += f" ({cfg['restrict_for']}s)"
+    text += f"\n• Raid mode now: <b>{'ON' if in_raid(chat_id) else 'off'}</b>"
+    await update.message.reply_text(text, parse_mode="HTML")
+
+
+async def cmd_setraid(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await _check_admin(update, context):
+        return
+    args = context.args or []
+    chat_id = update.effective_chat.id
+    cfg = get_cfg(chat_id)
+    if args and args[0].lower() in ("off", "no", "0"):
+        cfg["joins"] = 0
+        raid_settings.replace(chat_id, cfg)
+        await update.message.reply_text("✅ Raid detection disabled.")
+        return
+    if len(args) < 2 or not args[0].isdigit() or not args[1].isdigit() or int(args[0]) < 2:
+        await update.message.reply_text("Usage: /setraid <joins> <seconds> or /setraid off\nExample: /setraid 10 60")
+        return
+    cfg["joins"], cfg["window"] = int(args[0]), int(args[1])
+    raid_settings.replace(chat_id, cfg)
+    await update.message.reply_text(f"✅ Raid mode triggers at {cfg['joins']} joins in {cfg['window']}s.")
+
+
+async def cmd_raidrestrict(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await _check_admin(update, context):
+        return
+    args = context.args or []
+    chat_id = update.effective_chat.id
+    cfg = get_cfg(chat_id)
+    cfg["restrict"] = bool(args) and args[0].lower() in ("on", "yes")
+    if cfg["restrict"] and len(args) >= 2 and args[1].isdigit():
+        cfg["restrict_for"] = max(60, int(args[1]))
+    raid_settings.replace(chat_id, cfg)
+    await update.message.reply_text("✅ New members will be restricted during raids." if cfg["restrict"]
+                                    else "✅ New members won't be restricted during raids.")
+
+
+# --- setup ---
+def setup(app):
+    app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, track_joins), -1)
+    app.add_handler(CommandHandler("raid", cmd_raid, filters=filters.ChatType.GROUPS))
+    app.add_handler(CommandHandler("setraid", cmd_setraid, filters=filters.ChatType.GROUPS))
+    app.add_handler(CommandHandler("raidrestrict", cmd_raidrestrict, filters=filters.ChatType.GROUPS))
+
+
+__help__ = """
+Raid protection — calmer handling of mass joins.
+
+Commands:
+ - /raid : Show raid settings and whether raid mode is on.
+ - /setraid <joins> <seconds/off> : Enter raid mode above this join rate (example: /setraid 10 60).
+ - /raidrestrict <on/off> [seconds] : Restrict members who join during a raid.
+"""
+
+__mod_name__ = "Raid"
@@ -1,71 +1,210 @@
 # modules/warn.py
-import json
-import os
-from datetime import datetime, timedelta
-from telegram import Update, ChatPermissions
+# Warnings with per-chat limits, an escalation ladder and decay.
+#
+# Reaching the chat's limit applies the next ladder step (by default a 10 minute
+# mute, then a 1 day ban, then a ban) and starts the count over. With /setwarndecay
+# one warning expires per decay period, and one strike per `limit` periods. Decay is
+# worked out when a record is read, from the time of the last change, so nothing
+# scans the store for it; an hourly pass drops records that decayed to nothing, and
+# only visits the chats that have decay on.
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes, filters
 
+from core import events
+from core.actions import apply_action, parse_duration
+from core.admin_cache import admin_cache
+from core.lifecycle import every
+from core.storage import open_store
+
+MAX_REASONS = 10  # reasons kept per user, newest last
+MAX_REASON_LENGTH = 200
+MAX_LIMIT = 20
+MAX_LADDER = 5
+COMPACT_INTERVAL = 3600
+
+DEFAULT_CFG = {
+    "limit": 3,
+    "ladder": [{"mode": "tmute", "duration": 600}, {"mode": "tban", "duration": 86400}, {"mode": "ban", "duration": None}],
+    "decay": None,  # seconds per warning, None = warnings never expire
+}
+
 # -------- Storage --------
-DATA_FILE = "data/warnings.json"
+# Structure: {str(chat_id): {str(user_id): {"count": int, "reasons": [], "last": ts, "strikes": int, "struck": ts}}},
+# one row per user on sqlite. "last"/"struck" are the epoch seconds decay is counted from.
+_store = open_store("warnings", nested=True)
+_settings = open_store("warn_settings")  # {chat_id: cfg}
+
+_decaying: Optional[Set[str]] = None  # chats with decay on, read from _settings on first use
+
+def get_cfg(chat_id: int) -> Dict[str, Any]:
+    return {**DEFAULT_CFG, **(_settings.get(chat_id) or {})}
 
-if not os.path.exists("data"):
-    os.makedirs("data")
+def decaying_chats() -> Set[str]:
+    global _decaying
+    if _decaying is None:
+        _decaying = {key for key, cfg in _settings.items() if cfg and cfg.get("decay")}
+    return _decaying
 
-if os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "r") as f:
-        WARNINGS = json.load(f)
-else:
-    WARNINGS = {}  # Structure: {str(chat_id): {str(user_id): {"count": int, "reasons": []}}}
+def save_warnings(chat_id: int, user_id: int):
+    _store.touch(chat_id, user_id)  # written behind, bursts of /warn cost one disk write
 
-def save_warnings():
-    with open(DATA_FILE, "w") as f:
-        json.dump(WARNINGS, f, indent=2)
+# -------- Decay --------
+def _decay(record: Dict[str, Any], cfg: Dict[str, Any], now: float) -> bool:
+    """Apply the warnings/strikes that expired since the record last changed. True if it did."""
+    decay = cfg.get("decay")
+    if not decay:
+        return False
+    changed = False
+    for stamp in ("last", "struck"):
+        if stamp not in record:  # written before decay existed: count from now
+            record[stamp] = now
+            changed = True
+    if record["count"]:
+        expired = int((now - record["last"]) // decay)
+        if expired:
+            record["count"] = max(0, record["count"] - expired)
+            record["last"] += expired * decay
+            keep = min(record["count"], MAX_REASONS)
+            record["reasons"] = record["reasons"][-keep:] if keep else []
+            changed = True
+    if record.get("strikes"):
+        period = decay * cfg["limit"]
+        expired = int((now - record["struck"]) // period)
+        if expired:
+            record["strikes"] = max(0, record["strikes"] - expired)
+            record["struck"] += expired * period
+            changed = True
+    return changed
+
+def _empty(record: Dict[str, Any]) -> bool:
+    return not record["count"] and not record.get("strikes")
 
 # -------- Helper Functions --------
-def get_user_warn(chat_id: int, user_id: int):
-    chat_id, user_id = str(chat_id), str(user_id)
-    return WARNINGS.setdefault(chat_id, {}).setdefault(user_id, {"count": 0, "reasons": []})
+def get_user_warn(chat_id: int, user_id: int, cfg: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """The user's record with decay applied, or None if there's nothing left (the record is dropped)."""
+    chat_warns = _store.get(chat_id)
+    record = chat_warns.get(str(user_id)) if chat_warns else None
+    if record is None:
+        return None
+    if _decay(record, cfg or get_cfg(chat_id), time.time()):
+        if _empty(record):
+            del chat_warns[str(user_id)]
+            record = None
+        save_warnings(chat_id, user_id)
+    return record
 
-async def apply_mute(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
-    try:
-        await context.bot.restrict_chat_member(
-            chat_id=update.effective_chat.id,
-            user_id=user_id,
-            permissions=ChatPermissions(can_send_messages=False),
-            until_date=datetime.utcnow() + timedelta(minutes=10)  # mute 10 min
-        )
-        await update.effective_chat.send_message(f"⚠️ User has been muted for 10 minutes due to 3 warnings!")
-    except Exception as e:
-        await update.effective_chat.send_message(f"❌ Failed to mute user: {e}")
+def add_warning(chat_id: int, user_id: int, reason: str, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    now = time.time()
+    record = get_user_warn(chat_id, user_id, cfg)
+    if record is None:
+        record = _store.setdefault(chat_id, {})[str(user_id)] = {"count": 0, "reasons": []}
+    record["count"] += 1
+    record["last"] = now  # the decay period starts over with each warning
+    record["reasons"] = (record["reasons"] + [reason[:MAX_REASON_LENGTH]])[-MAX_REASONS:]
+    save_warnings(chat_id, user_id)
+    return record
+
+def ladder_step(cfg: Dict[str, Any], strikes: int) -> Dict[str, Any]:
+    """Step for the (strikes + 1)-th time the limit is reached; the last step repeats."""
+    ladder = cfg["ladder"] or DEFAULT_CFG["ladder"]
+    return ladder[min(strikes, len(ladder) - 1)]
+
+def _fmt_duration(seconds: Optional[int]) -> str:
+    if not seconds:
+        return ""
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+def describe_step(step: Dict[str, Any]) -> str:
+    names = {"tmute": "mute", "tban": "ban", "mute": "mute", "ban": "ban", "kick": "kick"}
+    duration = _fmt_duration(step.get("duration"))
+    return f"{names[step['mode']]} {duration}" if duration else names[step["mode"]]
+
+def parse_ladder(text: str) -> List[Dict[str, Any]]:
+    """'mute 10m, ban 1d, ban' -> ladder steps. Raises ValueError."""
+    steps = []
+    for part in text.split(","):
+        words = part.split()
+        if not words:
+            continue
+        mode = words[0].lower()
+        if mode not in ("mute", "ban", "kick"):
+            raise ValueError(f"unknown action '{words[0]}', use mute / ban / kick")
+        duration = None
+        if len(words) > 1:
+            duration = parse_duration(words[1])
+            if duration is None:
+                raise ValueError(f"couldn't parse duration '{words[1]}'")
+            if mode == "kick":
+                raise ValueError("kick takes no duration")
+            mode = "t" + mode
+        steps.append({"mode": mode, "duration": duration})
+    if not 1 <= len(steps) <= MAX_LADDER:
+        raise ValueError(f"give 1 to {MAX_LADDER} steps")
+    return steps
+
+async def escalate(update: Update, context: ContextTypes.DEFAULT_TYPE, user, record: Dict[str, Any],
+                   cfg: Dict[str, Any]):
+    chat_id = update.effective_chat.id
+    step = ladder_step(cfg, record.get("strikes", 0))
+    err = await apply_action(context.bot, chat_id, user.id, step["mode"], step.get("duration"), None)
+    if err:
+        await update.effective_chat.send_message(f"❌ Failed to {describe_step(step)} user: {err}")
+        return
+    record["count"] = 0
+    record["reasons"] = []
+    record["strikes"] = record.get("strikes", 0) + 1
+    record["struck"] = time.time()
+    save_warnings(chat_id, user.id)
+    events.publish("warn_limit", update.effective_chat, target=user,
+                   detail=f"{describe_step(step)} (strike {record['strikes']})")
+    await update.effective_chat.send_message(
+        f"⚠️ {user.mention_html()} reached {cfg['limit']} warnings. Action: {describe_step(step)} "
+        f"(strike {record['strikes']}).",
+        parse_mode="HTML"
+    )
+
+async def _check_admin(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                       action: str = "change warning settings") -> bool:
+    if not await admin_cache.is_admin(context.bot, update.effective_chat.id, update.effective_user.id):
+        await update.message.reply_text(f"❌ Only admins can {action}.")
+        return False
+    return True
 
 # -------- Commands --------
 async def warn_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await _check_admin(update, context, "warn users"):
+        return
     if not update.message.reply_to_message:
         await update.message.reply_text("❌ Reply to the user's message to warn them.")
         return
 
     user = update.message.reply_to_message.from_user
     chat_id = update.effective_chat.id
+    if user.id == context.bot.id or await admin_cache.is_admin(context.bot, chat_id, user.id):
+        await update.message.reply_text("❌ Admins can't be warned.")
+        return
     reason = " ".join(context.args) or "No reason provided"
+    cfg = get_cfg(chat_id)
 
-    user_warn = get_user_warn(chat_id, user.id)
-    user_warn["count"] += 1
-    user_warn["reasons"].append(reason)
-    save_warnings()
+    user_warn = add_warning(chat_id, user.id, reason, cfg)
+    events.publish("warn", update.effective_chat, target=user, actor=update.effective_user,
+                   detail=f"{reason} ({user_warn['count']}/{cfg['limit']})")
 
     await update.effective_chat.send_message(
         f"⚠️ {user.mention_html()} has been warned!\n"
         f"Reason: {reason}\n"
-        f"Total Warnings: {user_warn['count']}",
+        f"Total Warnings: {user_warn['count']}/{cfg['limit']}",
         parse_mode="HTML"
     )
 
-    # Auto-mute after 3 warnings
-    if user_warn["count"] >= 3:
-        await apply_mute(update, context, user.id)
-        user_warn["count"] = 0
-        user_warn["reasons"] = []
-        save_warnings()
+    if user_warn["count"] >= cfg["limit"]:
+        await escalate(update, context, user, user_warn, cfg)
 
 async def show_warnings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.message.reply_to_message:
@@ -78,33 +217,134 @@ async def show_warnings(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Reply to a user or provide user ID to see warnings.")
         return
 
-    user_warn = get_user_warn(update.effective_chat.id, user.id)
+    cfg = get_cfg(update.effective_chat.id)
+    user_warn = get_user_warn(update.effective_chat.id, user.id, cfg) or {"count": 0, "reasons": []}
     count = user_warn["count"]
     reasons = user_warn["reasons"]
-    text = f"⚠️ {user.mention_html()} has {count} warnings.\n"
+    strikes = user_warn.get("strikes", 0)
+    text = f"⚠️ {user.mention_html()} has {count}/{cfg['limit']} warnings.\n"
     if reasons:
         text += "Reasons:\n" + "\n".join(f"- {r}" for r in reasons)
     else:
         text += "No reasons recorded."
+    if strikes:
+        text += f"\nTimes the limit was reached: {strikes}"
+    text += f"\nNext action: {describe_step(ladder_step(cfg, strikes))}"
     await update.message.reply_text(text, parse_mode="HTML")
 
 async def reset_warnings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await _check_admin(update, context, "reset warnings"):
+        return
     if not update.message.reply_to_message:
         await update.message.reply_text("❌ Reply to a user to reset their warnings.")
         return
 
     user = update.message.reply_to_message.from_user
-    chat_id = str(update.effective_chat.id)
+    chat_id = update.effective_chat.id
+    chat_warns = _store.get(chat_id, {})
 
-    if chat_id in WARNINGS and str(user.id) in WARNINGS[chat_id]:
-        del WARNINGS[chat_id][str(user.id)]
-        save_warnings()
+    if str(user.id) in chat_warns:
+        del chat_warns[str(user.id)]
+        save_warnings(chat_id, user.id)
+        events.publish("unwarn", update.effective_chat, target=user, actor=update.effective_user)
         await update.message.reply_text(f"✅ Warnings for {user.mention_html()} have been reset.", parse_mode="HTML")
     else:
         await update.message.reply_text(f"ℹ️ {user.mention_html()} has no warnings.", parse_mode="HTML")
 
+async def warn_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    cfg = get_cfg(update.effective_chat.id)
+    ladder = " → ".join(describe_step(step) for step in cfg["ladder"])
+    decay = f"one warning every {_fmt_duration(cfg['decay'])}" if cfg["decay"] else "never"
+    await update.message.reply_text(
+        "⚠️ <b>Warning settings</b>\n\n"
+        f"• Limit: <b>{cfg['limit']}</b> warnings\n"
+        f"• Actions: <b>{ladder}</b> (last one repeats)\n"
+        f"• Warnings expire: <b>{decay}</b>",
+        parse_mode="HTML"
+    )
+
+async def set_warn_limit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await _check_admin(update, context):
+        return
+    args = context.args or []
+    if not args or not args[0].isdigit() or not 1 <= int(args[0]) <= MAX_LIMIT:
+        await update.message.reply_text(f"Usage: /setwarnlimit <1-{MAX_LIMIT}>")
+        return
+    chat_id = update.effective_chat.id
+    cfg = get_cfg(chat_id)
+    cfg["limit"] = int(args[0])
+    _settings.set(chat_id, cfg)
+    await update.message.reply_text(f"✅ Action after {cfg['limit']} warnings.")
+
+async def set_warn_ladder(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await _check_admin(update, context):
+        return
+    try:
+        ladder = parse_ladder(" ".join(context.args or []))
+    except ValueError as e:
+        await update.message.reply_text(
+            f"Usage: /setwarnladder <action> [duration], ...\nExample: /setwarnladder mute 10m, ban 1d, ban\n{e}"
+        )
+        return
+    chat_id = update.effective_chat.id
+    cfg = get_cfg(chat_id)
+    cfg["ladder"] = ladder
+    _settings.set(chat_id, cfg)
+    await update.message.reply_text("✅ Actions: " + " → ".join(describe_step(step) for step in ladder))
+
+async def set_warn_decay(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await _check_admin(update, context):
+        return
+    args = context.args or []
+    if not args:
+        await update.message.reply_text("Usage: /setwarndecay <duration/off>\nExample: /setwarndecay 7d")
+        return
+    decay = parse_duration(args[0])
+    if decay is None and args[0].lower() not in ("off", "no", "none"):
+        await update.message.reply_text("Couldn't parse duration. Use examples: 12h, 7d")
+        return
+    chat_id = update.effective_chat.id
+    cfg = get_cfg(chat_id)
+    cfg["decay"] = decay or None
+    _settings.set(chat_id, cfg)
+    if decay:
+        decaying_chats().add(str(chat_id))
+    else:
+        decaying_chats().discard(str(chat_id))
+    await update.message.reply_text(f"✅ One warning expires every {_fmt_duration(decay)}." if decay
+                                    else "✅ Warnings no longer expire.")
+
+# -------- Compaction --------
+def compact(now: Optional[float] = None) -> int:
+    """Apply decay to the records of chats with decay on and drop the empty ones. Returns records removed."""
+    now = time.time() if now is None else now
+    removed = 0
+    for chat_key in list(decaying_chats()):
+        chat_warns = _store.get(chat_key)
+        if chat_warns is None:
+            continue
+        cfg = get_cfg(chat_key)
+        for user_key in list(chat_warns):
+            record = chat_warns[user_key]
+            if _decay(record, cfg, now) or _empty(record):
+                if _empty(record):
+                    del chat_warns[user_key]
+                    removed += 1
+                _store.touch(chat_key, user_key)
+        if not chat_warns:
+            _store.pop(chat_key)
+    return removed
+
+@every(COMPACT_INTERVAL)
+async def _compact_warnings(app):
+    compact()
+
 # -------- Setup --------
 def setup(app):
     app.add_handler(CommandHandler("warn", warn_user, filters=filters.ChatType.GROUPS))
     app.add_handler(CommandHandler("warnings", show_warnings, filters=filters.ChatType.GROUPS))
     app.add_handler(CommandHandler("resetwarnings", reset_warnings, filters=filters.ChatType.GROUPS))
+    app.add_handler(CommandHandler("warnsettings", warn_settings, filters=filters.ChatType.GROUPS))
+    app.add_handler(CommandHandler("setwarnlimit", set_warn_limit, filters=filters.ChatType.GROUPS))
+    app.add_handler(CommandHandler("setwarnladder", set_warn_ladder, filters=filters.ChatType.GROUPS))
+    app.add_handler(CommandHandler("setwarndecay", set_warn_decay, filters=filters.ChatType.GROUPS))
@@ -0,0 +1,9 @@
+# tests/conftest.py
+# Modules open their stores at import time, so point them at a scratch directory first.
+import os
+import sys
+import tempfile
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="bot-tests-")
+os.environ["METRICS_PORT"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+# tests/test_admin_cache.py
+import asyncio
+from types import SimpleNamespace
+
+from core.admin_cache import AdminCache
+
+
+class SlowBot:
+    """get_chat_administrators answers with the roster as it was when the call started."""
+
+    def __init__(self, admins):
+        self.admins = admins
+        self.calls = 0
+        self.release = None
+
+    async def get_chat_administrators(self, chat_id):
+        self.calls += 1
+        snapshot = list(self.admins)
+        if self.release is not None:
+            await self.release.wait()
+        return [SimpleNamespace(user=SimpleNamespace(id=uid), status="administrator") for uid in snapshot]
+
+
+async def settle():
+    for _ in range(10):  # let the created tasks run up to their first real wait
+        await asyncio.sleep(0)
+
+
+def test_concurrent_misses_share_one_call():
+    async def main():
+        cache, bot = AdminCache(), SlowBot([1])
+        bot.release = asyncio.Event()
+        checks = [asyncio.create_task(cache.is_admin(bot, -1, 1)) for _ in range(5)]
+        await settle()
+        bot.release.set()
+        assert all(await asyncio.gather(*checks))
+        assert bot.calls == 1
+        assert await cache.is_admin(bot, -1, 1) and bot.calls == 1
+    asyncio.run(main())
+
+
+def test_fetch_started_before_invalidate_is_not_cached():
+    async def main():
+        cache, bot = AdminCache(), SlowBot([1])
+        bot.release = asyncio.Event()
+        early = asyncio.create_task(cache.is_admin(bot, -1, 2))
+        await settle()  # the fetch has read the old roster
+        bot.admins.append(2)  # user 2 promoted...
+        cache.invalidate(-1)  # ...and the ChatMemberUpdated arrives
+        late = asyncio.create_task(cache.is_admin(bot, -1, 2))
+        await settle()
+        bot.release.set()
+        assert not await early  # asked before the promotion
+        assert await late
+        assert bot.calls == 2
+        bot.release = None
+        assert await cache.is_admin(bot, -1, 2) and bot.calls == 2  # the fresh roster was kept
+        assert not cache._inflight and not cache._generation
+    asyncio.run(main())
+
+
+def test_invalidate_without_fetch():
+    async def main():
+        cache, bot = AdminCache(), SlowBot([1])
+        assert await cache.is_admin(bot, -1, 1)
+        cache.invalidate(-1)
+        cache.invalidate(-1)
+        assert cache.invalidations == 1 and not cache._generation
+        assert await cache.is_admin(bot, -1, 1) and bot.calls == 2
+    asyncio.run(main())
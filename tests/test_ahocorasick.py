@@ -0,0 +1,60 @@
+# tests/test_ahocorasick.py
+import random
+
+from core.ahocorasick import TriggerMatcher
+
+
+def naive(triggers, text):
+    return next((t for t in triggers if t in text), None)
+
+
+def test_earliest_added_wins_not_earliest_in_text():
+    matcher = TriggerMatcher(["hers", "she", "he"])
+    assert matcher.first_match("ushers") == "hers"
+    assert matcher.first_match("she said") == "she"
+    assert matcher.first_match("the end") == "he"
+    assert matcher.first_match("nothing") is None
+
+
+def test_explicit_priority():
+    matcher = TriggerMatcher()
+    matcher.add("cat", priority=5)
+    matcher.add("dog", priority=1)
+    matcher.add("bird")  # after everything so far: 6
+    assert matcher.first_match("cat dog bird") == "dog"
+    assert matcher.first_match("bird cat") == "cat"
+
+
+def test_matches_naive_loop():
+    rng = random.Random(7)
+    for _ in range(200):
+        triggers = list(dict.fromkeys("".join(rng.choice("abc") for _ in range(rng.randint(1, 4)))
+                                      for _ in range(rng.randint(1, 10))))
+        matcher = TriggerMatcher(triggers)
+        for _ in range(10):
+            text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 20)))
+            assert matcher.first_match(text) == naive(triggers, text)
+
+
+def test_remove_and_readd():
+    matcher = TriggerMatcher(["spam", "am", "eggs"])
+    matcher.remove("spam")
+    matcher.remove("missing")
+    assert "spam" not in matcher and len(matcher) == 2
+    assert matcher.first_match("spam") == "am"
+    matcher.add("spam")  # back at the end of the order
+    assert matcher.first_match("spam") == "am"
+
+
+def test_compaction_after_many_removals():
+    triggers = [f"word{i}" for i in range(50)]
+    matcher = TriggerMatcher(triggers)
+    matcher.first_match("")
+    nodes = len(matcher._goto)
+    for trigger in triggers[:45]:
+        matcher.remove(trigger)
+    assert matcher.first_match("word47 word46") == "word46"
+    assert len(matcher._goto) < nodes // 2 and matcher._dead == 0
+    assert matcher.first_match("word3") is None
+    matcher.add("word3")
+    assert matcher.first_match("word3 word49") == "word49"  # kept its place before the re-added one
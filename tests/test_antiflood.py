@@ -0,0 +1,53 @@
+# tests/test_antiflood.py
+import pytest
+
+from modules.antiflood import MAX_TIMER_COUNT, MIN_TIMER_COUNT, FloodSettings, UserRing
+
+
+def test_ring_fills_and_wraps():
+    ring = UserRing(3)
+    assert ring.capacity == 3 and not ring.full()
+    ring.push(1.0)
+    ring.push(2.0)
+    assert ring.oldest() == 1.0 and ring.newest() == 2.0 and not ring.full()
+    ring.push(3.0)
+    assert ring.full() and ring.oldest() == 1.0 and ring.newest() == 3.0
+    ring.push(4.0)
+    assert ring.full() and ring.oldest() == 2.0 and ring.newest() == 4.0
+
+
+def test_ring_oldest_is_the_capacity_th_latest():
+    ring = UserRing(5)
+    for ts in range(1, 23):
+        ring.push(float(ts))
+    assert ring.oldest() == 18.0 and ring.newest() == 22.0
+
+
+def test_settings_defaults():
+    s = FloodSettings.from_dict({})
+    assert not s.enabled
+    assert (s.limit, s.mode, s.timer_count, s.dupe_users, s.action_duration) == (0, "mute", 0, 0, None)
+
+
+@pytest.mark.parametrize("count, expected", [
+    (None, 0), (0, 0), (-3, 0), (1, MIN_TIMER_COUNT), (10, 10), (10 ** 6, MAX_TIMER_COUNT),
+])
+def test_settings_timer_count_clamped(count, expected):
+    s = FloodSettings.from_dict({"timer": {"count": count, "duration": 30}})
+    assert s.timer_count == expected
+    assert s.enabled == bool(expected)
+    if expected:
+        UserRing(s.timer_count)  # a negative count used to crash here
+
+
+def test_settings_action_duration_only_for_temporary_modes():
+    assert FloodSettings.from_dict({"limit": 5, "mode": "tmute", "temp_default": 600}).action_duration == 600
+    assert FloodSettings.from_dict({"limit": 5, "mode": "ban", "temp_default": 600}).action_duration is None
+
+
+def test_settings_to_dict_round_trip():
+    raw = {"limit": 4, "timer": {"count": 5, "duration": 10}, "mode": "kick", "clear": True,
+           "temp_default": None, "dupe": {"users": 3, "window": 60}}
+    s = FloodSettings.from_dict(raw)
+    assert s.to_dict() == raw
+    assert (s.dupe_users, s.dupe_window, s.timer_duration) == (3, 60, 10)
@@ -0,0 +1,46 @@
+# tests/test_captcha.py
+import asyncio
+from types import SimpleNamespace
+
+from telegram import ChatPermissions
+
+from modules import captcha
+from modules.captcha import UNMUTED, _add_challenge, _pop_expired, _release, pending_captcha
+
+
+class RecordingBot:
+    def __init__(self, permissions=None, fail=False):
+        self.permissions = permissions
+        self.fail = fail
+        self.restricted = []
+
+    async def get_chat(self, chat_id):
+        if self.fail:
+            raise RuntimeError("getChat failed")
+        return SimpleNamespace(permissions=self.permissions)
+
+    async def restrict_chat_member(self, chat_id, user_id, permissions):
+        self.restricted.append((chat_id, user_id, permissions))
+
+
+def test_full_queue_refuses_new_challenges(monkeypatch):
+    monkeypatch.setattr(captcha.config, "CAPTCHA_MAX_PENDING", 2)
+    monkeypatch.setattr(captcha, "pending_captcha", type(pending_captcha)())
+    assert _add_challenge(-1, 1, 5, True) is not None
+    assert _add_challenge(-1, 2, 5, True) is not None
+    assert _add_challenge(-1, 3, 5, True) is None
+    assert _add_challenge(-1, 1, 7, True).answer == 7  # a re-challenge still fits
+    # nobody is kicked before their time is up
+    assert _pop_expired(0) == []
+    assert len(captcha.pending_captcha) == 2
+
+
+def test_release_restores_chat_defaults():
+    defaults = ChatPermissions(can_send_messages=True, can_send_photos=False)
+    bot = RecordingBot(defaults)
+    asyncio.run(_release(bot, -1, 5))
+    assert bot.restricted == [(-1, 5, defaults)]
+
+    bot = RecordingBot(fail=True)
+    asyncio.run(_release(bot, -1, 5))
+    assert bot.restricted == [(-1, 5, UNMUTED)]
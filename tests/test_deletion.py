@@ -0,0 +1,52 @@
+# tests/test_deletion.py
+import asyncio
+
+from telegram.error import BadRequest
+
+from core.deletion import BATCH_SIZE, DeleteResult, delete_messages
+
+
+class SingleBot:
+    """Only deleteMessage; ids in `gone` no longer exist."""
+
+    def __init__(self, gone=()):
+        self.gone = set(gone)
+        self.deleted = []
+
+    async def delete_message(self, chat_id, message_id):
+        if message_id in self.gone:
+            raise BadRequest("Message to delete not found")
+        self.deleted.append(message_id)
+        return True
+
+
+class BatchBot(SingleBot):
+    def __init__(self, gone=(), batch_error=None):
+        super().__init__(gone)
+        self.batch_error = batch_error
+        self.batches = []
+
+    async def delete_messages(self, chat_id, message_ids):
+        if self.batch_error is not None:
+            raise self.batch_error
+        self.batches.append(list(message_ids))
+        return True
+
+
+def test_single_deletes_count_only_confirmed():
+    bot = SingleBot(gone={2, 3})
+    result = asyncio.run(delete_messages(bot, -1, [1, 2, 3, 4, 4]))
+    assert result == DeleteResult(deleted=2, requested=0) and result.confirmed
+
+
+def test_batched_deletes_are_only_requested():
+    bot = BatchBot(gone={2})
+    result = asyncio.run(delete_messages(bot, -1, range(BATCH_SIZE + 5)))
+    assert result == DeleteResult(deleted=0, requested=BATCH_SIZE + 5) and not result.confirmed
+    assert [len(batch) for batch in bot.batches] == [BATCH_SIZE, 5]
+
+
+def test_refused_batch_falls_back_to_confirmed_singles():
+    bot = BatchBot(gone={1}, batch_error=BadRequest("Message can't be deleted"))
+    result = asyncio.run(delete_messages(bot, -1, [1, 2, 3]))
+    assert result == DeleteResult(deleted=2, requested=0)
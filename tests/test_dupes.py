@@ -0,0 +1,66 @@
+# tests/test_dupes.py
+from types import SimpleNamespace
+
+from core import dupes
+from core.dupes import MAX_SIGHTINGS, DupeWindow, fingerprint, normalize
+
+
+def message(text="", entities=()):
+    return SimpleNamespace(text=text, caption=None, entities=entities, caption_entities=None, photo=None,
+                           video=None, document=None, audio=None, video_note=None)
+
+
+def test_normalize_and_fingerprint():
+    assert normalize("Buy\u200b  NOW\n cheap") == "buy now cheap"
+    long_text = "join my channel for free crypto signals"
+    assert fingerprint(message(long_text)) == fingerprint(message(long_text.upper() + "  "))
+    assert fingerprint(message("hi")) is None  # too short to count
+    assert fingerprint(message("t.me/x", [SimpleNamespace(type="url")])) is not None  # links always count
+
+
+def test_flagged_at_threshold_with_all_copies():
+    window = DupeWindow(capacity=10)
+    assert window.record("fp", 1, 101, users=3, window=60, now=0) == []
+    assert window.record("fp", 1, 102, users=3, window=60, now=1) == []  # same user again: still one
+    assert window.record("fp", 2, 201, users=3, window=60, now=2) == []
+    assert window.record("fp", 3, 301, users=3, window=60, now=3) == [(1, 102), (2, 201), (3, 301)]
+    # while flagged, each further copy is reported alone, and keeps the flag up
+    assert window.record("fp", 4, 401, users=3, window=60, now=50) == [(4, 401)]
+    assert window.record("fp", 5, 501, users=3, window=60, now=100) == [(5, 501)]
+    assert window.flagged == 5
+
+
+def test_sightings_outside_the_window_dont_count():
+    window = DupeWindow(capacity=10)
+    window.record("fp", 1, 1, users=2, window=10, now=0)
+    assert window.record("fp", 2, 2, users=2, window=10, now=11) == []
+    assert window.record("fp", 3, 3, users=2, window=10, now=12) == [(2, 2), (3, 3)]
+
+
+def test_lru_bound_on_fingerprints():
+    window = DupeWindow(capacity=3)
+    for key in ("a", "b", "c"):
+        window.record(key, 1, 1, users=2, window=60, now=0)
+    window.record("a", 2, 2, users=5, window=60, now=1)  # "a" becomes most recent
+    window.record("d", 1, 1, users=2, window=60, now=2)
+    assert len(window) == 3
+    assert list(window._entries) == ["c", "a", "d"]  # "b" was least recently used
+
+
+def test_sightings_per_fingerprint_are_bounded():
+    window = DupeWindow(capacity=1)
+    for user in range(MAX_SIGHTINGS + 10):
+        window.record("fp", user, user, users=MAX_SIGHTINGS + 100, window=60, now=0)
+    assert len(window._entries["fp"].seen) == MAX_SIGHTINGS
+
+
+def test_global_window_reports_only_this_copy(monkeypatch):
+    monkeypatch.setattr(dupes, "chat_window", DupeWindow(100))
+    monkeypatch.setattr(dupes, "global_window", DupeWindow(100))
+    monkeypatch.setattr(dupes.config, "DUPE_GLOBAL_USERS", 2)
+    spam = "the very same long spam text sent everywhere"
+    msg = message(spam)
+    msg.message_id = 10
+    assert dupes.check(-1, 1, msg, users=5, window=60) == ("", [])
+    msg.message_id = 20
+    assert dupes.check(-2, 2, msg, users=5, window=60) == ("global", [(2, 20)])
@@ -0,0 +1,81 @@
+# tests/test_extra.py
+import asyncio
+import re
+from collections import deque
+
+import pytest
+from telegram import User
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from core.events import Event
+from modules import extra
+from modules.extra import DIGEST_LIMIT, MAX_DETAIL, flush_logs, render_event, take_digest
+
+
+def event(chat_id=-1, detail="", title="Chat"):
+    return Event("warn", chat_id, title, User(7, "Eve", False), 1, detail)
+
+
+def test_detail_is_cut_before_escaping():
+    line = render_event(event(detail="<&>" * 1000))
+    escaped = line.split(": ", 1)[1]
+    assert escaped.endswith("…")
+    assert "&lt;&amp;&gt;" in escaped and not re.search(r"&[a-z]*…", escaped)
+    assert len(line) < DIGEST_LIMIT and len(escaped) <= MAX_DETAIL * 5
+
+
+def test_digest_groups_by_chat_and_keeps_order():
+    queue = deque([event(-1, "a"), event(-1, "b"), event(-2, "c", title="Other")])
+    text, taken = take_digest(queue)
+    assert not queue and len(taken) == 3
+    assert text.count("<b>Chat</b>") == 1 and text.count("<b>Other</b>") == 1
+    assert text.index(": a") < text.index(": b") < text.index(": c")
+
+
+def test_digest_splits_between_events_only():
+    queue = deque(event(detail=f"{i} " + "<x>" * 200) for i in range(100))
+    digests = []
+    while queue:
+        digests.append(take_digest(queue)[0])
+    assert len(digests) > 1
+    seen = []
+    for text in digests:
+        assert len(text) <= DIGEST_LIMIT
+        assert text.count("<a href") == text.count("</a>")  # no tag cut in half
+        seen += [int(m) for m in re.findall(r": (\d+) ", text)]
+    assert seen == list(range(100))
+
+
+class FailingBot:
+    def __init__(self, error):
+        self.error = error
+
+    async def send_message(self, *args, **kwargs):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, left", [
+    (Forbidden("bot was kicked"), 0),
+    (BadRequest("Chat not found"), 0),
+    (BadRequest("Can't parse entities"), 2),  # this digest can't be sent, the rest waits
+    (TimedOut(), 3),  # transient: the digest is kept for the next round
+    (NetworkError("connection reset"), 3),
+    (RetryAfter(5), 3),
+])
+def test_failed_digest_is_dropped_kept_or_cleared(error, left, monkeypatch):
+    def take_one(queue):
+        return "digest", [queue.popleft()]
+
+    monkeypatch.setattr(extra, "take_digest", take_one)
+    monkeypatch.setattr(extra, "_queues", {"@log": deque([event(detail=str(i)) for i in range(3)], maxlen=10)})
+    asyncio.run(flush_logs(FailingBot(error)))
+    queue = extra._queues["@log"]
+    assert len(queue) == left
+    if left == 3:
+        assert [e.detail for e in queue] == ["0", "1", "2"]
+
+
+def test_put_back_drops_the_oldest_when_full():
+    queue = deque([event(detail=str(i)) for i in range(2, 5)], maxlen=4)
+    extra._put_back(queue, [event(detail="0"), event(detail="1")])
+    assert [e.detail for e in queue] == ["1", "2", "3", "4"]
@@ -0,0 +1,23 @@
+# tests/test_gban.py
+import json
+
+from modules.gban import parse_import
+
+
+def test_parse_export_file():
+    raw = json.dumps({"111": {"reason": "spam", "by": 1, "date": 0}, "222": {}, "x": {"reason": "?"}}).encode()
+    assert parse_import(raw) == {111: "spam", 222: ""}
+
+
+def test_parse_json_list():
+    assert parse_import(b'[1, "2", "-3", "four", 5.5]') == {1: "", 2: "", -3: ""}
+
+
+def test_parse_lines():
+    raw = "\ufeff100 scam links\n  200\n\n# comment\nabc 300\n300 dup, last wins\n".encode("utf-8")
+    assert parse_import(raw) == {100: "scam links", 200: "", 300: "dup, last wins"}
+
+
+def test_parse_garbage():
+    assert parse_import(b"\xff\xfe not json") == {}
+    assert parse_import(b'"a string"') == {}
@@ -0,0 +1,21 @@
+# tests/test_greetings.py
+from telegram import Chat, User
+
+from modules.greetings import compile_template, render, uses_count
+
+MEMBER = User(5, "Ann <b>", False, last_name="&Co")
+CHAT = Chat(-1, "supergroup", title="<Cats>")
+
+
+def test_only_placeholders_make_markup():
+    template = compile_template("Bye {first} <3 & see {mention} in {chatname}")
+    assert render(template, MEMBER, CHAT) == (
+        'Bye Ann &lt;b&gt; &lt;3 &amp; see <a href="tg://user?id=5">Ann &lt;b&gt; &amp;Co</a> in &lt;Cats&gt;'
+    )
+
+
+def test_unknown_braces_and_count():
+    template = compile_template("{nope} #{count} {id}")
+    assert uses_count(template)
+    assert render(template, MEMBER, CHAT, 42) == "{nope} #42 5"
+    assert not uses_count(compile_template("hi {first}"))
@@ -0,0 +1,120 @@
+# tests/test_patterns.py
+import asyncio
+
+import pytest
+
+from core import patterns
+from core.patterns import PLAIN, REGEX, WORD, FilterMatcher, RegexPool, check_regex, scan
+
+
+@pytest.mark.parametrize("pattern", [
+    r"(a+)+b",
+    r"(a|aa)*c",
+    r"(foo|bar)+",
+    r"(x(ab|a))*!",
+    r"(?P<name>spam)",
+    r"(a)\1",
+    r"(?i)spam",
+    "a" * (patterns.MAX_PATTERN_LENGTH + 1),
+    r"(unclosed",
+])
+def test_check_regex_refuses(pattern):
+    with pytest.raises(ValueError):
+        check_regex(pattern)
+
+
+@pytest.mark.parametrize("pattern", [r"spam\d+", r"(\w|\d)*!", r"[ab]+c", r"(?:foo|bar) offer", r"(ab)+"])
+def test_check_regex_accepts(pattern):
+    assert check_regex(pattern).pattern == pattern
+
+
+def test_scan_earliest_wins():
+    singles = ("late", "early")
+    combined = "|".join(f"(?P<f{i}>{s})" for i, s in enumerate(singles))
+    # the combined search sees "early" first in the text, but "late" was added first
+    assert scan(combined, singles, "early then late") == 0
+    assert scan(combined, singles, "only early") == 1
+    assert scan(combined, singles, "nothing") == -1
+    assert scan(None, singles, "early then late") == 0
+
+
+pool = RegexPool(2)
+
+
+def run(coro):
+    async def main():
+        try:
+            await coro
+        finally:
+            await pool.stop()
+    asyncio.run(main())
+
+
+def test_first_match_order():
+    matcher = FilterMatcher([("hello", PLAIN), (r"sp[a4]m", REGEX), ("cat", WORD)], pool=pool)
+
+    async def check():
+        assert await matcher.first_match("a cat said hello") == "hello"
+        assert await matcher.first_match("sp4m and a cat") == r"sp[a4]m"
+        assert await matcher.first_match("a cat") == "cat"
+        assert await matcher.first_match("concatenate") is None
+        matcher.remove("hello")
+        assert await matcher.first_match("hello cat") == "cat"
+
+    run(check())
+
+
+def test_named_groups_fall_back_to_single_patterns():
+    # stored before named groups were refused; the combined pattern doesn't compile
+    matcher = FilterMatcher([("(?P<x>a)b", REGEX), ("(?P<x>c)d", REGEX)], pool=pool)
+
+    async def check():
+        assert await matcher.first_match("xx cd") == "(?P<x>c)d"
+        assert matcher._regexes.combined is None
+
+    run(check())
+
+
+def test_slow_regex_times_out_and_suspends(monkeypatch):
+    monkeypatch.setattr(patterns, "MATCH_TIMEOUT", 0.2)
+    matcher = FilterMatcher([("hi", PLAIN), ("(a|aa)*c", REGEX)], pool=pool)  # skipped validation, as old data
+    text = "a" * 40
+
+    async def check():
+        for _ in range(patterns.MAX_OVERRUNS):
+            assert await matcher.first_match(text) is None
+        assert matcher.suspended
+        assert await matcher.first_match(text + " hi") == "hi"
+
+    run(check())
+
+
+def test_words_match_without_a_pool():
+    matcher = FilterMatcher([("cat", WORD), ("dog", WORD)])
+
+    async def check():
+        assert await matcher.first_match("a dog and a cat") == "cat"
+        assert await matcher.first_match("hotdog") is None
+
+    asyncio.run(check())
+
+
+def test_slow_regex_does_not_hold_up_other_chats(monkeypatch):
+    monkeypatch.setattr(patterns, "MATCH_TIMEOUT", 1.0)
+    slow = FilterMatcher([("(a|aa)*c", REGEX)], pool=pool)
+    clean = FilterMatcher([("cat", WORD), (r"sp[a4]m", REGEX)], pool=pool)
+
+    async def check():
+        await pool.search(clean._regexes, "warm up")  # both workers started
+        await pool.search(clean._regexes, "warm up")
+        loop = asyncio.get_running_loop()
+        stuck = asyncio.ensure_future(slow.first_match("a" * 40))
+        await asyncio.sleep(0.05)
+        started = loop.time()
+        assert await clean.first_match("a cat") == "cat"
+        assert await clean.first_match("sp4m") == r"sp[a4]m"
+        assert loop.time() - started < 0.5
+        assert await stuck is None
+        assert slow.overruns == 1
+
+    run(check())
@@ -0,0 +1,112 @@
+# tests/test_ratelimit.py
+import asyncio
+import time
+
+import pytest
+from telegram.error import RetryAfter
+
+from core.ratelimit import HIGH, LOW, NORMAL, PriorityGate, PriorityRateLimiter, priority
+
+
+def test_waiters_served_by_priority_then_fifo():
+    async def main():
+        gate = PriorityGate(rate=50, burst=1)
+        await gate.acquire(NORMAL)  # the only token
+        order = []
+
+        async def wait(name, level):
+            await gate.acquire(level)
+            order.append(name)
+
+        tasks = [asyncio.create_task(wait(name, level))
+                 for name, level in (("low", LOW), ("normal", NORMAL), ("high1", HIGH), ("high2", HIGH))]
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(main()) == ["high1", "high2", "normal", "low"]
+
+
+def test_tokens_refill_up_to_burst():
+    gate = PriorityGate(rate=10, burst=2)
+    gate.tokens = 0
+    gate.updated -= 0.15
+    gate._refill()
+    assert gate.tokens == pytest.approx(1.5, abs=0.05)
+    gate.updated -= 10
+    gate._refill()
+    assert gate.tokens == 2
+    assert gate.idle()
+
+
+def test_pause_holds_back_the_next_token():
+    async def main():
+        gate = PriorityGate(rate=100, burst=5)
+        gate.pause(0.1)
+        assert gate.tokens <= -10
+        started = time.monotonic()
+        await gate.acquire(HIGH)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.1
+
+
+def test_cancelled_waiter_gives_its_turn_away():
+    async def main():
+        gate = PriorityGate(rate=10, burst=1)
+        await gate.acquire(NORMAL)
+        started = time.monotonic()
+        first = asyncio.create_task(gate.acquire(HIGH))
+        second = asyncio.create_task(gate.acquire(NORMAL))
+        await asyncio.sleep(0)
+        first.cancel()
+        await second
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0)
+        return elapsed, gate.depth(), gate._task
+
+    elapsed, depth, task = asyncio.run(main())
+    assert elapsed < 0.17  # one token period, not two
+    assert depth == 0 and task is None
+
+
+def test_retry_after_pauses_the_chat_and_retries():
+    calls = []
+
+    async def send(*args, **kwargs):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RetryAfter(0.1)
+        return "sent"
+
+    async def main():
+        limiter = PriorityRateLimiter(global_per_sec=1000, group_per_min=6000, private_per_sec=1000, max_retries=2)
+        result = await limiter.process_request(send, (), {}, "sendMessage", {"chat_id": -5}, None)
+        return limiter, result
+
+    limiter, result = asyncio.run(main())
+    assert result == "sent" and limiter.retry_afters == 1
+    assert calls[1] - calls[0] >= 0.1
+    assert limiter._chats[-5].tokens < limiter._chats[-5].burst  # the chat's bucket took the pause
+
+
+def test_retry_after_gives_up_after_max_retries():
+    async def send(*args, **kwargs):
+        raise RetryAfter(0.01)
+
+    async def main():
+        limiter = PriorityRateLimiter(global_per_sec=1000, group_per_min=6000, private_per_sec=1000, max_retries=1)
+        with pytest.raises(RetryAfter):
+            await limiter.process_request(send, (), {}, "sendMessage", {"chat_id": 5}, None)
+        return limiter.retry_afters
+
+    assert asyncio.run(main()) == 2
+
+
+def test_priority_sources():
+    limiter = PriorityRateLimiter(global_per_sec=1, group_per_min=1, private_per_sec=1)
+    assert limiter._priority_for("banChatMember", None) == HIGH
+    assert limiter._priority_for("sendMessage", None) == NORMAL
+    assert limiter._priority_for("banChatMember", {"priority": LOW}) == LOW
+    with priority(LOW):
+        assert limiter._priority_for("sendMessage", None) == LOW
+    assert limiter._priority_for("sendMessage", None) == NORMAL
@@ -0,0 +1,51 @@
+# tests/test_settings.py
+from core.settings import ChatSettings, SettingsRegistry
+from core.storage import JsonStore
+
+
+class Sample(ChatSettings):
+    __slots__ = ("limit", "words", "doubled")
+    DEFAULTS = {"limit": 3, "words": []}
+
+    def parse(self):
+        self.doubled = self.limit * 2
+
+
+def registry(tmp_path, max_cached=2):
+    store = JsonStore("settings_test", path=str(tmp_path / "settings_test.json"))
+    return SettingsRegistry(store, Sample, max_cached=max_cached)
+
+
+def test_defaults_parse_and_cache(tmp_path):
+    reg = registry(tmp_path)
+    s = reg.get(-1)
+    assert (s.limit, s.words, s.doubled) == (3, [], 6)
+    assert reg.get(-1) is s and reg.refresh(-1, s) is s
+
+
+def test_replace_gives_a_new_version(tmp_path):
+    reg = registry(tmp_path)
+    old = reg.get(-1)
+    new = reg.update(-1, limit=5)
+    assert new.version > old.version and new.doubled == 10
+    assert reg.refresh(-1, old) is new
+    assert reg.store.get(-1) == {"limit": 5, "words": []}
+
+
+def test_held_object_is_stale_after_eviction(tmp_path):
+    reg = registry(tmp_path, max_cached=2)
+    held = reg.get(-1)
+    reg.get(-2)
+    reg.get(-3)  # evicts -1
+    assert len(reg) == 2 and reg.version(-1) == 0
+    fresh = reg.refresh(-1, held)
+    assert fresh is not held and fresh.version > held.version  # never reuses an old number
+    assert reg.refresh(-1, fresh) is fresh
+
+
+def test_to_dict_is_a_copy(tmp_path):
+    reg = registry(tmp_path)
+    s = reg.update(-1, words=["spam"])
+    raw = s.to_dict()
+    raw["words"].append("eggs")
+    assert s.words == ["spam"]
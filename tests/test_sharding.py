@@ -0,0 +1,91 @@
+# tests/test_sharding.py
+import json
+
+from telegram import Update
+
+from core import sharding
+from core.sharding import GLOBAL_STORES, is_broadcast, is_replica, shard_of, split_data
+from tools.fake_api import message_update
+
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_split_by_chat(tmp_path):
+    _write(tmp_path / "filters.json", {"-100": {"a": "b"}, "-101": {"c": "d"}, "7": {}})
+    counts = split_data(str(tmp_path), 2)
+    assert counts["filters.json"] == [1, 2]
+    assert _read(tmp_path / "shard-0" / "filters.json") == {"-100": {"a": "b"}}
+    assert _read(tmp_path / "shard-1" / "filters.json") == {"-101": {"c": "d"}, "7": {}}
+
+
+def test_split_copies_global_stores(tmp_path):
+    assert "gbans.json" in GLOBAL_STORES
+    bans = {"111": {"reason": "spam"}, "222": {"reason": "scam"}, "333": {"reason": "raid"}}
+    _write(tmp_path / "gbans.json", bans)
+    assert split_data(str(tmp_path), 3)["gbans.json"] == [3, 3, 3]
+    for index in range(3):
+        assert _read(tmp_path / f"shard-{index}" / "gbans.json") == bans
+
+
+def test_shard_of():
+    assert shard_of(None, 4) == 0
+    assert shard_of(-1001, 4) == -1001 % 4
+
+
+def test_broadcast_only_owner_gban_commands():
+    def update(user_id, text):
+        return Update.de_json(message_update(1, -100, user_id, text), None)
+
+    assert is_broadcast(update(42, "/gban 7 spam"), owner_id=42)
+    assert is_broadcast(update(42, "/UNGBAN@SomeBot 7"), owner_id=42)
+    assert not is_broadcast(update(43, "/gban 7"), owner_id=42)
+    assert not is_broadcast(update(42, "/gbans"), owner_id=42)
+    assert not is_broadcast(update(42, "gban 7"), owner_id=42)
+    assert not is_broadcast(update(42, "/gban 7"), owner_id=None)
+
+
+def test_replica_marker():
+    update = Update.de_json(message_update(99, -100, 42, "/gban 7"), None)
+    assert not is_replica(update)
+    sharding._replicas[99] = None
+    try:
+        assert is_replica(update)
+    finally:
+        sharding._replicas.clear()
+
+
+class FakeProcess:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.name = "shard-0"
+        self.pid = 1
+        self.exitcode = None if alive else 1
+
+    def is_alive(self):
+        return self.alive
+
+
+def test_dead_worker_is_restarted_with_backoff(monkeypatch):
+    router = sharding.ShardRouter(1)
+    spawned = []
+    monkeypatch.setattr(router, "_spawn", lambda index: spawned.append(index) or FakeProcess(alive=False))
+    router.workers = [FakeProcess(alive=False)]
+    old_inbox = router.inboxes[0]
+    update = Update.de_json(message_update(1, -5, 2, "hi"), None)
+
+    router.dispatch(update)
+    assert spawned == [0] and router.restarts == [1]
+    assert router.inboxes[0] is not old_inbox
+    router.dispatch(update)  # died again at once: wait out RESTART_BACKOFF
+    assert spawned == [0] and router.restarts == [1]
+    monkeypatch.setattr(router, "_restarted_at", [float("-inf")])
+    router.dispatch(update)
+    assert spawned == [0, 0] and router.restarts == [2]
@@ -0,0 +1,67 @@
+# tests/test_sqlite_store.py
+import asyncio
+
+import pytest
+
+from core import sqlite_store, storage
+from core.sqlite_store import SqliteStore
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_store.config, "SQLITE_PATH", str(tmp_path / "bot.db"))
+    yield tmp_path
+    storage._flush_handle = None  # scheduled on a loop that is gone
+
+
+def write_behind(test):
+    """Run test() inside a loop, so changes wait for an explicit flush like in the bot."""
+    async def main():
+        test()
+    asyncio.run(main())
+
+
+def test_dirty_chats_are_not_evicted(db):
+    def test():
+        store = SqliteStore("evict_dirty", max_cached=2)
+        store.set(1, {"v": 1})
+        for key in range(2, 10):
+            store.get(key)
+        assert "1" in store._cache
+        store.flush()
+        store.get(10)
+        store.get(11)
+        assert "1" not in store._cache  # written, so it can go
+        assert store.get(1) == {"v": 1}
+    write_behind(test)
+
+
+def test_failed_write_is_retried_after_eviction_pressure(db):
+    def test():
+        store = SqliteStore("evict_retry", max_cached=2)
+        store.set(1, {"v": 1})
+        payload = store._collect()
+        # while the write is in flight, other chats are loaded
+        for key in range(2, 10):
+            store.get(key)
+        assert "1" in store._cache
+        store._restore(payload)  # the write failed
+        store._finished(payload)
+        assert "1" in store._cache
+        store.flush()
+        assert SqliteStore("evict_retry").get(1) == {"v": 1}
+    write_behind(test)
+
+
+def test_nested_item_rows(db):
+    def test():
+        store = SqliteStore("nested_rows", nested=True)
+        store.set(-5, {"7": {"count": 1}})
+        store.flush()
+        store.get(-5)["8"] = {"count": 2}
+        store.touch(-5, 8)
+        del store.get(-5)["7"]
+        store.touch(-5, 7)
+        store.flush()
+        assert SqliteStore("nested_rows", nested=True).get(-5) == {"8": {"count": 2}}
+    write_behind(test)
@@ -0,0 +1,59 @@
+# tests/test_storage.py
+import asyncio
+
+import pytest
+
+from core import storage
+from core.storage import BaseStore, JsonStore
+
+
+class FlakyStore(JsonStore):
+    def __init__(self, name, path, failures):
+        super().__init__(name, path=path)
+        self.failures = failures
+
+    def _write(self, payload):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super()._write(payload)
+
+
+@pytest.fixture
+def fresh_flush(monkeypatch):
+    monkeypatch.setattr(storage.config, "STORAGE_FLUSH_DELAY", 0.01)
+    yield
+    storage._flush_handle = None  # scheduled on a loop that is gone
+
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        BaseStore("abstract")
+
+
+def test_failed_sync_flush_keeps_changes(tmp_path, fresh_flush):
+    store = FlakyStore("flaky_sync", str(tmp_path / "flaky_sync.json"), failures=1)
+
+    async def change():
+        store.set(1, {"v": 1})  # inside a loop: written behind, not through
+    asyncio.run(change())
+    storage._flush_handle = None
+    with pytest.raises(OSError):
+        store.flush()
+    store.flush()
+    assert storage._read_json(store.path) == {"1": {"v": 1}}
+
+
+def test_failed_async_flush_is_retried(tmp_path, fresh_flush):
+    store = FlakyStore("flaky_async", str(tmp_path / "flaky_async.json"), failures=1)
+
+    async def main():
+        store.set(1, {"v": 1})
+        await store.flush_async()  # fails, nothing else changes afterwards
+        assert storage._flush_handle is not None
+        for _ in range(100):  # bounded: a missing retry fails the assert below
+            await asyncio.sleep(0.01)
+            if storage._read_json(store.path):
+                break
+        assert storage._read_json(store.path) == {"1": {"v": 1}}
+    asyncio.run(main())
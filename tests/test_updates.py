@@ -0,0 +1,83 @@
+# tests/test_updates.py
+import asyncio
+
+from telegram import Update
+
+from core.updates import ChatOrderedUpdateProcessor, chat_key
+from tools.fake_api import message_update
+
+
+def update(update_id, chat_id):
+    return Update.de_json(message_update(update_id, chat_id, 7, "hi"), None)
+
+
+def test_chat_key():
+    assert chat_key(update(1, -5)) == -5
+    assert chat_key(object()) is None
+
+
+def test_same_chat_in_order_other_chats_in_parallel():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(concurrency=4)
+        log = []
+
+        async def handle(chat_id, n, delay):
+            log.append(("start", chat_id, n))
+            await asyncio.sleep(delay)
+            log.append(("end", chat_id, n))
+
+        updates = [(-1, 0, 0.03), (-1, 1, 0.0), (-1, 2, 0.01), (-2, 0, 0.0)]
+        await asyncio.gather(*(processor.process_update(update(i, chat), handle(chat, n, delay))
+                               for i, (chat, n, delay) in enumerate(updates)))
+        return processor, log
+
+    processor, log = asyncio.run(main())
+    chat1 = [(kind, n) for kind, chat, n in log if chat == -1]
+    assert chat1 == [("start", 0), ("end", 0), ("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+    # the other chat didn't wait behind chat -1's slow first update
+    assert log.index(("end", -2, 0)) < log.index(("end", -1, 0))
+    assert processor.processed == 4
+
+
+def test_depth_bookkeeping():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(concurrency=2)
+        release = asyncio.Event()
+        seen = {}
+
+        async def blocked():
+            await release.wait()
+
+        tasks = [asyncio.create_task(processor.process_update(update(i, -1), blocked())) for i in range(3)]
+        tasks.append(asyncio.create_task(processor.process_update(update(9, -2), blocked())))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        seen["during"] = processor.stats()
+        release.set()
+        await asyncio.gather(*tasks)
+        seen["after"] = processor.stats()
+        seen["locks"] = dict(processor._locks)
+        return seen
+
+    seen = asyncio.run(main())
+    during = seen["during"]
+    assert during["active_chats"] == 2 and during["queued"] == 4 and during["max_chat_queue"] == 3
+    after = seen["after"]
+    assert after["active_chats"] == 0 and after["queued"] == 0 and after["processed"] == 4
+    assert after["max_chat_queue_seen"] == 3
+    assert seen["locks"] == {}  # idle chats leave nothing behind
+
+
+def test_updates_without_a_chat_still_run():
+    async def main():
+        processor = ChatOrderedUpdateProcessor(concurrency=1)
+        done = []
+
+        async def handle():
+            done.append(1)
+
+        await processor.process_update(object(), handle())
+        return processor, done
+
+    processor, done = asyncio.run(main())
+    assert done == [1] and processor.processed == 1 and processor.stats()["active_chats"] == 0
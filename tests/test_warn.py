@@ -0,0 +1,87 @@
+# tests/test_warn.py
+import pytest
+
+from modules import warn
+from modules.warn import MAX_LADDER, _decay, ladder_step, parse_ladder
+
+HOUR = 3600
+
+
+def cfg(decay=HOUR, limit=3):
+    return {"limit": limit, "ladder": [], "decay": decay}
+
+
+def test_decay_off():
+    record = {"count": 2, "reasons": ["a", "b"], "last": 0}
+    assert not _decay(record, cfg(decay=None), 10 * HOUR)
+    assert record["count"] == 2
+
+
+def test_decay_one_warning_per_period():
+    record = {"count": 3, "reasons": ["a", "b", "c"], "last": 0, "struck": 0}
+    assert not _decay(record, cfg(), HOUR - 1)
+    assert _decay(record, cfg(), 2 * HOUR + 5)
+    assert record["count"] == 1 and record["reasons"] == ["c"]
+    assert record["last"] == 2 * HOUR  # the partial period keeps counting
+    assert _decay(record, cfg(), 3 * HOUR)
+    assert record["count"] == 0 and record["reasons"] == []
+
+
+def test_decay_never_negative():
+    record = {"count": 1, "reasons": ["a"], "last": 0, "struck": 0}
+    assert _decay(record, cfg(), 50 * HOUR)
+    assert record["count"] == 0
+
+
+def test_decay_strikes_per_limit_periods():
+    record = {"count": 0, "reasons": [], "last": 0, "strikes": 2, "struck": 0}
+    assert not _decay(record, cfg(limit=3), 3 * HOUR - 1)
+    assert _decay(record, cfg(limit=3), 3 * HOUR)
+    assert record["strikes"] == 1 and record["struck"] == 3 * HOUR
+
+
+def test_decay_old_records_start_now():
+    record = {"count": 2, "reasons": ["a", "b"]}
+    assert _decay(record, cfg(), 1000.0)
+    assert record["last"] == record["struck"] == 1000.0 and record["count"] == 2
+
+
+def test_parse_ladder():
+    assert parse_ladder("mute 10m, BAN 1d, kick, ban") == [
+        {"mode": "tmute", "duration": 600},
+        {"mode": "tban", "duration": 86400},
+        {"mode": "kick", "duration": None},
+        {"mode": "ban", "duration": None},
+    ]
+
+
+@pytest.mark.parametrize("text", ["", " , ", "warn", "mute soon", "kick 5m", ", ".join(["ban"] * (MAX_LADDER + 1))])
+def test_parse_ladder_refuses(text):
+    with pytest.raises(ValueError):
+        parse_ladder(text)
+
+
+def test_ladder_last_step_repeats():
+    ladder = parse_ladder("mute 1h, ban")
+    config = {"ladder": ladder}
+    assert ladder_step(config, 0) == ladder[0]
+    assert ladder_step(config, 1) == ladder[1]
+    assert ladder_step(config, 7) == ladder[1]
+
+
+def test_compact_only_visits_chats_with_decay(monkeypatch):
+    monkeypatch.setattr(warn, "_decaying", None)
+    warn._settings.set(-1, {"decay": HOUR})
+    warn._settings.set(-2, {"decay": None})
+    warn._store.set(-1, {"5": {"count": 1, "reasons": ["a"], "last": 0, "struck": 0}})
+    warn._store.set(-2, {"5": {"count": 1, "reasons": ["a"], "last": 0, "struck": 0}})
+    visited = []
+    get = warn._store.get
+    monkeypatch.setattr(warn._store, "get", lambda key, default=None: visited.append(key) or get(key, default))
+
+    assert warn.compact(now=2 * HOUR) == 1
+    assert visited == ["-1"]
+    assert warn._store.get(-1) is None and warn._store.get(-2)["5"]["count"] == 1
+    for chat_id in (-1, -2):
+        warn._settings.pop(chat_id)
+        warn._store.pop(chat_id)
@@ -0,0 +1,153 @@
+# tools/bench.py
+# Replay benchmark for the message hot path.
+#
+#   python -m tools.bench --chats 50 --users 200 --updates 20000 --filters 300 --flood-burst 0.02
+#   python -m tools.bench --replay updates.jsonl      # one Update JSON per line
+#
+# Builds the real Application (main.build_application, all modules) against the
+# in-process fake Bot API from tools/fake_api.py, feeds it a synthetic or recorded
+# update stream through the application's update processor (with --concurrency > 1 the
+# ChatOrderedUpdateProcessor, as in the bot) and reports updates/s, p50/p99 latency
+# (including the wait behind earlier updates of the same chat) and outbound API calls
+# per update. Data files go to a temp dir.
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List
+
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="bench-data-"))
+os.environ.setdefault("METRICS_PORT", "0")
+
+from telegram import Update  # noqa: E402
+
+import main  # noqa: E402
+from core import config, lifecycle  # noqa: E402
+from core.ratelimit import PriorityRateLimiter  # noqa: E402
+from tools.fake_api import FakeRequest, join_update, message_update  # noqa: E402
+
+WORDS = ("hello", "spam", "meeting", "price", "crypto", "help", "group", "rules", "link", "bot",
+         "today", "free", "offer", "news", "music", "game", "photo", "question", "answer", "thanks")
+
+
+def synthetic_stream(args) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(args.seed)
+    chats = [-(1_000_000_000 + i) for i in range(args.chats)]
+    users = [10_000 + i for i in range(args.users)]
+    update_id = 0
+    while update_id < args.updates:
+        chat_id = rng.choice(chats)
+        if rng.random() < args.joins:
+            update_id += 1
+            yield join_update(update_id, chat_id, rng.sample(users, k=min(3, len(users))))
+            continue
+        user_id = rng.choice(users)
+        burst = args.burst_size if rng.random() < args.flood_burst else 1
+        for _ in range(burst):
+            update_id += 1
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 20)))
+            yield message_update(update_id, chat_id, user_id, text)
+
+
+def replay_stream(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def seed_chats(args, chats: List[int]):
+    """Per-chat config the hot path will see: filters and antiflood settings."""
+    from modules import antiflood, filters
+
+    for chat_id in chats:
+        chat_filters = filters._store.setdefault(chat_id, {})
+        for i in range(args.filters):
+            chat_filters[f"trigger{i}zz"] = f"reply {i}"
+        if args.filters:
+            chat_filters["crypto offer"] = "🚫 no crypto"
+        filters._store.touch(chat_id)
+        antiflood.set_cfg(chat_id, {"limit": args.flood_limit, "timer": {"count": 10, "duration": 30},
+                                    "mode": "mute", "clear": False})
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    request = FakeRequest(latency=args.api_latency)
+    limiter = None
+    if not args.rate_limit:
+        limiter = PriorityRateLimiter(global_per_sec=1e9, group_per_min=1e9, private_per_sec=1e9)
+    config.UPDATE_CONCURRENCY = args.concurrency  # read by build_application
+    app = main.build_application(token="123456:bench", request=request, limiter=limiter)
+    await app.initialize()
+    await lifecycle.run_startup(app)
+
+    if args.replay:
+        raw = list(replay_stream(args.replay))
+    else:
+        raw = list(synthetic_stream(args))
+        chats = sorted({u["message"]["chat"]["id"] for u in raw})
+        request.admins = {chat_id: [1] for chat_id in chats}
+        seed_chats(args, chats)
+    updates = [Update.de_json(data, app.bot) for data in raw]
+    request.reset()
+
+    latencies: List[float] = []
+    processor = app.update_processor
+
+    async def handle(update: Update):
+        t0 = time.perf_counter()
+        await processor.process_update(update, app.process_update(update))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    if args.concurrency == 1:
+        for update in updates:
+            await handle(update)
+    else:
+        await asyncio.gather(*(handle(u) for u in updates))
+    elapsed = time.perf_counter() - started
+
+    await lifecycle.run_shutdown(app)
+    await app.shutdown()
+
+    calls = sum(request.calls.values())
+    print(f"updates        : {len(updates)} in {elapsed:.2f}s ({len(updates) / elapsed:.0f} updates/s)")
+    print(f"latency ms     : p50 {statistics.median(latencies):.3f}  p99 {percentile(latencies, 99):.3f}  "
+          f"max {max(latencies):.3f}")
+    print(f"API calls      : {calls} ({calls / len(updates):.3f} per update)")
+    for endpoint, count in request.calls.most_common():
+        print(f"  {endpoint:<24} {count:>8} ({count / len(updates):.3f}/update)")
+    if hasattr(processor, "stats"):
+        print(f"chat queue     : deepest {processor.stats()['max_chat_queue_seen']} updates")
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Replay updates through the real handlers against a fake Bot API.")
+    parser.add_argument("--replay", help="JSON-lines file of recorded updates instead of a synthetic stream")
+    parser.add_argument("--updates", type=int, default=10000)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--filters", type=int, default=50, help="filters per chat")
+    parser.add_argument("--flood-limit", type=int, default=8, help="consecutive antiflood limit per chat")
+    parser.add_argument("--flood-burst", type=float, default=0.01, help="chance a message starts a burst")
+    parser.add_argument("--burst-size", type=int, default=12)
+    parser.add_argument("--joins", type=float, default=0.005, help="chance an update is a join")
+    parser.add_argument("--concurrency", type=int, default=1, help="updates processed at once")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds per fake Bot API call")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the real outbound rate limits")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,120 @@
+# tools/fake_api.py
+# In-process stand-in for the Telegram Bot API, used by the harnesses in tools/.
+#
+#   request = FakeRequest(latency=0.05)
+#   app = main.build_application(token="123:fake", request=request)
+#
+# Every call is answered locally with a plausible result and recorded, so handlers
+# run unchanged and we can count what they send.
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {"id": 1000, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot",
+            "can_join_groups": True, "can_read_all_group_messages": True, "supports_inline_queries": False}
+
+
+def chat_dict(chat_id: int) -> Dict[str, Any]:
+    if chat_id < 0:
+        return {"id": chat_id, "type": "supergroup", "title": f"Group {chat_id}"}
+    return {"id": chat_id, "type": "private", "first_name": f"User {chat_id}"}
+
+
+def user_dict(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+
+class FakeRequest(BaseRequest):
+    """
+    latency: seconds each call takes. admins: {chat_id: [user_id, ...]} returned by
+    getChatAdministrators (the first one is the creator). on_call(endpoint, params)
+    is invoked for every call, e.g. to timestamp replies.
+    """
+
+    def __init__(self, latency: float = 0.0, admins: Optional[Dict[int, List[int]]] = None,
+                 on_call: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.latency = latency
+        self.admins = admins or {}
+        self.on_call = on_call
+        self.calls: Counter = Counter()
+        self._message_id = 10_000_000
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def reset(self):
+        self.calls.clear()
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._message_id += 1
+        return {"message_id": self._message_id, "date": int(time.time()),
+                "chat": chat_dict(int(params.get("chat_id", 0))), "from": BOT_USER,
+                "text": params.get("text", "")}
+
+    def _result(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        if endpoint == "getMe":
+            return BOT_USER
+        if endpoint == "getUpdates":
+            return []
+        if endpoint.startswith(("send", "copyMessage", "forwardMessage")) or endpoint.startswith("edit"):
+            return self._message(params)
+        if endpoint == "getChatAdministrators":
+            ids = self.admins.get(int(params["chat_id"]), [])
+            return [{"status": "creator" if i == 0 else "administrator", "user": user_dict(uid),
+                     "is_anonymous": False, "can_be_edited": False, "can_manage_chat": True,
+                     "can_delete_messages": True, "can_manage_video_chats": True,
+                     "can_restrict_members": True, "can_promote_members": True, "can_change_info": True,
+                     "can_invite_users": True, "can_post_stories": True, "can_edit_stories": True,
+                     "can_delete_stories": True}
+                    for i, uid in enumerate(ids)]
+        if endpoint == "getChat":
+            chat = chat_dict(int(params["chat_id"]))
+            if chat["type"] != "private":
+                chat["permissions"] = {"can_send_messages": True, "can_send_photos": True}
+            return dict(chat, accent_color_id=0, max_reaction_count=11)
+        if endpoint == "getChatMember":
+            return {"status": "member", "user": user_dict(int(params["user_id"]))}
+        if endpoint == "exportChatInviteLink":
+            return "https://t.me/+fake"
+        return True
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+        self.calls[endpoint] += 1
+        if self.on_call is not None:
+            self.on_call(endpoint, params)
+        if self.latency and endpoint != "getUpdates":
+            await asyncio.sleep(self.latency)
+        payload = {"ok": True, "result": self._result(endpoint, params)}
+        return 200, json.dumps(payload).encode()
+
+
+# ---------- synthetic updates ----------
+def message_update(update_id: int, chat_id: int, user_id: int, text: str, message_id: Optional[int] = None) -> Dict[str, Any]:
+    message = {"message_id": message_id or update_id, "date": int(time.time()),
+               "chat": chat_dict(chat_id), "from": user_dict(user_id), "text": text}
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+def join_update(update_id: int, chat_id: int, user_ids: List[int]) -> Dict[str, Any]:
+    members = [user_dict(uid) for uid in user_ids]
+    message = {"message_id": update_id, "date": int(time.time()), "chat": chat_dict(chat_id),
+               "from": members[0], "new_chat_members": members}
+    return {"update_id": update_id, "message": message}
@@ -0,0 +1,161 @@
+# tools/shard_check.py
+# Self-check of sharded mode on one machine, without Telegram.
+#
+#   python -m tools.shard_check --shards 4 --chats 40 --messages 25
+#
+# Starts the real ShardRouter with N worker processes, each running the full bot
+# against tools/fake_api.py in its own temp data directory. Every chat first gets a
+# filter from its admin (/filter pingN pongN), then --messages that trigger it. The
+# check passes if every chat got all its replies, only from the shard that owns it
+# (chat_id % N), and each chat's filter was stored only in that shard's data dir.
+# The owner also sends one /gban, which every shard must store and only the owner's
+# shard must answer. Before any update is routed, the worker of --kill-shard is killed:
+# the router must restart it once, and the new worker must do all of that shard's work.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from telegram import Update
+
+from core.sharding import ShardRouter, shard_of
+from tools.fake_api import FakeRequest, message_update
+
+ADMIN = 1
+MEMBER = 2
+OWNER = 3
+GBANNED = 4
+RESULT_FILE = "shard_check.json"
+
+_replies: Dict[int, List[str]] = defaultdict(list)  # per worker process
+
+
+def chat_ids(count: int) -> List[int]:
+    return [-(1_000_000_000 + i) for i in range(count)]
+
+
+def _record(endpoint: str, params: dict):
+    if endpoint == "sendMessage" and str(params.get("text", "")).startswith(("pong", "🌐")):
+        _replies[int(params["chat_id"])].append(params["text"])
+
+
+def fake_request() -> FakeRequest:
+    """Runs in each worker (RequestFactory): fake Bot API where ADMIN administers every chat."""
+    chats = chat_ids(int(os.environ["SHARD_CHECK_CHATS"]))
+    return FakeRequest(admins={chat_id: [ADMIN] for chat_id in chats}, on_call=_record)
+
+
+async def report(index: int, app):
+    """Runs in each worker before it shuts down (ExitHook)."""
+    path = os.path.join(os.environ["DATA_DIR"], RESULT_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"index": index, "pid": os.getpid(), "replies": _replies}, f)
+
+
+def check(args, data_dir: str) -> List[str]:
+    problems = []
+    pids = set()
+    seen: Dict[int, int] = {}
+    for index in range(args.shards):
+        shard_dir = os.path.join(data_dir, f"shard-{index}")
+        try:
+            with open(os.path.join(shard_dir, RESULT_FILE), "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except OSError:
+            problems.append(f"shard {index} wrote no report")
+            continue
+        pids.add(result["pid"])
+        for chat, texts in result["replies"].items():
+            chat = int(chat)
+            if shard_of(chat, args.shards) != index:
+                problems.append(f"chat {chat} answered by shard {index}, owner is {shard_of(chat, args.shards)}")
+            seen[chat] = seen.get(chat, 0) + len(texts)
+        try:
+            with open(os.path.join(shard_dir, "gbans.json"), "r", encoding="utf-8") as f:
+                gbans = json.load(f)
+        except OSError:
+            gbans = {}
+        if str(GBANNED) not in gbans:
+            problems.append(f"shard {index} did not get the global ban")
+        try:
+            with open(os.path.join(shard_dir, "filters.json"), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except OSError:
+            stored = {}
+        for chat in stored:
+            if shard_of(int(chat), args.shards) != index:
+                problems.append(f"chat {chat}'s filters stored in shard {index}")
+    if len(pids) != args.shards:
+        problems.append(f"expected {args.shards} worker processes, saw {len(pids)}")
+    if seen.get(OWNER, 0) != 1:
+        problems.append(f"/gban answered {seen.get(OWNER, 0)} times, expected once")
+    for chat in chat_ids(args.chats):
+        if seen.get(chat, 0) != args.messages:
+            problems.append(f"chat {chat}: {seen.get(chat, 0)} replies, expected {args.messages}")
+    return problems
+
+
+def run(args) -> int:
+    data_dir = tempfile.mkdtemp(prefix="shard-check-")
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["SHARD_CHECK_CHATS"] = str(args.chats)
+    os.environ["METRICS_PORT"] = "0"
+    os.environ.setdefault("BOT_TOKEN", "123456:shard-check")
+    os.environ["OWNER_ID"] = str(OWNER)
+    if not args.rate_limit:
+        os.environ["RATE_GLOBAL_PER_SEC"] = os.environ["RATE_GROUP_PER_MIN"] = "1e9"
+
+    router = ShardRouter(args.shards, request_factory=fake_request, on_exit=report, owner_id=OWNER)
+    router.start()
+    started = time.perf_counter()
+    if args.kill_shard >= 0:
+        victim = router.workers[args.kill_shard]
+        victim.kill()
+        victim.join()
+    update_id = 1
+    router.dispatch(Update.de_json(message_update(update_id, OWNER, OWNER, f"/gban {GBANNED} shard check"), None))
+    chats = chat_ids(args.chats)
+    for chat in chats:
+        update_id += 1
+        router.dispatch(Update.de_json(message_update(update_id, chat, ADMIN, f"/filter ping{-chat} pong{-chat}"), None))
+    for k in range(args.messages):
+        for chat in chats:
+            update_id += 1
+            router.dispatch(Update.de_json(message_update(update_id, chat, MEMBER, f"ping{-chat} #{k}"), None))
+    router.stop(timeout=args.timeout)
+    elapsed = time.perf_counter() - started
+
+    print(f"routed         : {update_id} updates to {args.shards} shards {router.routed}")
+    print(f"restarts       : {router.restarts}")
+    print(f"elapsed        : {elapsed:.2f}s incl. worker start/stop ({update_id / elapsed:.0f} updates/s)")
+    problems = check(args, data_dir)
+    expected = [int(index == args.kill_shard) for index in range(args.shards)]
+    if router.restarts != expected:
+        problems.append(f"worker restarts {router.restarts}, expected {expected}")
+    for problem in problems[:20]:
+        print(f"❌ {problem}")
+    if problems:
+        print(f"FAILED ({len(problems)} problems), data in {data_dir}")
+        return 1
+    print("✅ every chat handled by its own shard, in order, state kept per shard")
+    return 0
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Run sharded mode locally against a fake Bot API and verify routing.")
+    parser.add_argument("--shards", type=int, default=3)
+    parser.add_argument("--chats", type=int, default=30)
+    parser.add_argument("--messages", type=int, default=20, help="filter-triggering messages per chat")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--kill-shard", type=int, default=0, help="shard whose worker is killed first (-1: none)")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the real outbound rate limits")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,115 @@
+# tools/webhook_harness.py
+# End-to-end latency of webhook mode, without Telegram.
+#
+#   python -m tools.webhook_harness --updates 2000 --concurrency 50 [--api-latency 0.02]
+#
+# Starts the real bot (all modules) with its webhook server on localhost and the
+# Bot API replaced by tools/fake_api.py, then POSTs synthetic "/alive" updates to the
+# webhook, each from its own private chat. Latency is measured from sending the POST
+# until the bot's reply for that chat reaches the (fake) API.
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict
+
+import main
+from core import config, lifecycle
+from core.ratelimit import PriorityRateLimiter
+from tools.fake_api import FakeRequest, message_update
+
+
+async def post(host: str, port: int, path: str, secret: str, body: bytes) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    headers = (
+        f"POST /{path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n"
+    )
+    if secret:
+        headers += f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n"
+    writer.write(headers.encode() + b"\r\n" + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+    return int(status_line.split()[1])
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    sent: Dict[int, float] = {}
+    replied: Dict[int, float] = {}
+    done = asyncio.Event()
+
+    def on_call(endpoint, params):
+        chat_id = params.get("chat_id")
+        if endpoint == "sendMessage" and chat_id in sent and chat_id not in replied:
+            replied[chat_id] = time.perf_counter()
+            if len(replied) == args.updates:
+                done.set()
+
+    request = FakeRequest(latency=args.api_latency, on_call=on_call)
+    limiter = None
+    if not args.rate_limit:
+        limiter = PriorityRateLimiter(global_per_sec=1e9, group_per_min=1e9, private_per_sec=1e9)
+    app = main.build_application(token="123456:harness", request=request, limiter=limiter)
+    path = config.WEBHOOK_PATH.strip("/")
+    secret = config.WEBHOOK_SECRET or "harness-secret"
+
+    await app.initialize()
+    await lifecycle.run_startup(app)
+    await app.updater.start_webhook(listen="127.0.0.1", port=args.port, url_path=path,
+                                    webhook_url=f"http://127.0.0.1:{args.port}/{path}",
+                                    secret_token=secret, max_connections=args.concurrency)
+    await app.start()
+
+    sem = asyncio.Semaphore(args.concurrency)
+    statuses = []
+
+    async def send(i: int):
+        chat_id = 1_000_000 + i
+        body = json.dumps(message_update(i + 1, chat_id, chat_id, "/alive")).encode()
+        async with sem:
+            sent[chat_id] = time.perf_counter()
+            statuses.append(await post("127.0.0.1", args.port, path, secret, body))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(args.updates)))
+    try:
+        await asyncio.wait_for(done.wait(), args.timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - started
+
+    await app.updater.stop()
+    await app.stop()
+    await lifecycle.run_shutdown(app)
+    await app.shutdown()
+
+    latencies = [(replied[c] - sent[c]) * 1000 for c in replied]
+    print(f"updates posted : {len(statuses)} ({sum(s == 200 for s in statuses)} accepted)")
+    print(f"replies seen   : {len(latencies)}")
+    print(f"throughput     : {len(latencies) / elapsed:.1f} updates/s")
+    if latencies:
+        print(f"latency ms     : p50 {statistics.median(latencies):.1f}  "
+              f"p99 {percentile(latencies, 99):.1f}  max {max(latencies):.1f}")
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="POST synthetic updates to the bot's webhook and time replies.")
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds per fake Bot API call")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the real outbound rate limits")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()